@@ -0,0 +1 @@
+'''Персональний помічник: контакти та нотатки'''
@@ -0,0 +1,941 @@
+'''Обробники команд і таблиця команд'''
+import os
+import json
+import difflib             #for correct command
+import functools
+from colorama import Fore, Style  #for color text
+import re
+import itertools
+from datetime import datetime, date
+from .exchange import IMPORT_CHUNK, exchange_format, export_file, import_file
+from .instrumentation import Instrumentation, ResultCache
+from .models import Note, Record
+
+
+# None - інструментування вимкнене, dispatch викликає обробник напряму
+STATS = None
+
+
+def enable_stats(memory_every=0, profile_every=0):
+    global STATS
+    STATS = Instrumentation(memory_every, profile_every)
+    return STATS
+
+
+def dump_stats(filename):
+    '''Звіт інструментування (разом зі станом кешу відповідей) у файл, якщо інструментування ввімкнене'''
+    if STATS is not None:
+        STATS.dump(filename, RESULT_CACHE)
+
+# команди, чиї відповіді кешуються; для днів народження відповідь залежить ще й від сьогоднішньої дати
+CACHED_COMMANDS = {"phone", "search", "all", "show-birthday", "birthdays", "birthdays-in", "who", "show-email",
+                   "show-address", "show-notes", "find-tag", "find-note", "sort-notes"}
+DATED_COMMANDS = {"show-birthday", "birthdays", "birthdays-in"}
+
+# None - кеш вимкнено
+RESULT_CACHE = None
+# мітки сховищ для ключів кешу; на відміну від id() не повторюються після того, як сховище звільнено
+CACHE_TOKENS = itertools.count()
+
+
+def enable_result_cache(max_bytes):
+    global RESULT_CACHE
+    RESULT_CACHE = ResultCache(max_bytes)
+    return RESULT_CACHE
+
+
+def cache_token(data):
+    '''Мітка екземпляра сховища; у pickle не потрапляє (__getstate__ бере тільки дані), тож відкрите заново
+    сховище (persist у режимі знімка) отримує нову мітку, навіть якщо його _version збігається зі старим'''
+    token = data.__dict__.get("_cache_token")
+    if token is None:
+        token = data._cache_token = next(CACHE_TOKENS)
+    return token
+
+
+def cached_handler(command, handler):
+    def run(args, book, notebook):
+        data = notebook if command in NOTEBOOK_COMMANDS else book
+        key = (command, tuple(args), date.today() if command in DATED_COMMANDS else None)
+        generation = (cache_token(data), getattr(data, "_version", None))
+        return RESULT_CACHE.call(key, generation, lambda: handler(args, book, notebook))
+    return run
+
+
+def dispatch(command, handler, args, book, notebook):
+    if RESULT_CACHE is not None and command in CACHED_COMMANDS:
+        handler = cached_handler(command, handler)
+    if STATS is None:
+        return handler(args, book, notebook)
+    return STATS.call(command, handler, args, book, notebook)
+
+
+# ---------------------------------------------------------#
+'''Контакт не знайдено; suggestions - схожі імена з книги'''
+class ContactNotFound(KeyError):
+    def __init__(self, name, suggestions=()):
+        super().__init__(name)
+        self.suggestions = list(suggestions)
+
+
+def contact_not_found(book, name):
+    return ContactNotFound(name, book.suggest_names(name))
+
+
+def did_you_mean(suggestions, color=Fore.RED):
+    names = ", ".join(f"{Fore.YELLOW}{name}{color}" for name in suggestions)
+    return f" Did you mean: {names}?" if suggestions else ""
+
+
+# ---------------------------------------------------------#        
+'''Errors decorator'''   
+def input_error(func):
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except KeyError as e:
+            if STATS is not None:
+                STATS.error(e)
+            return f"{Fore.RED}Contact not found.{did_you_mean(getattr(e, 'suggestions', ()))}{Style.RESET_ALL}"
+        except ValueError as e:
+            if STATS is not None:
+                STATS.error(e)
+            return Fore.RED + str(e) + Style.RESET_ALL
+        except IndexError as e:
+            if STATS is not None:
+                STATS.error(e)
+            return f"{Fore.RED}Not enough parameters.{Style.RESET_ALL}"
+       # except EmptyLine:
+    return wrapper
+
+
+'''Options parser: відокремлює --опції від звичайних аргументів команди'''
+def parse_options(args, flags=(), valued=()):
+    rest = []
+    options = {}
+    i = 0
+    while i < len(args):
+        option = args[i][2:] if args[i].startswith("--") else None
+        if option in flags:
+            options[option] = True
+        elif option in valued:
+            options[option] = args[i + 1]    # IndexError -> "Not enough parameters."
+            i += 1
+        else:
+            rest.append(args[i])
+        i += 1
+    return rest, options
+
+
+def positive_int(value, what):
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"Please provide a valid {what}.")
+    if number <= 0:
+        raise ValueError(f"Please provide a valid {what}.")
+    return number
+
+
+'''Add Contact'''
+@input_error
+def add_contact(name, phone, book):
+    record = book.find(name)
+    message = f"{Fore.BLUE}Contact updated.{Style.RESET_ALL}"
+    if record is None:
+        record = Record(name)
+        book.add_record(record)
+        message = f"{Fore.YELLOW}Contact added.{Style.RESET_ALL}"
+    if phone:
+        record.add_phone(phone)
+    return message
+
+
+@input_error
+def delete_contact(args, book):
+    if not args:
+        raise ValueError("Please provide the name of the contact to delete.")
+
+    name = args[0]
+    if book.find(name):
+        book.delete(name)
+        return f"{Fore.YELLOW}Contact '{name}' deleted.{Style.RESET_ALL}"
+    else:
+        raise contact_not_found(book, name)
+
+
+'''Change Contact'''
+@input_error
+def change_contact(args, book):
+    name, old_phone, new_phone = args
+    record = book.find(name)
+    if record:
+        record.edit_phone(old_phone, new_phone)
+        return f"{Fore.BLUE}Phone updated.{Style.RESET_ALL}"
+    else:
+        raise contact_not_found(book, name)
+
+
+'''Show Phone - Serch contact by Name/Phone'''
+@input_error
+def show_phone(args, book):
+    if not args:
+        raise ValueError("Please provide a search keyword (name or phone).")
+    
+    # шукаємо у іменах та номерах через триграмний індекс книги
+    results = [str(record) for record in book.search(args[0])]
+
+    if not results:
+        return "No matching contacts found." + did_you_mean(book.suggest_names(args[0]), Style.RESET_ALL)
+    # кожне входження з нового рядкаф
+    return '\n'.join(results)
+
+
+#---------------#
+'''Таблиця у форматі tabulate "grid" (по центру), що видається рядок за рядком'''
+PAGE_SIZE = 20
+CONTACT_HEADERS = ("Name", "Phones", "Birthday", "Email", "Address")
+
+
+def contact_cells(record):
+    return (record.name.value,
+            "\n".join(p.value for p in record.phones),
+            str(record.birthday) if record.birthday else "No birthday",
+            str(record.email) if record.email else "No email",
+            str(record.address) if record.address else "No address")
+
+
+def grid_widths(headers, rows):
+    # як у tabulate: колонка не вужча за заголовок + 2
+    widths = [len(header) + 2 for header in headers]
+    for row in rows:
+        for i, cell in enumerate(row):
+            for line in cell.split("\n"):
+                if len(line) > widths[i]:
+                    widths[i] = len(line)
+    return widths
+
+
+def _grid_row(cells, widths):
+    lines = [cell.split("\n") for cell in cells]
+    for i in range(max(map(len, lines))):
+        yield "|" + "|".join(f" {cell[i] if i < len(cell) else '':^{width}} "
+                             for cell, width in zip(lines, widths)) + "|"
+
+
+def grid_lines(headers, rows, widths, color=""):
+    '''Рядки таблиці; rows читається один раз, тож може бути генератором'''
+    border = "+" + "+".join("-" * (width + 2) for width in widths) + "+"
+    yield color + border
+    yield from _grid_row(headers, widths)
+    separator = border.replace("-", "=")
+    for row in rows:
+        yield separator
+        yield from _grid_row(row, widths)
+        separator = border
+    yield separator + (Style.RESET_ALL if color else "")
+
+
+'''Show all contacts'''
+@input_error
+def show_all(args, book):
+    '''all [--page N] [--size M] [--limit K]'''
+    _, options = parse_options(args, valued=("page", "size", "limit"))
+    if not book.data:
+        return f"{Fore.RED}No contacts found.{Style.RESET_ALL}"
+
+    start, stop = 0, None
+    if "page" in options or "size" in options:
+        size = positive_int(options.get("size", PAGE_SIZE), "page size")
+        start = (positive_int(options.get("page", 1), "page number") - 1) * size
+        stop = start + size
+    if "limit" in options:
+        limit = positive_int(options["limit"], "limit")
+        stop = start + limit if stop is None else min(stop, start + limit)
+
+    if start == 0 and stop is None:
+        # уся книга: ширини колонок - першим проходом, рядки таблиці - другим
+        widths = grid_widths(CONTACT_HEADERS, (contact_cells(record) for record in book.snapshot()))
+        rows = (contact_cells(record) for record in book.snapshot())
+    else:
+        # беремо лише імена потрібної сторінки, записи будуються тільки для неї
+        rows = [contact_cells(record) for record in book.page(start, stop)]
+        if not rows:
+            return f"{Fore.RED}No contacts on this page.{Style.RESET_ALL}"
+        widths = grid_widths(CONTACT_HEADERS, rows)
+    return grid_lines(CONTACT_HEADERS, rows, widths, Fore.GREEN)
+
+
+'''Add BD to Contact'''
+@input_error
+def add_birthday(args, book):
+    name, date = args
+    record = book.find(name)
+    if record:
+        record.add_birthday(date)
+        return f"{Fore.YELLOW}Birthday added.{Style.RESET_ALL}"
+    else:
+        raise contact_not_found(book, name)
+
+
+'''Show BD of Contact'''
+@input_error
+def show_birthday(args, book):
+    name = args[0]
+    record = book.find(name)
+    if record and record.birthday:
+        return f"{name}'s birthday is {Fore.YELLOW}{record.birthday}{Style.RESET_ALL}"
+    elif record:
+        return f"{Fore.BLUE}{name} has no birthday set.{Style.RESET_ALL}"
+    else:
+        raise contact_not_found(book, name)
+
+
+'''Upcoming BDs'''
+@input_error
+def birthdays(args, book):
+    bdays = book.get_upcoming_birthdays()
+    if not bdays:
+        return "No upcoming birthdays."
+    return '\n'.join([f"{b['name']} - {b['congratulation_date']}" for b in bdays])
+
+
+'''Birthdays in specified days'''
+@input_error
+def birthdays_in_days(args, book):
+    if not args:
+        raise ValueError("Please provide the number of days.")
+    
+    try:
+        days = int(args[0])
+        if days < 0:
+            raise ValueError("Number of days cannot be negative.")
+    except ValueError:
+        raise ValueError("Please provide a valid number of days.")
+    
+    bdays = book.get_birthdays_in_days(days)
+    if not bdays:
+        return f"No birthdays in the next {days} days."
+    
+    result = [f"Birthdays in the next {days} days:"]
+    for b in bdays:
+        if b['days_until'] == 0:
+            result.append(f"{b['name']} - TODAY ({b['birthday']})")
+        elif b['days_until'] == 1:
+            result.append(f"{b['name']} - TOMORROW ({b['birthday']})")
+        else:
+            result.append(f"{b['name']} - in {b['days_until']} days ({b['birthday']})")
+    
+    return '\n'.join(result)
+
+
+'''Add Email'''
+@input_error
+def add_email(args, book):
+    name, email = args
+    record = book.find(name)
+    if record:
+        record.add_email(email)
+        return "Email added."
+    else:
+        raise contact_not_found(book, name)
+
+
+'''Show Email'''
+@input_error
+def show_email(args, book):
+    name = args[0]
+    record = book.find(name)
+    if record and record.email:
+        return f"{name}'s email is {record.email}"
+    elif record:
+        return f"{Fore.BLUE}{name} has no email set.{Style.RESET_ALL}"
+    else:
+        raise contact_not_found(book, name)
+
+
+'''Remove PhoneNumber'''
+@input_error
+def remove_phone(args, book):
+    name, phone = args
+    record = book.find(name)
+    if record:
+        if record.find_phone(phone) is None:
+            raise ValueError(f"{Fore.RED}Phone number not found.{Style.RESET_ALL}")
+        record.remove_phone(phone)
+        return "Phone removed."
+    else:
+        raise contact_not_found(book, name)
+
+
+'''Add PhoneNumber'''
+@input_error
+def add_phone(args, book):
+    name, phone = args
+    record = book.find(name)
+    if record:
+        record.add_phone(phone)
+        return f"{Fore.YELLOW}Phone added.{Style.RESET_ALL}"
+    else:
+        raise contact_not_found(book, name)
+
+
+'''Who - reverse lookup of Contact by PhoneNumber'''
+@input_error
+def who_phone(args, book):
+    if not args:
+        raise ValueError("Please provide a phone number.")
+
+    records = book.find_by_phone(args[0])
+    if not records:
+        return f"{Fore.RED}No contacts with this phone.{Style.RESET_ALL}"
+    return '\n'.join(str(record) for record in records)
+
+
+'''Import / export contacts'''
+@input_error
+def import_contacts(args, book):
+    '''import <file> [--format csv|vcard|jsonl] [--rejects <file>] [--chunk N] [--replace]'''
+    args, options = parse_options(args, flags=("replace",), valued=("format", "rejects", "chunk"))
+    if not args:
+        raise ValueError(f"{Fore.RED}Please provide a file to import.{Style.RESET_ALL}")
+    path = ' '.join(args)
+    fmt = exchange_format(path, options.get("format"))
+    chunk_size = positive_int(options.get("chunk", IMPORT_CHUNK), "chunk size")
+    rejects_path = options.get("rejects", path + ".rejects.csv")
+    if not os.path.exists(path):
+        raise ValueError(f"File not found: {path}")
+    replace = options.get("replace", False)
+    imported, rejected, updated = import_file(book, path, fmt, chunk_size, rejects_path, replace)
+    message = f"{Fore.BLUE}Imported {imported} contacts.{Style.RESET_ALL}"
+    if updated and replace:
+        shown = ", ".join(updated[:10]) + (", ..." if len(updated) > 10 else "")
+        message += f" {Fore.YELLOW}Replaced {len(updated)} existing contacts: {shown}.{Style.RESET_ALL}"
+    elif updated:
+        message += f" {Fore.BLUE}{len(updated)} existing contacts updated.{Style.RESET_ALL}"
+    if rejected:
+        message += f" {Fore.YELLOW}{rejected} rows rejected, see {rejects_path}.{Style.RESET_ALL}"
+    return message
+
+
+@input_error
+def export_contacts(args, book):
+    '''export <file> [--format csv|vcard|jsonl]'''
+    args, options = parse_options(args, valued=("format",))
+    if not args:
+        raise ValueError(f"{Fore.RED}Please provide a file to export to.{Style.RESET_ALL}")
+    path = ' '.join(args)
+    count = export_file(book, path, exchange_format(path, options.get("format")))
+    return f"{Fore.BLUE}Exported {count} contacts to {path}.{Style.RESET_ALL}"
+
+
+#------ADDRESS FUNCTIONS------#
+'''Add Address'''
+@input_error
+def add_address(args, book):
+    name = args[0]
+    address = ' '.join(args[1:])  # Об'єднуємо всі аргументи після імені в адресу
+    record = book.find(name)
+    if record:
+        record.add_address(address)
+        return f"{Fore.YELLOW}Address added.{Style.RESET_ALL}"
+    else:
+        raise contact_not_found(book, name)
+
+
+'''Show Address'''
+@input_error
+def show_address(args, book):
+    name = args[0]
+    record = book.find(name)
+    if record and record.address:
+        return f"{name}'s address is {Fore.YELLOW}{record.address}{Style.RESET_ALL}"
+    elif record:
+        return f"{Fore.BLUE}{name} has no address set.{Style.RESET_ALL}"
+    else:
+        raise contact_not_found(book, name)
+
+
+#------Notes-----------------------------------------#
+'''Add Notes'''
+@input_error
+def add_note(text, tags, notebook):
+    note = Note(text, tags)
+    notebook.add_note(note)
+    return "Note added."
+
+
+@input_error
+def add_note_inline(args, notebook):
+    '''add-note <text> [--tags tag1;tag2] - без інтерактивних запитів'''
+    args, options = parse_options(args, valued=("tags",))
+    if not args:
+        raise ValueError(f"{Fore.RED}Please provide note text.{Style.RESET_ALL}")
+    tags = [tag.strip() for tag in options.get("tags", "").split(";") if tag.strip()]
+    return add_note(' '.join(args), tags, notebook)
+
+
+def _text_notes(f):
+    # рядок - текст нотатки, теги після " --tags " через ";" (як у add-note)
+    for line in f:
+        text, _, tags = line.strip().partition(" --tags ")
+        if text:
+            yield Note(text, [tag.strip() for tag in tags.split(";") if tag.strip()])
+
+
+def _jsonl_notes(f):
+    # {"text": ..., "tags": [...] або "t1;t2", "created": "2024-05-01T10:00:00"}
+    for line in f:
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+            text = item["text"]
+        except (ValueError, KeyError, TypeError):
+            yield None
+            continue
+        tags = item.get("tags") or []
+        if isinstance(tags, str):
+            tags = [tag.strip() for tag in tags.split(";") if tag.strip()]
+        note = Note(text, tags)
+        if item.get("created"):
+            try:
+                note.created = datetime.fromisoformat(item["created"])
+            except (ValueError, TypeError):
+                yield None
+                continue
+        yield note
+
+
+def import_notes(notebook, path, fmt, chunk_size):
+    '''Читає нотатки пачками по chunk_size і додає кожну пачку одним add_notes; повертає (додано, пропущено)'''
+    added = skipped = 0
+    with open(path, encoding="utf-8") as f:
+        notes = _jsonl_notes(f) if fmt == "jsonl" else _text_notes(f)
+        while True:
+            chunk = list(itertools.islice(notes, chunk_size))
+            if not chunk:
+                break
+            valid = [note for note in chunk if note is not None]
+            skipped += len(chunk) - len(valid)
+            notebook.add_notes(valid)
+            added += len(valid)
+    return added, skipped
+
+
+@input_error
+def add_notes_command(args, notebook):
+    '''add-notes <file> [--format text|jsonl] [--chunk N]'''
+    args, options = parse_options(args, valued=("format", "chunk"))
+    if not args:
+        raise ValueError(f"{Fore.RED}Please provide a file with notes.{Style.RESET_ALL}")
+    path = ' '.join(args)
+    fmt = options.get("format") or ("jsonl" if path.lower().endswith((".jsonl", ".ndjson")) else "text")
+    if fmt not in ("text", "jsonl"):
+        raise ValueError(f"Unsupported notes format '{fmt}'. Use text or jsonl.")
+    chunk_size = positive_int(options.get("chunk", IMPORT_CHUNK), "chunk size")
+    if not os.path.exists(path):
+        raise ValueError(f"File not found: {path}")
+    added, skipped = import_notes(notebook, path, fmt, chunk_size)
+    message = f"{Fore.BLUE}Added {added} notes.{Style.RESET_ALL}"
+    if skipped:
+        message += f" {Fore.YELLOW}{skipped} invalid lines skipped.{Style.RESET_ALL}"
+    return message
+
+
+'''Delete Notes'''
+@input_error
+def delete_note(args, notebook):
+    note_id = args[0]
+    if note_id in notebook.data:
+        notebook.delete_note(note_id)
+        return f"{Fore.YELLOW}Note {note_id} deleted.{Style.RESET_ALL}"
+    else:
+        return f"{Fore.RED}Note ID not found.{Style.RESET_ALL}"
+
+
+'''Show Notes'''
+NOTE_HEADERS = ("ID", "Text", "Tags", "Created")
+
+
+def note_cells(notebook, note_id, note, wrap_width):
+    return (str(note_id),
+            notebook.wrapped_text(note_id, note, wrap_width),
+            ', '.join(note.tags) if note.tags else "No tags",
+            note.created.strftime("%Y-%m-%d %H:%M") if note.created else "Unknown")
+
+
+@input_error
+def show_notes(args, notebook, wrap_width=40):
+    '''show-notes [--page N] [--size M] [--since DD.MM.YYYY]'''
+    _, options = parse_options(args, valued=("page", "size", "since"))
+    if not notebook.data:
+        return f"{Fore.RED}No notes found.{Style.RESET_ALL}"
+
+    if not options:
+        # усі нотатки: ширини колонок - першим проходом, рядки таблиці - другим
+        rows = (note_cells(notebook, note_id, note, wrap_width) for note_id, note in notebook.snapshot())
+        widths = grid_widths(NOTE_HEADERS, rows)
+        rows = (note_cells(notebook, note_id, note, wrap_width) for note_id, note in notebook.snapshot())
+        return grid_lines(NOTE_HEADERS, rows, widths, Fore.GREEN)
+
+    # з опціями - від найновіших нотаток, лише потрібна сторінка
+    since = None
+    if "since" in options:
+        try:
+            since = datetime.strptime(options["since"], "%d.%m.%Y")
+        except ValueError:
+            raise ValueError(f"{Fore.RED}Invalid date format.{Style.RESET_ALL}Use{Fore.YELLOW} <DD.MM.YYYY>{Style.RESET_ALL}")
+    start, stop = 0, None
+    if "page" in options or "size" in options:
+        size = positive_int(options.get("size", PAGE_SIZE), "page size")
+        start = (positive_int(options.get("page", 1), "page number") - 1) * size
+        stop = start + size
+
+    rows = [note_cells(notebook, note_id, note, wrap_width)
+            for note_id, note in notebook.recent_notes(start, stop, since)]
+    if not rows:
+        return f"{Fore.RED}No notes found.{Style.RESET_ALL}"
+    return grid_lines(NOTE_HEADERS, rows, grid_widths(NOTE_HEADERS, rows), Fore.GREEN)
+
+
+'''Search by Tag Notes'''
+@input_error
+def find_tag(args, notebook):
+    if not args:
+        raise ValueError(f"{Fore.RED}Please provide a tag to search.{Style.RESET_ALL}")
+
+    keyword = ' '.join(args)
+    results = notebook.query_tags(args)
+
+    if not results:
+        return f"{Fore.RED}No notes found with tag containing '{Fore.YELLOW}{keyword}{Fore.RED}'.{Style.RESET_ALL}"
+
+    return '\n'.join([str(note) for note in results])
+
+
+'''Serch Notes'''
+@input_error
+def find_note(args, notebook):
+    '''find-note <words...> [--phrase | --substring] [--limit N]
+    Типово шукає цілі слова (усі, з ранжуванням BM25): "meet" не знаходить "meeting" - для частин слів є --substring'''
+    args, options = parse_options(args, flags=("phrase", "substring"), valued=("limit",))
+    if not args:
+        raise ValueError(f"{Fore.RED}Please provide a keyword to search in note text.{Style.RESET_ALL}")
+    
+    keyword = ' '.join(args)
+    limit = positive_int(options["limit"], "limit") if "limit" in options else None
+    mode = "substring" if options.get("substring") else "phrase" if options.get("phrase") else "all"
+    results = notebook.search_text(keyword, mode=mode, limit=limit)
+
+    if not results:
+        message = f"{Fore.RED}No notes found containing '{Fore.RED}{keyword}{Fore.RED}'.{Style.RESET_ALL}"
+        if mode != "substring":
+            message += f" {Fore.YELLOW}Whole words are matched; use --substring to match parts of words.{Style.RESET_ALL}"
+        return message
+
+    return '\n'.join([str(note) for note in results])
+
+
+'''Edit Notes'''
+@input_error
+def edit_note_command(args, notebook):
+    if len(args) < 2:
+        raise ValueError(f"Usage: {Fore.YELLOW}edit-note <note_id> <new_text>{Style.RESET_ALL}")
+    
+    note_id = args[0]
+    new_text = ' '.join(args[1:])  # дозволяємо багатослівний текст
+
+    if note_id in notebook.data:
+        notebook.edit_note(note_id, new_text)
+        return f"Note {Fore.YELLOW}{note_id}{Style.RESET_ALL} updated."
+    else:
+        return f"{Fore.RED}Note ID not found.{Style.RESET_ALL}"
+
+
+@input_error
+def add_tag_command(args, notebook):
+    if len(args) < 2:
+        raise ValueError(f"Usage: {Fore.YELLOW}add-tag <note_id> <tag>{Style.RESET_ALL}")
+
+    note_id = args[0]
+    tag = args[1]
+
+    if note_id in notebook.data:
+        notebook.data[note_id].add_tag(tag)
+        return f"Tag '{Fore.YELLOW}{tag}{Style.RESET_ALL}' added to note {Fore.YELLOW}{note_id}{Style.RESET_ALL}."
+    else:
+        return f"{Fore.RED}Note ID not found.{Style.RESET_ALL}"
+
+
+@input_error
+def delete_tag_command(args, notebook):
+    if len(args) < 2:
+        raise ValueError("Usage: delete-tag <note_id> <tag>")
+
+    note_id = args[0]
+    tag = args[1]
+
+    if note_id in notebook.data:
+        note = notebook.data[note_id]
+        if tag in note.tags:
+            note.remove_tag(tag)
+            return f"Tag '{Fore.YELLOW}{tag}{Style.RESET_ALL}' removed from note {Fore.YELLOW}{ note_id}{Style.RESET_ALL}."
+        else:
+            return f"{Fore.RED}Tag '{Fore.YELLOW}{tag}{Fore.RED}' not found in note {Fore.YELLOW,}{note_id}{Fore.RED}.{Style.RESET_ALL}"
+    else:
+        return f"{Fore.RED}Note ID not found.{Style.RESET_ALL}"
+
+
+@input_error
+def sort_notes(args, notebook):
+    '''Sort Notes by parametrs:
+    sort-notes                       # за датою створення (від старих до нових)
+    sort-notes date desc             # за датою у зворотному порядку
+    sort-notes tag-count             # за кількістю тегів
+    sort-notes tag-count desc        # за кількістю тегів у зворотному порядку
+    sort-notes tag-name              # за алфавітом першого тегу
+    sort-notes date desc --top 10    # лише перші 10
+    sort-notes tag-count --page 2 --size 20
+'''
+    args, options = parse_options(args, valued=("top", "page", "size"))
+    sort_type = args[0].lower() if args else "date"
+    reverse = "desc" in args
+
+    start, stop = 0, None
+    if "top" in options:
+        stop = positive_int(options["top"], "number of notes")
+    if "page" in options or "size" in options:
+        size = positive_int(options.get("size", PAGE_SIZE), "page size")
+        start = (positive_int(options.get("page", 1), "page number") - 1) * size
+        stop = start + size if stop is None else min(start + size, stop)
+
+    sorted_notes = notebook.get_sorted_notes(sort_type=sort_type, reverse=reverse, start=start, stop=stop)
+
+    if not sorted_notes:
+        return f"{Fore.RED}No notes found.{Style.RESET_ALL}"
+
+    return '\n'.join([f"{note_id}: {note}" for note_id, note in sorted_notes])
+
+
+#---------------#
+'''Stats - лічильники команд з --stats'''
+STATS_HEADERS = ("Command", "Calls", "Errors", "Mean ms", "p50 ms", "p90 ms", "p99 ms", "Max ms", "Peak KiB")
+
+
+@input_error
+def show_stats(args):
+    if STATS is None:
+        return f"{Fore.YELLOW}Command statistics are off. Start the bot with --stats.{Style.RESET_ALL}"
+    if not STATS.commands:
+        return f"{Fore.YELLOW}No commands recorded yet.{Style.RESET_ALL}"
+    if args:
+        return command_stats(args[0])
+    rows = []
+    for command, stats in sorted(STATS.commands.items(), key=lambda item: item[1].total, reverse=True):
+        if not stats.calls:
+            continue    # сама команда stats, що зараз виконується
+        data = stats.to_dict()
+        rows.append((command, str(data["calls"]), str(sum(data["errors"].values())),
+                     *(f"{data[key]:.3f}" for key in ("mean_ms", "p50_ms", "p90_ms", "p99_ms", "max_ms")),
+                     f"{data['memory']['peak_kib']:.1f}" if "memory" in data else ""))
+    # percentiles - верхні межі кошиків гістограми (степені двійки мікросекунд)
+    return grid_lines(STATS_HEADERS, rows, grid_widths(STATS_HEADERS, rows))
+
+
+@input_error
+def show_cache(args):
+    '''cache [clear] - влучання й промахи кешу відповідей'''
+    if RESULT_CACHE is None:
+        return f"{Fore.YELLOW}Result cache is off. Start the bot with --result-cache-mb N.{Style.RESET_ALL}"
+    if args and args[0] == "clear":
+        RESULT_CACHE.clear()
+        return f"{Fore.BLUE}Result cache cleared.{Style.RESET_ALL}"
+    cache = RESULT_CACHE
+    lookups = cache.hits + cache.misses
+    rate = f" ({cache.hits / lookups:.1%} hits)" if lookups else ""
+    return (f"Result cache: {len(cache.entries)} entries, {cache.bytes / 1024:.1f} of {cache.max_bytes / 1024:.0f} KiB; "
+            f"{Fore.YELLOW}{cache.hits}{Style.RESET_ALL} hits, {Fore.YELLOW}{cache.misses}{Style.RESET_ALL} misses{rate}")
+
+
+def command_stats(command):
+    stats = STATS.commands.get(command)
+    if stats is None:
+        raise ValueError(f"No statistics for '{command}'.")
+    data = stats.to_dict()
+    lines = [f"{Fore.YELLOW}{command}{Style.RESET_ALL}: {data['calls']} calls, mean {data['mean_ms']:.3f} ms, max {data['max_ms']:.3f} ms"]
+    if data["errors"]:
+        lines.append("errors: " + ", ".join(f"{name} x{count}" for name, count in data["errors"].items()))
+    lines.extend(f"  {bound:>10} us: {count}" for bound, count in data["histogram_us"].items())
+    if "memory" in data:
+        memory = data["memory"]
+        lines.append(f"memory ({memory['samples']} samples): peak {memory['peak_kib']:.1f} KiB, "
+                     f"{memory['blocks_per_call']:.0f} blocks left per call")
+    for row in data.get("profile", []):
+        lines.append(f"  {row['cumulative_s'] * 1000:10.3f} ms cumulative  {row['calls']:>8} calls  {row['function']}")
+    return "\n".join(lines)
+
+
+#---------------#
+'''Corrective Command'''
+valide_comands = [
+    "close", "exit", "hello", "add", "change", "phone", "all", "add-birthday",
+    "show-birthday", "birthdays", "show", "remove-phone", "add-phone",
+    "add-email", "show-email", "add-address", "show-address", "who", "add-note",
+    "delete-note", "show-notes", "find-tag", "find-note", "edit-note",
+    "add-tag", "delete-tag"]
+
+
+@functools.lru_cache(maxsize=256)
+def closest_commands(command, commands):
+    # той самий неправильний ввід не порівнюємо з усіма командами повторно
+    return tuple(difflib.get_close_matches(command, commands, n=2, cutoff=0.6))
+
+
+@input_error
+def corective_command(command, valide_comands, args):
+    closest_matches = closest_commands(command, tuple(valide_comands))
+    if closest_matches:
+        return ' '.join([closest_matches[0]] + args[:])
+    return None
+
+
+#---------------#
+'''Menu'''
+def print_available_commands():
+    print(Fore.YELLOW + """
+    Control commands:    
+         hello                             - Greet the bot
+         close / exit                      - Exit the bot
+         show                              - Show all commands
+         stats [command]                   - Command latency and errors (with --stats)
+         cache [clear]                     - Result cache hits and misses
+         <Tab>                             - Complete commands, contact names and note ids
+          
+    Available commands for Addressbook:
+      add <name> <phone>                - Add a new contact
+      delete-contact                    - Delete contact
+      all [--page N] [--size M] [--limit K] - Show all contacts (or one page)
+      change <name> <old phone> <new phone>- Change existing contact's phone
+      search                            - Show the phone number of a contact      
+      add-birthday <name> <DD.MM.YYYY>  - Add BD to Contact
+      show-birthday <name>              - Show BD of Contact 
+      birthdays                         - Show upcoming birthdays (next 7 days)
+      birthdays-in <days>               - Show birthdays in next X days             
+      add-phone <name> <phone>          - Add phone to existing contact
+      remove-phone <name> <phone>       - Remove phone from contact
+      who <phone>                       - Find contact by phone number
+      import <file> [--format csv|vcard|jsonl] [--rejects <file>] [--replace] - Import contacts
+                                        (existing contacts are extended; --replace overwrites them)
+      export <file> [--format csv|vcard|jsonl] - Export contacts
+      add-email <name> <email>          - Add email to contact
+      show-email <name>                 - Show email of contact
+      add-address <name> <address>      - Add address to contact
+      show-address <name>               - Show address of contact
+    
+    Available commands for Notebook:    
+      add-note <text> [tags...]         - Add a note with optional tags
+      add-note <text> --tags <t1;t2>    - Add a note without prompts
+      add-notes <file> [--format text|jsonl] - Add many notes from a file ("text --tags t1;t2" per line)
+      delete-note <note_id>             - Delete a note by its ID
+      show-notes                        - Show all notes
+      show-notes [--page N] [--size M] [--since DD.MM.YYYY] - Show latest notes first
+      find-tag <tag>                    - Find notes by tag (partial match)
+      find-tag <tag> AND|OR|NOT <tag>   - Combine tags; <prefix>* matches tag prefix
+      find-note <words> [--phrase|--substring] [--limit N] - Find notes containing all the whole words
+                                        (--substring matches parts of words, like "meet" in "meeting")
+      edit-note <id> <new text>         - Edit text of an existing note
+      add-tag <id> <tag>                - Add a tag to a note
+      delete-tag <id> <tag>             - Remove a tag from a note
+      sort-notes [date|tag-count|tag-name] [desc] - Sort notes by selected method
+      sort-notes <key> [desc] [--top K] [--page N] [--size M] - Only the first K notes or one page
+    """ + Style.RESET_ALL)
+
+
+#---------------#
+'''Parser'''
+def parse_input(user_input):
+    cmd, *args = user_input.strip().split()
+    return cmd.lower(), args
+
+
+# ========== УТИЛІТИ ДЛЯ ВЗАЄМОДІЇ ========== #
+def ask_note():
+    print("Please enter your note text:")
+    text = input(">>> ").strip()
+
+    print("Please enter your tags for this note (separated by ';' or press Enter to skip):")
+    raw_tags = input(">>> ").strip()
+    tags = [tag.strip() for tag in raw_tags.split(";") if tag.strip()] if raw_tags else []
+    return text, tags
+
+
+def handle_add_note_interactive(notebook):
+    text, tags = ask_note()
+    return add_note(text, tags, notebook)
+
+
+def prompt_add_note():
+    '''add-note без аргументів: текст і теги питаємо одразу, а обробник лише додає нотатку'''
+    text, tags = ask_note()
+    return lambda args, book, notebook: add_note(text, tags, notebook)
+
+
+def handle_show_commands(args, book, notebook):
+    print_available_commands()
+    return ""
+
+
+# команди, що без аргументів питають дані в консолі: відповіді збираються до виконання команди,
+# щоб вона не тримала дані (і автозбереження) відкритими, поки користувач друкує
+INTERACTIVE_COMMANDS = {"add-note": prompt_add_note}
+
+# ========== СЛОВНИК КОМАНД ========== #
+COMMANDS = {
+    "hello": lambda args, book, notebook: "How can I help you?",
+    "add": lambda args, book, notebook: add_contact(args[0], args[1], book) if len(args) >= 2 else f"{Fore.RED}Usage: add <name> <phone>{Style.RESET_ALL}",
+    "change": lambda args, book, notebook: change_contact(args, book),
+    "phone": lambda args, book, notebook: show_phone(args, book),
+    "search": lambda args, book, notebook: show_phone(args, book),
+    "all": lambda args, book, notebook: show_all(args, book),
+    "add-birthday": lambda args, book, notebook: add_birthday(args, book),
+    "show-birthday": lambda args, book, notebook: show_birthday(args, book),
+    "birthdays": lambda args, book, notebook: birthdays(args, book),
+    "birthdays-in": lambda args, book, notebook: birthdays_in_days(args, book),
+    "remove-phone": lambda args, book, notebook: remove_phone(args, book),
+    "add-phone": lambda args, book, notebook: add_phone(args, book),
+    "who": lambda args, book, notebook: who_phone(args, book),
+    "import": lambda args, book, notebook: import_contacts(args, book),
+    "export": lambda args, book, notebook: export_contacts(args, book),
+    "add-email": lambda args, book, notebook: add_email(args, book),
+    "show-email": lambda args, book, notebook: show_email(args, book),
+    "add-address": lambda args, book, notebook: add_address(args, book),
+    "show-address": lambda args, book, notebook: show_address(args, book),
+    "delete-contact": lambda args, book, notebook: delete_contact(args, book),
+    "add-note": lambda args, book, notebook: add_note_inline(args, notebook) if args else handle_add_note_interactive(notebook),
+    "add-notes": lambda args, book, notebook: add_notes_command(args, notebook),
+    "delete-note": lambda args, book, notebook: delete_note(args, notebook),
+    "show-notes": lambda args, book, notebook: show_notes(args, notebook),
+    "find-tag": lambda args, book, notebook: find_tag(args, notebook),
+    "find-note": lambda args, book, notebook: find_note(args, notebook),
+    "edit-note": lambda args, book, notebook: edit_note_command(args, notebook),
+    "add-tag": lambda args, book, notebook: add_tag_command(args, notebook),
+    "delete-tag": lambda args, book, notebook: delete_tag_command(args, notebook),
+    "sort-notes": lambda args, book, notebook: sort_notes(args, notebook),
+    "stats": lambda args, book, notebook: show_stats(args),
+    "cache": lambda args, book, notebook: show_cache(args),
+    "show": handle_show_commands
+}
+
+# на які дані чекає команда, поки вони ще завантажуються; решта команд працює з книгою
+NOTEBOOK_COMMANDS = {"add-note", "add-notes", "delete-note", "show-notes", "find-tag", "find-note",
+                     "edit-note", "add-tag", "delete-tag", "sort-notes"}
+NO_DATA_COMMANDS = {"hello", "show", "stats", "cache"}
+
+# у пакетному режимі нічого не запитуємо: add-note лише з текстом у рядку
+BATCH_COMMANDS = {**COMMANDS, "add-note": lambda args, book, notebook: add_note_inline(args, notebook)}
+
+
+#---------------#
+# кольори консолі; пакетний режим і сервер відповідають без них
+ANSI_CODES = re.compile(r"\x1b\[[0-9;]*m")
@@ -0,0 +1,287 @@
+'''Потокобезпечні варіанти книги й нотатника'''
+import threading
+import contextlib
+from .models import AddressBook, Notebook
+
+
+'''Блокування "багато читачів або один письменник" для потоків; письменник, що чекає, має пріоритет.
+Потік, що пише, може знову брати блокування запису чи читання; потік, що читає, - лише читання
+(перехід від читання до запису - RuntimeError). Читання, взяте всередині запису і не відпущене до кінця
+запису, стає звичайним читанням'''
+class RWLock:
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._waiting_writers = 0
+        self._writer = None     # ident потоку, що пише
+        self._writes = 0        # глибина повторних входів письменника
+        self._local = threading.local()
+
+    def acquire_read(self):
+        depth = getattr(self._local, "reads", 0)
+        if depth:
+            # вкладене читання не чекає - інакше письменник у черзі заблокував би обох
+            self._local.reads = depth + 1
+            return
+        if self._writer == threading.get_ident():
+            # читання всередині запису не рахується серед читачів
+            self._local.reads = 1
+            self._local.counted = False
+            return
+        with self._condition:
+            while self._writer is not None or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        self._local.reads = 1
+        self._local.counted = True
+
+    def release_read(self):
+        self._local.reads -= 1
+        if self._local.reads or not self._local.counted:
+            return
+        with self._condition:
+            self._readers -= 1
+            if not self._readers:
+                self._condition.notify_all()
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        if self._writer == me:
+            self._writes += 1
+            return
+        if getattr(self._local, "reads", 0):
+            raise RuntimeError("Cannot upgrade a read lock to a write lock.")
+        with self._condition:
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = me
+            self._writes = 1
+
+    def release_write(self):
+        self._writes -= 1
+        if not self._writes:
+            with self._condition:
+                if getattr(self._local, "reads", 0) and not self._local.counted:
+                    # читання, взяте під час запису, ще триває - тепер воно звичайний читач
+                    self._readers += 1
+                    self._local.counted = True
+                self._writer = None
+                self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextlib.contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+#------THREAD-SAFE CONTAINERS------#
+'''Книга для кількох потоків. Зміни йдуть під блокуванням запису, запити до індексів - під
+блокуванням читання. Довгі перебори (таблиця, пошук коротким словом, експорт) йдуть по знімку
+списку записів: письменник чекає лише, поки знімок скопіюється, а не весь перебір'''
+class ConcurrentAddressBook(AddressBook):
+    def _init_indexes(self):
+        super()._init_indexes()
+        self._lock = RWLock()
+        # ліниву побудову індексу і кеш NameIndex читачі змінюють по черзі
+        self._index_lock = threading.RLock()
+        self._snapshot = None
+
+    def __getstate__(self):
+        with self._lock.read():
+            return {'data': dict(self.data)}
+
+    def __reduce__(self):
+        # у файл пишемо звичайну книгу - потокобезпечною її робить той, хто відкриває
+        return (AddressBook, (), self.__getstate__())
+
+    @classmethod
+    def from_book(cls, book, lock=None):
+        '''Переносить записи і журнал звичайної книги (напр. з load_data) у потокобезпечну;
+        lock - RWLock, спільний з іншими даними (напр. з нотатником)'''
+        concurrent = cls()
+        concurrent.__setstate__({'data': book.data})
+        concurrent._journal = book._journal
+        concurrent._version, concurrent._saved_version = book._version, book._saved_version
+        if lock is not None:
+            concurrent._lock = lock
+        return concurrent
+
+    def _use(self, index):
+        if not index.built:
+            with self._index_lock:
+                super()._use(index)
+        return index
+
+    def _use_names(self, index):
+        if not index.built:
+            with self._index_lock:
+                super()._use_names(index)
+        return index
+
+    def commit(self):
+        with self._lock.write():
+            super().commit()
+
+    def add_record(self, record):
+        with self._lock.write():
+            super().add_record(record)
+            self._snapshot = None
+
+    def add_records(self, records):
+        with self._lock.write():
+            super().add_records(records)
+            self._snapshot = None
+
+    def delete(self, name):
+        with self._lock.write():
+            super().delete(name)
+            self._snapshot = None
+
+    def snapshot(self):
+        with self._lock.read():
+            # поки склад книги не змінився, усі читачі ділять одну копію
+            if self._snapshot is None:
+                self._snapshot = list(self.data.values())
+            return self._snapshot
+
+    def page(self, start, stop):
+        with self._lock.read():
+            return super().page(start, stop)
+
+    def existing_records(self, names):
+        with self._lock.read():
+            return super().existing_records(names)
+
+    def suggest_names(self, name, limit=5):
+        with self._lock.read(), self._index_lock:
+            return super().suggest_names(name, limit)
+
+    def complete_names(self, prefix, limit=None):
+        with self._lock.read():
+            return super().complete_names(prefix, limit)
+
+    def _find_phone(self, record, value):
+        with self._lock.read():
+            return super()._find_phone(record, value)
+
+    def find_by_phone(self, phone_number):
+        with self._lock.read():
+            return super().find_by_phone(phone_number)
+
+    def _candidates(self, keyword):
+        # кандидатів беремо під блокуванням, перевіряємо вже без нього
+        with self._lock.read():
+            return super()._candidates(keyword)
+
+    def _birthdays(self, start, end):
+        # дати і форматування рахуються вже без блокування
+        with self._lock.read():
+            return list(super()._birthdays(start, end))
+
+
+'''Нотатник для кількох потоків - за тими ж правилами, що й ConcurrentAddressBook'''
+class ConcurrentNotebook(Notebook):
+    def _init_indexes(self):
+        super()._init_indexes()
+        self._lock = RWLock()
+        self._index_lock = threading.RLock()
+        self._snapshot = None
+
+    def __getstate__(self):
+        with self._lock.read():
+            return {'data': dict(self.data)}
+
+    def __reduce__(self):
+        return (Notebook, (), self.__getstate__())
+
+    @classmethod
+    def from_notebook(cls, notebook, lock=None):
+        concurrent = cls()
+        concurrent.__setstate__({'data': notebook.data})
+        concurrent._journal = notebook._journal
+        concurrent._version, concurrent._saved_version = notebook._version, notebook._saved_version
+        if lock is not None:
+            concurrent._lock = lock
+        return concurrent
+
+    def _use(self, index):
+        if not index.built:
+            with self._index_lock:
+                super()._use(index)
+        return index
+
+    def commit(self):
+        with self._lock.write():
+            super().commit()
+
+    def add_note(self, note):
+        # id видаються під тим самим блокуванням, що й додавання
+        with self._lock.write():
+            super().add_note(note)
+
+    def add_notes(self, notes):
+        with self._lock.write():
+            super().add_notes(notes)
+            self._snapshot = None
+
+    def _put_note(self, note_id, note):
+        with self._lock.write():
+            super()._put_note(note_id, note)
+            self._snapshot = None
+
+    def delete_note(self, note_id):
+        with self._lock.write():
+            super().delete_note(note_id)
+            self._snapshot = None
+
+    def edit_note(self, note_id, new_text):
+        with self._lock.write():
+            super().edit_note(note_id, new_text)
+
+    def snapshot(self):
+        with self._lock.read():
+            if self._snapshot is None:
+                self._snapshot = list(self.data.items())
+            return self._snapshot
+
+    def find_by_tag(self, keyword):
+        with self._lock.read():
+            return super().find_by_tag(keyword)
+
+    def query_tags(self, words):
+        with self._lock.read():
+            return super().query_tags(words)
+
+    def search_text(self, keyword, mode="all", limit=None):
+        if mode == "substring":
+            # перебір по знімку - без блокування
+            return super().search_text(keyword, mode, limit)
+        with self._lock.read():
+            return super().search_text(keyword, mode, limit)
+
+    def recent_notes(self, start=0, stop=None, since=None):
+        with self._lock.read():
+            return super().recent_notes(start, stop, since)
+
+    def get_sorted_notes(self, sort_type="date", reverse=False, start=0, stop=None):
+        with self._lock.read():
+            return super().get_sorted_notes(sort_type, reverse, start, stop)
+
+    def complete_ids(self, prefix, limit=None):
+        with self._lock.read():
+            return super().complete_ids(prefix, limit)
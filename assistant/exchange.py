@@ -0,0 +1,260 @@
+'''Імпорт та експорт контактів'''
+import os
+import csv
+import json
+import re
+import itertools
+from datetime import datetime
+from .models import Email, Phone, record_values
+from .storage.snapshot import MappedAddressBook, record_row
+
+
+#------IMPORT / EXPORT------#
+'''Потоковий обмін контактами: CSV, vCard, JSON Lines. Файл читається частинами по chunk_size рядків'''
+EXCHANGE_COLUMNS = ["name", "phones", "birthday", "email", "address"]
+EXCHANGE_FORMATS = {".csv": "csv", ".vcf": "vcard", ".vcard": "vcard", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+IMPORT_CHUNK = 50000
+
+
+def exchange_format(path, fmt=None):
+    if fmt is None:
+        fmt = EXCHANGE_FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt not in ("csv", "vcard", "jsonl"):
+        raise ValueError("Unknown file format. Use --format csv|vcard|jsonl.")
+    return fmt
+
+
+def _vcard_escape(value):
+    return value.replace("\\", "\\\\").replace(",", "\\,").replace(";", "\\;").replace("\n", "\\n")
+
+
+def _vcard_unescape(value):
+    return re.sub(r"\\(.)", lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+
+
+def _vcard_lines(f):
+    '''Логічні рядки vCard: перенесені рядки (продовження з пробілу чи табуляції) склеюються'''
+    number, current = 0, None
+    for i, line in enumerate(f, 1):
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield number, current
+        number, current = i, line
+    if current is not None:
+        yield number, current
+
+
+def _vcard_rows(f):
+    '''Рядки-словники з файлу vCard; line - номер рядка BEGIN:VCARD'''
+    row = None
+    for number, line in _vcard_lines(f):
+        key, _, value = line.partition(":")
+        prop = key.split(";")[0].split(".")[-1].upper()
+        if prop == "BEGIN":
+            row = {"line": number, "name": "", "phones": [], "birthday": "", "email": "", "address": ""}
+        elif row is None:
+            continue
+        elif prop == "END":
+            row["phones"] = ";".join(row["phones"])
+            yield row
+            row = None
+        elif prop == "FN":
+            row["name"] = _vcard_unescape(value)
+        elif prop == "TEL":
+            row["phones"].append(_vcard_unescape(value))
+        elif prop == "BDAY":
+            digits = value.replace("-", "")
+            # 1990-01-31 або 19900131 -> 31.01.1990
+            row["birthday"] = f"{digits[6:8]}.{digits[4:6]}.{digits[:4]}" if len(digits) == 8 else value
+        elif prop == "EMAIL" and not row["email"]:
+            row["email"] = _vcard_unescape(value)
+        elif prop == "ADR" and not row["address"]:
+            parts = re.split(r"(?<!\\);", value)
+            row["address"] = ", ".join(_vcard_unescape(part) for part in parts if part)
+
+
+def _jsonl_rows(f):
+    for number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            item = None
+        if not isinstance(item, dict):
+            yield {"line": number, "error": "invalid JSON object"}
+            continue
+        phones = item.get("phones") or []
+        yield {"line": number,
+               "name": str(item.get("name") or ""),
+               "phones": ";".join(map(str, phones)) if isinstance(phones, list) else str(phones),
+               "birthday": str(item.get("birthday") or ""),
+               "email": str(item.get("email") or ""),
+               "address": str(item.get("address") or "")}
+
+
+def read_chunks(path, fmt, chunk_size):
+    '''DataFrame по chunk_size рядків з колонками EXCHANGE_COLUMNS, line і error'''
+    import pandas as pd
+    if fmt == "csv":
+        reader = pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunk_size)
+        with reader:
+            for chunk in reader:
+                chunk = chunk.reindex(columns=EXCHANGE_COLUMNS, fill_value="")
+                chunk["line"] = chunk.index + 2     # рядок 1 - заголовок
+                chunk["error"] = ""
+                yield chunk
+        return
+    with open(path, encoding="utf-8") as f:
+        rows = _vcard_rows(f) if fmt == "vcard" else _jsonl_rows(f)
+        while True:
+            batch = list(itertools.islice(rows, chunk_size))
+            if not batch:
+                break
+            chunk = pd.DataFrame.from_records(batch).reindex(columns=EXCHANGE_COLUMNS + ["line", "error"])
+            yield chunk.fillna("")
+
+
+# правила Phone одним виразом: +380 і 9 символів, 380 і 9, 0 і 9, або 10 цифр.
+# Після CLEANUP лишаються тільки цифри та "+", тож "10 символів без +" - це isdigit() з Phone.
+# У всіх чотирьох випадках результат - "+380" і захоплена частина.
+PHONE_RULES = r"^(?:\+?380(?=.{9}$)|0(?=.{9}$)|(?=[^+]{10}$))(.*)$"
+
+
+def normalize_phones(raw):
+    '''Векторна копія правил Phone: Series сирих номерів -> канонічні номери (NaN - невалідний)'''
+    cleaned = raw.str.replace(Phone.CLEANUP, "", regex=True)
+    return "+380" + cleaned.str.extract(PHONE_RULES, expand=False)
+
+
+def validate_chunk(chunk):
+    '''Перевіряє частину файлу цілими колонками.
+    Повертає (рядки (name, phones, birthday, email, address) для add_rows, відхилені рядки з причиною)'''
+    import pandas as pd
+    chunk = chunk.reset_index(drop=True)
+    reasons = chunk["error"].astype(object)
+
+    def reject(mask, reason):
+        fresh = mask & (reasons == "")
+        reasons[fresh] = reason.reindex(reasons.index)[fresh] if isinstance(reason, pd.Series) else reason
+
+    names = chunk["name"].str.strip()
+    reject(names == "", "missing name")
+
+    # колонка на кожен по черзі номер контакту; невалідний номер відхиляє весь контакт
+    phone_columns = []
+    for _, phones in chunk["phones"].str.split(";", expand=True).items():
+        phones = phones.str.strip()
+        phones = phones.where(phones != "")
+        normalized = normalize_phones(phones)
+        bad = phones.notna() & normalized.isna()
+        if bad.any():
+            reject(bad, "invalid phone '" + phones[bad] + "'")
+        phone_columns.append(normalized.to_numpy())
+
+    emails = chunk["email"].str.strip()
+    reject((emails != "") & ~emails.str.fullmatch(Email.PATTERN), "invalid email")
+
+    # різних дат у файлі значно менше, ніж рядків: кожну розбираємо один раз, як Birthday
+    birthdays = chunk["birthday"].str.strip()
+    parsed_dates = {}
+    for value in birthdays.unique():
+        try:
+            parsed_dates[value] = datetime.strptime(value, "%d.%m.%Y").date()
+        except ValueError:
+            parsed_dates[value] = None
+    dates = birthdays.map(parsed_dates)
+    reject((birthdays != "") & dates.isna(), "invalid birthday")
+
+    addresses = chunk["address"].str.strip()
+
+    ok = (reasons == "").to_numpy()
+    phones = zip(*(column[ok] for column in phone_columns))
+    rows = [(name, [phone for phone in numbers if type(phone) is str], birthday or None, email or None, address or None)
+            for name, numbers, birthday, email, address
+            in zip(names[ok], phones, dates[ok], emails[ok], addresses[ok])]
+    return rows, chunk[~ok].assign(reason=reasons[~ok])
+
+
+def merge_rows(book, rows):
+    '''Рядки з іменами, що вже є в книзі чи раніше в rows, доповнюють контакт, як add: нові номери дописуються,
+    поле перезаписується лише непорожнім значенням. Повертає (рядки для add_rows, імена, що вже були в книзі)'''
+    names = list(dict.fromkeys(row[0] for row in rows))
+    merged = {record.name.value: record_values(record) for record in book.existing_records(names)}
+    existing = [name for name in names if name in merged]
+    for name, phones, birthday, email, address in rows:
+        current = merged.get(name)
+        if current is None:
+            merged[name] = (name, list(dict.fromkeys(phones)), birthday, email, address)
+            continue
+        _, old_phones, old_birthday, old_email, old_address = current
+        merged[name] = (name, old_phones + [phone for phone in dict.fromkeys(phones) if phone not in old_phones],
+                        birthday or old_birthday, email or old_email, address or old_address)
+    return list(merged.values()), existing
+
+
+def import_file(book, path, fmt, chunk_size, rejects_path, replace=False):
+    '''replace - рядок замінює наявний контакт цілком, інакше доповнює його (merge_rows).
+    Повертає (кількість імпортованих, кількість відхилених, імена контактів, що вже були в книзі)'''
+    imported = rejected = 0
+    updated = []
+    rejects = None
+    try:
+        for chunk in read_chunks(path, fmt, chunk_size):
+            rows, bad = validate_chunk(chunk)
+            if replace:
+                existing = {record.name.value for record in book.existing_records(list({row[0] for row in rows}))}
+                updated += [name for name in dict.fromkeys(row[0] for row in rows) if name in existing]
+            else:
+                rows, existing = merge_rows(book, rows)
+                updated += existing
+            book.add_rows(rows)
+            imported += len(rows)
+            if len(bad):
+                if rejects is None:
+                    rejects = open(rejects_path, "w", newline="", encoding="utf-8")
+                    writer = csv.writer(rejects)
+                    writer.writerow(["line", "reason"] + EXCHANGE_COLUMNS)
+                writer.writerows(bad[["line", "reason"] + EXCHANGE_COLUMNS].itertuples(index=False))
+                rejected += len(bad)
+    finally:
+        if rejects is not None:
+            rejects.close()
+    return imported, rejected, updated
+
+
+def export_rows(book):
+    if isinstance(book, MappedAddressBook):
+        return book.data.rows()
+    return (record_row(record) for record in book.snapshot())
+
+
+def export_file(book, path, fmt):
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            writer = csv.writer(f)
+            writer.writerow(EXCHANGE_COLUMNS)
+        for name, phones, birthday, email, address in export_rows(book):
+            if fmt == "csv":
+                writer.writerow([name, ";".join(phones), birthday, email, address])
+            elif fmt == "jsonl":
+                f.write(json.dumps({"name": name, "phones": phones, "birthday": birthday or None,
+                                    "email": email or None, "address": address or None}, ensure_ascii=False) + "\n")
+            else:
+                lines = ["BEGIN:VCARD", "VERSION:3.0", f"FN:{_vcard_escape(name)}", f"N:{_vcard_escape(name)};;;;"]
+                lines += [f"TEL;TYPE=CELL:{phone}" for phone in phones]
+                if birthday:
+                    day, month, year = birthday.split(".")
+                    lines.append(f"BDAY:{year}-{month}-{day}")
+                if email:
+                    lines.append(f"EMAIL:{_vcard_escape(email)}")
+                if address:
+                    lines.append(f"ADR:;;{_vcard_escape(address)};;;;")
+                lines.append("END:VCARD")
+                f.write("\r\n".join(lines) + "\r\n")
+            count += 1
+    return count
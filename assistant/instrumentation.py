@@ -0,0 +1,232 @@
+'''Статистика команд і кеш відповідей'''
+import time
+import sys
+import json
+import math
+from collections import OrderedDict
+from datetime import datetime
+
+
+#------INSTRUMENTATION------#
+'''Лічильники команд: кількість викликів, гістограма часу, помилки; вмикається --stats'''
+class CommandStats:
+    # кошик i гістограми - час до 2**i мікросекунд; останній - усе довше
+    BUCKETS = 28
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.histogram = [0] * self.BUCKETS
+        self.errors = {}
+        self.samples = 0
+        self.peak_bytes = 0
+        self.blocks = 0
+        self.profile = None
+
+    def record(self, elapsed):
+        self.calls += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+        self.histogram[min(int(elapsed * 1_000_000).bit_length(), self.BUCKETS - 1)] += 1
+
+    def percentile(self, fraction):
+        '''Верхня межа кошика гістограми, у мс'''
+        rank = max(1, math.ceil(self.calls * fraction))
+        for bucket, count in enumerate(self.histogram):
+            rank -= count
+            if rank <= 0:
+                return min(2 ** bucket / 1000, self.max * 1000)
+        return self.max * 1000
+
+    def to_dict(self):
+        result = {
+            "calls": self.calls,
+            "errors": dict(self.errors),
+            "mean_ms": self.total / self.calls * 1000 if self.calls else 0.0,
+            "p50_ms": self.percentile(0.50),
+            "p90_ms": self.percentile(0.90),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": self.max * 1000,
+            "histogram_us": {f"<{2 ** bucket}": count for bucket, count in enumerate(self.histogram) if count},
+        }
+        if self.samples:
+            result["memory"] = {"samples": self.samples, "peak_kib": self.peak_bytes / 1024,
+                                "blocks_per_call": self.blocks / self.samples}
+        if self.profile is not None:
+            result["profile"] = profile_top(self.profile)
+        return result
+
+
+def profile_top(profile, limit=10):
+    '''Найдорожчі функції профілю за сукупним часом'''
+    import pstats
+    rows = pstats.Stats(profile).stats.items()
+    top = sorted(rows, key=lambda row: row[1][3], reverse=True)[:limit]
+    return [{"function": f"{filename}:{line}({name})", "calls": calls, "total_s": total, "cumulative_s": cumulative}
+            for (filename, line, name), (_, calls, total, cumulative, _) in top]
+
+
+class Instrumentation:
+    def __init__(self, memory_every=0, profile_every=0):
+        self.memory_every = memory_every
+        self.profile_every = profile_every
+        self.commands = {}
+        self.current = None
+        self.started = datetime.now()
+
+    def call(self, command, handler, args, book, notebook):
+        stats = self.commands.get(command)
+        if stats is None:
+            stats = self.commands[command] = CommandStats()
+        number = stats.calls + 1
+        if (self.memory_every and number % self.memory_every == 0) or \
+                (self.profile_every and number % self.profile_every == 0):
+            return self._sampled(stats, number, command, handler, args, book, notebook)
+
+        self.current = stats
+        started = time.perf_counter()
+        try:
+            result = handler(args, book, notebook)
+        except Exception as error:
+            stats.record(time.perf_counter() - started)
+            self.error(error)
+            raise
+        finally:
+            self.current = None
+        elapsed = time.perf_counter() - started
+        if result is None or isinstance(result, str):
+            stats.record(elapsed)
+            return result
+        # генератор рядків: до часу команди додається час видачі кожного рядка
+        return self._timed_lines(stats, result, elapsed)
+
+    def _timed_lines(self, stats, lines, elapsed):
+        lines = iter(lines)
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    line = next(lines)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed += time.perf_counter() - started
+                yield line
+        finally:
+            stats.record(elapsed)
+
+    def _sampled(self, stats, number, command, handler, args, book, notebook):
+        # вибірковий виклик виконується повністю (рядки збираються в список),
+        # щоб пам'ять і профіль стосувалися лише команди, а не друку відповіді
+        import cProfile
+        import tracemalloc
+        trace = self.memory_every and number % self.memory_every == 0
+        profile = self.profile_every and number % self.profile_every == 0
+        own_trace = trace and not tracemalloc.is_tracing()
+        if own_trace:
+            tracemalloc.start()
+        if trace:
+            tracemalloc.reset_peak()
+            before_bytes = tracemalloc.get_traced_memory()[0]
+            before_blocks = sys.getallocatedblocks()
+        if profile:
+            if stats.profile is None:
+                stats.profile = cProfile.Profile()
+            stats.profile.enable()
+        self.current = stats
+        started = time.perf_counter()
+        try:
+            result = handler(args, book, notebook)
+            if result is not None and not isinstance(result, str):
+                result = list(result)
+        except Exception as error:
+            self.error(error)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.current = None
+            if profile:
+                stats.profile.disable()
+            if trace:
+                stats.samples += 1
+                stats.peak_bytes = max(stats.peak_bytes, tracemalloc.get_traced_memory()[1] - before_bytes)
+                stats.blocks += sys.getallocatedblocks() - before_blocks
+            if own_trace:
+                tracemalloc.stop()
+            stats.record(elapsed)
+        return result
+
+    def error(self, error):
+        '''Помилка поточної команди (у т.ч. перехоплена input_error)'''
+        if self.current is not None:
+            name = type(error).__name__
+            self.current.errors[name] = self.current.errors.get(name, 0) + 1
+
+    def to_dict(self, result_cache=None):
+        data = {"started": self.started.isoformat(timespec="seconds"),
+                "memory_every": self.memory_every,
+                "profile_every": self.profile_every,
+                "commands": {command: stats.to_dict() for command, stats in sorted(self.commands.items())}}
+        if result_cache is not None:
+            data["result_cache"] = result_cache.to_dict()
+        return data
+
+    def dump(self, filename, result_cache=None):
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(result_cache), f, indent=2)
+
+
+#---------------#
+'''Кеш відповідей команд, що лише читають. Ключ - команда з аргументами (і сьогоднішня дата для днів
+народження); відповідь дійсна, поки не змінилося покоління (_version) книги чи нотатника, з якими
+працює команда. Найдавніше використані відповіді витісняються, коли кеш перевищує max_bytes'''
+class ResultCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()    # ключ -> (покоління, відповідь, розмір)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _size(result):
+        if result is None or isinstance(result, str):
+            return sys.getsizeof(result)
+        return sys.getsizeof(result) + sum(sys.getsizeof(line) for line in result)
+
+    def call(self, key, generation, compute):
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == generation:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        result = compute()
+        if result is not None and not isinstance(result, str):
+            # генератор рядків таблиці можна пройти лише раз
+            result = list(result)
+        self._put(key, generation, result)
+        return result
+
+    def _put(self, key, generation, result):
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old[2]
+        size = self._size(result)
+        if size > self.max_bytes:
+            return      # завелика відповідь витіснила б увесь кеш
+        self.entries[key] = (generation, result, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, _, evicted) = self.entries.popitem(last=False)
+            self.bytes -= evicted
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def to_dict(self):
+        return {"entries": len(self.entries), "bytes": self.bytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,1453 @@
+'''Поля, записи, нотатки та їхні контейнери з індексами'''
+import sys
+import copy
+from colorama import Fore, Style  #for color text
+import re
+import math
+import heapq
+import itertools
+import calendar
+from bisect import bisect_left, bisect_right, insort
+from collections import UserDict, OrderedDict
+from datetime import datetime, timedelta, date
+
+
+ #--------------#   
+'''Базовий клас для полів запису'''
+class Field:
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return str(self.value)
+
+    def __getstate__(self):
+        # той самий стан, що й до __slots__, - старі й нові pickle сумісні
+        return {'value': self.value}
+
+    def __setstate__(self, state):
+        self.value = state['value']
+
+
+ #--------------#   
+'''Клас для зберігання імені контакту. Обов'язкове поле.'''
+class Name(Field):
+    __slots__ = ()
+
+
+#--------------#   
+'''Клас Birthday з можливістю додавання поля для дня народження до контакту'''
+class Birthday(Field):
+    __slots__ = ()
+
+    def __init__(self, value):
+        try:
+            self.value = datetime.strptime(value, "%d.%m.%Y").date()
+        except ValueError:
+            raise ValueError(f"{Fore.RED}Invalid date format.{Style.RESET_ALL}Use{Fore.YELLOW} <DD.MM.YYYY>{Style.RESET_ALL}")
+
+    def __str__(self):
+        return self.value.strftime("%d.%m.%Y")
+
+
+#--------------#   
+'''Клас для зберігання номера телефону з покращеною валідацією'''
+class Phone(Field):
+    __slots__ = ()
+    CLEANUP = r'[^\d+]'
+
+    def __init__(self, value):
+        # Очищаємо номер від спеціальних символів
+        cleaned = re.sub(self.CLEANUP, '', value)
+        
+        # Перевіряємо різні формати
+        if cleaned.startswith('+380') and len(cleaned) == 13:
+            self.value = cleaned
+        elif cleaned.startswith('380') and len(cleaned) == 12:
+            self.value = '+' + cleaned
+        elif cleaned.startswith('0') and len(cleaned) == 10:
+            self.value = '+38' + cleaned
+        elif len(cleaned) == 10 and cleaned.isdigit():
+            self.value = '+380' + cleaned
+        else:
+            raise ValueError("Invalid phone format. Use +380XXXXXXXXX, 380XXXXXXXXX, 0XXXXXXXXX, or XXXXXXXXXX")
+
+    def __str__(self):
+        return self.value
+
+
+#--------------#    
+'''Клас Email з валідацією рядка - умова у рядку є @ та .''' 
+class Email(Field):
+    __slots__ = ()
+    PATTERN = r"^[\w\.-]+@[\w\.-]+\.\w{2,}$"
+
+    def __init__(self, value):
+        if not re.fullmatch(self.PATTERN, value):
+            raise ValueError(f"{Fore.RED}Invalid email address.{Style.RESET_ALL}")
+        super().__init__(value)
+
+
+#------ADDRESS CLASS------#
+'''Клас Address для зберігання адреси контакту'''
+class Address(Field):
+    __slots__ = ()
+
+    def __init__(self, value):
+        if not value.strip():
+            raise ValueError(f"{Fore.RED}Address cannot be empty.{Style.RESET_ALL}")
+        super().__init__(value.strip())
+
+
+#--------------#          
+'''Клас для зберігання інформації про контакт, включаючи ім'я та список телефонів.'''
+class Record:
+    # __weakref__ - для ледачих сховищ, що кешують записи у WeakValueDictionary
+    __slots__ = ('name', 'phones', 'birthday', 'email', 'address', '_book', '__weakref__')
+    STATE = ('name', 'phones', 'birthday', 'email', 'address')
+
+    def __init__(self, name):
+        self._book = None    # книга, індекси якої треба оновлювати при змінах запису
+        self.name = Name(name)
+        self.phones = []
+        self.birthday = None
+        self.email = None
+        self.address = None
+
+    def __getstate__(self):
+        # посилання на книгу не зберігаємо - його відновлює AddressBook
+        return {attr: getattr(self, attr) for attr in self.STATE}
+
+    def __setstate__(self, state):
+        # старі pickle (з __dict__) могли не мати email чи address
+        self._book = None
+        self.birthday = self.email = self.address = None
+        for attr, value in state.items():
+            if attr in self.STATE:
+                setattr(self, attr, value)
+
+    def _unindex(self, field):
+        if self._book is not None:
+            self._book._unindex_record(self, field)
+
+    def _reindex(self, field):
+        if self._book is not None:
+            self._book._index_record(self, field)
+        self._changed()
+
+    def _changed(self):
+        if self._book is not None:
+            self._book._changed(self.name.value)
+
+    def _locked(self):
+        # у ConcurrentAddressBook зміна запису разом з індексами - одна операція запису
+        return self._book._lock.write() if self._book is not None else NO_LOCK
+
+    # список телефонів не змінюється на місці, а замінюється новим: потоки, що саме
+    # читають запис, бачать або старий список, або новий, але не проміжний стан
+    def add_phone(self, phone_number):
+        phone = Phone(phone_number)
+        with self._locked():
+            self._unindex("phones")
+            self.phones = self.phones + [phone]
+            self._reindex("phones")
+
+    def remove_phone(self, phone_number):
+        with self._locked():
+            phone = self.find_phone(phone_number)
+            if phone:
+                self._unindex("phones")
+                self.phones = [p for p in self.phones if p is not phone]
+                self._reindex("phones")
+
+    def edit_phone(self, old_number, new_number):
+        with self._locked():
+            phone = self.find_phone(old_number)
+            if phone:
+                # перевіряємо новий номер до того, як прибрати старий
+                new_phone = Phone(new_number)
+                self._unindex("phones")
+                self.phones = [p for p in self.phones if p is not phone] + [new_phone]
+                self._reindex("phones")
+            else:
+                raise ValueError(f"{Fore.RED}Phone number not found.{Style.RESET_ALL}")
+
+    def find_phone(self, phone_number):
+        # порівнюємо номери у канонічному вигляді, який дає конструктор Phone
+        try:
+            value = Phone(phone_number).value
+        except ValueError:
+            # номери, збережені до появи валідації, шукаємо як є
+            value = phone_number
+        if self._book is not None:
+            return self._book._find_phone(self, value)
+        for phone in self.phones:
+            if phone.value == value:
+                return phone
+        return None
+    
+    def add_birthday(self, birthday_str):
+        birthday = Birthday(birthday_str)
+        with self._locked():
+            self._unindex("birthday")
+            self.birthday = birthday
+            self._reindex("birthday")
+    
+    #-------add email--------#
+    def add_email(self, email_str):
+        email = Email(email_str)
+        with self._locked():
+            self.email = email
+            self._changed()
+    
+    #-------add address--------#
+    def add_address(self, address_str):
+        address = Address(address_str)
+        with self._locked():
+            self.address = address
+            self._changed()
+    
+    def __str__(self):
+        phones_str = '; '.join(p.value for p in self.phones)
+        bday_str = f", birthday: {self.birthday}" if self.birthday else ""
+        email_str = f", email: {self.email}" if self.email else ""
+        address_str = f", address: {self.address}" if self.address else ""
+        return f"Contact name: {self.name.value}, phones: {phones_str}{bday_str}{email_str}{address_str}"
+
+
+ #--------------#   
+'''Базовий клас індексів: будується при першому запиті до нього, далі оновлюється інкрементально'''
+class LazyIndex:
+    built = False
+
+    def reset(self):
+        '''Скидає індекс - наступний запит побудує його заново'''
+        self.__init__()
+        self.built = False
+
+    def build(self, entries):
+        # entries - аргументи для add: (record,) для книги або (note_id, note) для нотатника
+        for entry in entries:
+            self.add(*entry)
+        self.built = True
+
+
+#--------------#
+'''Календарний індекс днів народження - відсортований список ключів (місяць, день, ім'я)'''
+class BirthdayIndex(LazyIndex):
+    FIELDS = ("birthday",)
+
+    def __init__(self):
+        self.keys = []
+
+    def build(self, entries):
+        # одне сортування замість insort для кожного запису
+        self.keys = sorted(self._key(record) for (record,) in entries if record.birthday)
+        self.built = True
+
+    @staticmethod
+    def _key(record):
+        bday = record.birthday.value
+        return (bday.month, bday.day, record.name.value)
+
+    def add(self, record):
+        if record.birthday:
+            insort(self.keys, self._key(record))
+
+    def remove(self, record):
+        if record.birthday:
+            key = self._key(record)
+            i = bisect_left(self.keys, key)
+            if i < len(self.keys) and self.keys[i] == key:
+                del self.keys[i]
+
+    def _range(self, low, high):
+        '''Ключі з low <= (місяць, день) < high'''
+        return self.keys[bisect_left(self.keys, low):bisect_left(self.keys, high)]
+
+    def between(self, start, end):
+        '''Пари (дата, ім'я) для найближчих днів народження у вікні [start, end] у порядку настання'''
+        # кожен день народження настає не пізніше ніж через 365 днів
+        end = min(end, start + timedelta(days=365))
+        seen = set()
+        while start <= end:
+            year = start.year
+            year_end = min(end, date(year, 12, 31))
+            matches = self._range((start.month, start.day), (year_end.month, year_end.day + 1))
+            leap = calendar.isleap(year)
+            if not leap and year_end == date(year, 2, 28):
+                # 29 лютого у невисокосний рік святкуємо 28 лютого
+                matches += self._range((2, 29), (2, 30))
+            for month, day, name in matches:
+                if name in seen:
+                    continue
+                seen.add(name)
+                if month == 2 and day == 29 and not leap:
+                    day = 28
+                yield date(year, month, day), name
+            start = date(year + 1, 1, 1)
+
+
+#--------------#
+'''Множина n-грам рядка (порожня, якщо рядок коротший за n)'''
+def ngrams(text, n=3):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+'''Триграмний інвертований індекс: триграма -> імена записів, в імені або телефонах яких вона є'''
+class TrigramIndex(LazyIndex):
+    FIELDS = ("phones",)
+
+    def __init__(self):
+        self.postings = {}
+
+    @staticmethod
+    def _texts(record):
+        # ті самі рядки, що й у пошуку: ім'я в нижньому регістрі та номери телефонів
+        return [record.name.value.lower()] + [phone.value for phone in record.phones]
+
+    def add(self, record):
+        name = record.name.value
+        for text in self._texts(record):
+            for gram in ngrams(text):
+                self.postings.setdefault(gram, set()).add(name)
+
+    def remove(self, record):
+        name = record.name.value
+        for text in self._texts(record):
+            for gram in ngrams(text):
+                names = self.postings.get(gram)
+                if names is not None:
+                    names.discard(name)
+                    if not names:
+                        del self.postings[gram]
+
+    def candidates(self, keyword):
+        '''Імена, що можуть містити keyword; None - якщо запит коротший за триграму'''
+        grams = ngrams(keyword)
+        if not grams:
+            return None
+        # починаємо з найрідшої триграми, щоб перетини були якомога меншими
+        postings = sorted((self.postings.get(gram, set()) for gram in grams), key=len)
+        result = set(postings[0])
+        for names in postings[1:]:
+            if not result:
+                break
+            result &= names
+        return result
+
+
+#--------------#
+'''Зворотний індекс телефонів: канонічний номер -> {ім'я запису: Phone}'''
+class PhoneIndex(LazyIndex):
+    FIELDS = ("phones",)
+
+    def __init__(self):
+        self.owners_by_phone = {}
+
+    def add(self, record):
+        name = record.name.value
+        for phone in record.phones:
+            self.owners_by_phone.setdefault(phone.value, {}).setdefault(name, phone)
+
+    def remove(self, record):
+        name = record.name.value
+        for phone in record.phones:
+            owners = self.owners_by_phone.get(phone.value)
+            if owners is not None:
+                owners.pop(name, None)
+                if not owners:
+                    del self.owners_by_phone[phone.value]
+
+    def owners(self, value):
+        return self.owners_by_phone.get(value, {})
+
+
+#--------------#
+'''Відстань Левенштейна; limit + 1, щойно стає зрозуміло, що відстань більша за limit'''
+def edit_distance(a, b, limit):
+    # спільні початок і кінець на відстань не впливають - рахуємо лише середину
+    shortest = min(len(a), len(b))
+    start = 0
+    while start < shortest and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < shortest - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a, b = a[start:len(a) - end], b[start:len(b) - end]
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if not a or not b:
+        return len(a) or len(b)
+    previous = list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        current = [i]
+        for j, other in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+'''Нечіткий індекс імен (SymSpell): слова імен та їхні варіанти з видаленими літерами.
+Ім'я ділиться на слова (Oleksandr_Shevchenko_7 -> oleksandr, shevchenko, 7); словник слів
+значно менший за книгу, тому кандидати шукаються по словах, а повні імена перевіряються в книзі'''
+class NameIndex(LazyIndex):
+    FIELDS = ("name",)
+    MAX_DISTANCE = 2
+    PREFIX = 7          # варіанти з видаленнями будуються лише для початку слова
+    MAX_LOOKUPS = 5000  # скільки імен-кандидатів найбільше перевіряємо в книзі
+    CACHE_SIZE = 1024   # LRU для similar_words; скидається, коли змінюється словник слів
+    SPLIT = re.compile(r"([\W_]+)")
+
+    def __init__(self):
+        self.words = {}       # слово в нижньому регістрі -> {написання: кількість імен}
+        self.deletes = {}     # варіант з видаленнями -> слова
+        self.separators = {}  # роздільники слів у іменах книги -> кількість
+        self.similar_cache = OrderedDict()
+
+    @classmethod
+    def _variants(cls, word, distance=MAX_DISTANCE):
+        variants = {word[:cls.PREFIX]}
+        edge = variants
+        for _ in range(distance):
+            edge = {variant[:i] + variant[i + 1:] for variant in edge for i in range(len(variant))}
+            variants |= edge
+        return variants
+
+    def build_names(self, names):
+        for name in names:
+            self.add_name(name)
+        self.built = True
+
+    def add(self, record):
+        self.add_name(record.name.value)
+
+    def remove(self, record):
+        self.remove_name(record.name.value)
+
+    def add_name(self, name):
+        parts = self.SPLIT.split(name)
+        for word in parts[0::2]:
+            if not word:
+                continue
+            key = word.lower()
+            spellings = self.words.get(key)
+            if spellings is None:
+                spellings = self.words[key] = {}
+                self.similar_cache.clear()
+                for variant in self._variants(key):
+                    self.deletes.setdefault(variant, set()).add(key)
+            spellings[word] = spellings.get(word, 0) + 1
+        for separator in parts[1::2]:
+            self.separators[separator] = self.separators.get(separator, 0) + 1
+
+    def remove_name(self, name):
+        parts = self.SPLIT.split(name)
+        for word in parts[0::2]:
+            key = word.lower()
+            spellings = self.words.get(key)
+            if not word or spellings is None or word not in spellings:
+                continue
+            spellings[word] -= 1
+            if not spellings[word]:
+                del spellings[word]
+            if not spellings:
+                del self.words[key]
+                self.similar_cache.clear()
+                for variant in self._variants(key):
+                    words = self.deletes.get(variant)
+                    if words is not None:
+                        words.discard(key)
+                        if not words:
+                            del self.deletes[variant]
+        for separator in parts[1::2]:
+            if self.separators.get(separator, 0) > 1:
+                self.separators[separator] -= 1
+            else:
+                self.separators.pop(separator, None)
+
+    @classmethod
+    def allowed_distance(cls, word):
+        # як fuzziness AUTO у пошукових рушіях: у коротких словах (і номерах) помилок не шукаємо
+        return 0 if len(word) <= 2 else 1 if len(word) <= 5 else cls.MAX_DISTANCE
+
+    def similar_words(self, word):
+        '''[(відстань, слово)] для слів словника на допустимій для word відстані'''
+        key = word.lower()
+        limit = self.allowed_distance(key)
+        if not limit:
+            return [(0, key)] if key in self.words else []
+        similar = self.similar_cache.get(key)
+        if similar is not None:
+            self.similar_cache.move_to_end(key)
+            return similar
+        found = {}
+        for variant in self._variants(key, limit):
+            for candidate in self.deletes.get(variant, ()):
+                if candidate not in found:
+                    found[candidate] = edit_distance(key, candidate, limit)
+        similar = sorted((distance, candidate) for candidate, distance in found.items() if distance <= limit)
+        self.similar_cache[key] = similar
+        if len(self.similar_cache) > self.CACHE_SIZE:
+            self.similar_cache.popitem(last=False)
+        return similar
+
+    def suggest(self, name, exists, limit=5):
+        '''Імена книги, найближчі до name (спершу з меншою сумарною відстанню слів);
+        exists(name) перевіряє, чи є таке ім'я в книзі'''
+        parts = self.SPLIT.split(name)
+        words = parts[0::2]
+        choices = [self.similar_words(word) if word else [(0, "")] for word in words]
+        # роздільники як у запиті, а також ті, що трапляються в іменах книги
+        layouts = [parts[1::2]]
+        layouts += [[separator] * len(parts[1::2]) for separator in self.separators
+                    if [separator] * len(parts[1::2]) != parts[1::2]]
+        found = []
+        lookups = 0
+        for budget in range(self.MAX_DISTANCE + 1):
+            for spelled in self._combinations(choices, 0, budget):
+                for layout in layouts:
+                    candidate = spelled[0] + "".join(sep + word for sep, word in zip(layout, spelled[1:]))
+                    lookups += 1
+                    if candidate != name and candidate not in found and exists(candidate):
+                        found.append(candidate)
+                if lookups >= self.MAX_LOOKUPS:
+                    return found[:limit]
+            if len(found) >= limit:
+                break
+        return found[:limit]
+
+    def _combinations(self, choices, index, budget):
+        '''Написання слів з choices[index:], сумарна відстань яких рівно budget'''
+        if index == len(choices):
+            if budget == 0:
+                yield []
+            return
+        for distance, key in choices[index]:
+            if distance > budget:
+                break
+            spellings = self.words[key] if key else ("",)
+            for rest in self._combinations(choices, index + 1, budget - distance):
+                for spelling in spellings:
+                    yield [spelling] + rest
+
+
+#--------------#
+'''Префіксний індекс для автодоповнення: відсортований список ключів.
+Ключі з префіксом - суцільний діапазон списку (як піддерево trie), який знаходить bisect'''
+class PrefixIndex(LazyIndex):
+    FIELDS = ()
+    END = "\U0010ffff"     # більший за будь-який символ - межа діапазону префікса
+
+    def __init__(self):
+        self.keys = []
+
+    def build_keys(self, keys):
+        self.keys = sorted(set(keys))
+        self.built = True
+
+    def add_key(self, key):
+        i = bisect_left(self.keys, key)
+        if i == len(self.keys) or self.keys[i] != key:
+            self.keys.insert(i, key)
+
+    def remove_key(self, key):
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            del self.keys[i]
+
+    def complete(self, prefix, limit=None):
+        start = bisect_left(self.keys, prefix)
+        stop = bisect_left(self.keys, prefix + self.END, start)
+        return self.keys[start:stop if limit is None else min(stop, start + limit)]
+
+
+class NamePrefixIndex(PrefixIndex):
+    FIELDS = ("name",)
+
+    def build_names(self, names):
+        self.build_keys(names)
+
+    def add(self, record):
+        self.add_key(record.name.value)
+
+    def remove(self, record):
+        self.remove_key(record.name.value)
+
+    add_name = PrefixIndex.add_key
+    remove_name = PrefixIndex.remove_key
+
+
+class NoteIdIndex(PrefixIndex):
+    def add(self, note_id, note):
+        self.add_key(note_id)
+
+    def remove(self, note_id, note):
+        self.remove_key(note_id)
+
+
+#------LOCKS------#
+'''Замінник блокування для книг і нотатників без потоків: нічого не робить'''
+class NullLock:
+    def read(self):
+        return self
+
+    def write(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NO_LOCK = NullLock()
+
+
+'''Копія-тінь даних книги чи нотатника для фонового збереження: ключ -> поверхнева копія запису.
+Запис змінюється заміною полів і списків, а не на місці, тож поверхневої копії досить. dirty - ключі,
+змінені після попереднього оновлення, зі значенням "чи видалявся"; видалений і доданий знову ключ
+переходить у кінець, як і в самих даних'''
+def update_shadow(shadow, data, dirty):
+    if shadow is None or dirty is None:
+        return {key: copy.copy(value) for key, value in data.items()}
+    for key, deleted in dirty.items():
+        value = data.get(key)
+        if deleted or value is None:
+            shadow.pop(key, None)
+        if value is not None:
+            shadow[key] = copy.copy(value)
+    return shadow
+
+
+#--------------#
+'''Клас для зберігання та управління записами'''
+class AddressBook(UserDict):
+    _lock = NO_LOCK     # ConcurrentAddressBook замінює на RWLock
+    _version = 0        # лічильник змін; з _saved_version видно, чи є незбережені зміни
+    _saved_version = 0
+    _dirty = None       # імена, змінені після останнього changed_copy (None - ще не відстежуються)
+
+    def __init__(self, *args, **kwargs):
+        self._init_indexes()
+        self._journal = None
+        super().__init__(*args, **kwargs)
+
+    def _init_indexes(self):
+        self._birthday_index = BirthdayIndex()
+        self._trigram_index = TrigramIndex()
+        self._phone_index = PhoneIndex()
+        self._name_index = NameIndex()
+        self._prefix_index = NamePrefixIndex()
+        self._indexes = [self._birthday_index, self._trigram_index, self._phone_index,
+                         self._name_index, self._prefix_index]
+        # порядок додавання записів, щоб результати пошуку йшли як у self.data
+        self._positions = {}
+        self._next_position = 0
+
+    def __getstate__(self):
+        # індекси не зберігаємо у pickle - вони перебудовуються при завантаженні
+        return {'data': self.data}
+
+    def __setstate__(self, state):
+        self.data = state['data']
+        self._init_indexes()
+        self._journal = None
+        # індекси побудуються при першому запиті до них
+        for record in self.data.values():
+            record._book = self
+            self._remember_position(record.name.value)
+
+    def _changed(self, name):
+        '''Усі зміни записів книги проходять через цей метод'''
+        self._version += 1
+        if self._dirty is not None:
+            self._dirty[name] = self._dirty.get(name, False) or name not in self.data
+        if self._journal is not None:
+            self._journal.changed(name)
+
+    def changed_copy(self, shadow):
+        '''Знімок для фонового збереження, дешевий для виклику під блокуванням команд: оновлює тінь shadow
+        (з попереднього виклику, None - ще немає) лише зміненими записами. Повертає (книга для pickle, тінь)'''
+        shadow = update_shadow(shadow, self.data, self._dirty)
+        self._dirty = {}
+        book = AddressBook.__new__(AddressBook)     # лише для pickle: __getstate__ бере тільки data
+        book.data = shadow
+        return book, shadow
+
+    def commit(self):
+        '''Фіксує зміни, зроблені однією командою'''
+        if self._journal is not None:
+            self._journal.commit(self)
+
+    def _remember_position(self, name):
+        self._positions[name] = self._next_position
+        self._next_position += 1
+
+    def _use(self, index):
+        if not index.built:
+            index.build((record,) for record in self.data.values())
+        return index
+
+    def _index_record(self, record, field=None):
+        # field - змінене поле запису; None означає весь запис
+        for index in self._indexes:
+            if index.built and (field is None or field in index.FIELDS):
+                index.add(record)
+
+    def _unindex_record(self, record, field=None):
+        for index in self._indexes:
+            if index.built and (field is None or field in index.FIELDS):
+                index.remove(record)
+
+    def add_record(self, record):
+        name = record.name.value
+        old_record = self.data.get(name)
+        if old_record is not None:
+            # запис з тим самим ім'ям замінюється на тому ж місці
+            self._unindex_record(old_record)
+            old_record._book = None
+        else:
+            self._remember_position(name)
+        self.data[name] = record
+        record._book = self
+        self._index_record(record)
+        self._changed(name)
+
+    def add_records(self, records):
+        '''Масове додавання: великі пачки не оновлюють індекси по одному запису'''
+        incremental = len(records) * 8 < len(self.data)
+        for record in records:
+            name = record.name.value
+            old_record = self.data.get(name)
+            if old_record is not None:
+                if incremental:
+                    self._unindex_record(old_record)
+                old_record._book = None
+            else:
+                self._remember_position(name)
+            self.data[name] = record
+            record._book = self
+            if incremental:
+                self._index_record(record)
+            self._changed(name)
+        if not incremental:
+            # індекси перебудуються одним проходом при наступному запиті
+            for index in self._indexes:
+                index.reset()
+
+    def add_rows(self, rows):
+        '''Масове додавання перевірених рядків (name, phones, birthday, email, address), напр. з import'''
+        self.add_records([restore_record(*row) for row in rows])
+
+    def existing_records(self, names):
+        '''Записи з іменами names, що вже є в книзі (відсутні пропускаються)'''
+        return [self.data[name] for name in names if name in self.data]
+
+    def find(self, name):
+        return self.data.get(name)
+
+    def snapshot(self):
+        '''Усі записи для перебору (таблиця, експорт); у ConcurrentAddressBook - незмінна копія'''
+        return self.data.values()
+
+    def page(self, start, stop):
+        '''Записи з позицій [start, stop) у порядку книги'''
+        return [self.data[name] for name in itertools.islice(self.data, start, stop)]
+
+    def _use_names(self, index):
+        # індексам імен потрібні лише ключі - записи не читаємо
+        if not index.built:
+            index.build_names(self.data.keys())
+        return index
+
+    def suggest_names(self, name, limit=5):
+        '''Схожі імена для "did you mean": до двох помилок у словах імені'''
+        return self._use_names(self._name_index).suggest(name, self.data.__contains__, limit)
+
+    def complete_names(self, prefix, limit=None):
+        '''Імена, що починаються з prefix, за абеткою'''
+        return self._use_names(self._prefix_index).complete(prefix, limit)
+
+    def delete(self, name):
+        if name in self.data:
+            record = self.data.pop(name)
+            self._unindex_record(record)
+            del self._positions[name]
+            record._book = None
+            self._changed(name)
+
+    def _restore(self, name, record):
+        '''Відтворення запису з журналу: None означає, що запис видалено'''
+        if record is None:
+            self.delete(name)
+        else:
+            self.add_record(record)
+
+    def _find_phone(self, record, value):
+        return self._use(self._phone_index).owners(value).get(record.name.value)
+
+    def find_by_phone(self, phone_number):
+        '''Записи, яким належить номер (номер приводиться до канонічного вигляду)'''
+        value = Phone(phone_number).value
+        return [self.data[name] for name in self._use(self._phone_index).owners(value)]
+
+    def _candidates(self, keyword):
+        candidates = self._use(self._trigram_index).candidates(keyword)
+        if candidates is None:
+            # запит коротший за триграму - звичайний перебір
+            return self.snapshot()
+        return [self.data[name] for name in sorted(candidates, key=self._positions.__getitem__)]
+
+    def search(self, keyword):
+        '''Записи, ім'я або телефон яких містить keyword (без урахування регістру імені)'''
+        keyword = keyword.lower()
+        return [record for record in self._candidates(keyword) if self._matches(record, keyword)]
+
+    @staticmethod
+    def _matches(record, keyword):
+        return keyword in record.name.value.lower() or any(keyword in phone.value for phone in record.phones)
+
+    @staticmethod
+    def _congratulation_date(bday):
+        if bday.weekday() == 5:  # Saturday
+            return bday + timedelta(days=2)
+        elif bday.weekday() == 6:  # Sunday
+            return bday + timedelta(days=1)
+        return bday
+
+    def _birthdays(self, start, end):
+        return self._use(self._birthday_index).between(start, end)
+
+    def get_upcoming_birthdays(self):
+        upcoming_birthdays = []
+        today = datetime.today().date()
+        this_week = today + timedelta(days=7)
+
+        for bday, name in self._birthdays(today, this_week):
+            upcoming_birthdays.append({
+                "name": name,
+                "congratulation_date": self._congratulation_date(bday).strftime("%Y.%m.%d")
+            })
+
+        return upcoming_birthdays
+    
+    def get_birthdays_in_days(self, days):
+        '''Отримати список днів народження через задану кількість днів'''
+        birthdays_in_period = []
+        today = datetime.today().date()
+        # вікно довше за рік нічого не додає, а велике число днів переповнило б date
+        target_date = today + timedelta(days=min(days, 366))
+
+        # індекс повертає дні народження вже відсортованими за датою
+        for bday, name in self._birthdays(today, target_date):
+            birthdays_in_period.append({
+                "name": name,
+                "birthday": bday.strftime("%d.%m.%Y"),
+                "congratulation_date": self._congratulation_date(bday).strftime("%d.%m.%Y"),
+                "days_until": (bday - today).days
+            })
+
+        return birthdays_in_period
+
+
+'''Клас Note- нотаток із текстом і тегом. Тегі можуть бути пусті'''
+class Note:
+    __slots__ = ('text', 'tags', 'created', '_notebook', '_id', '__weakref__')
+    STATE = ('text', 'tags', 'created')
+
+    def __init__(self, text, tags=None):
+        self._notebook = None    # нотатник, індекси якого треба оновлювати при змінах нотатки
+        self._id = None
+        self.text = text
+        # однакові теги різних нотаток - один і той самий рядок у пам'яті
+        self.tags = [sys.intern(tag) for tag in tags] if tags else []
+        self.created = datetime.now()
+
+    def __getstate__(self):
+        # посилання на нотатник і id не зберігаємо - їх відновлює Notebook
+        return {attr: getattr(self, attr) for attr in self.STATE}
+
+    def __setstate__(self, state):
+        self._notebook = None
+        self._id = None
+        for attr, value in state.items():
+            if attr in self.STATE:
+                setattr(self, attr, value)
+        self.tags = [sys.intern(tag) for tag in self.tags]
+
+    def _unindex(self, field):
+        if self._notebook is not None:
+            self._notebook._unindex_note(self._id, self, field)
+
+    def _reindex(self, field):
+        if self._notebook is not None:
+            self._notebook._index_note(self._id, self, field)
+            self._notebook._changed(self._id)
+
+    def _locked(self):
+        return self._notebook._lock.write() if self._notebook is not None else NO_LOCK
+
+    '''edit note'''        
+    def edit(self, new_text):
+        with self._locked():
+            self._unindex("text")
+            self.text = new_text
+            self._reindex("text")
+
+    '''add tag to note'''
+    def add_tag(self, tag):
+        # список тегів однієї нотатки короткий; пошук по всіх нотатках іде через TagIndex.
+        # Як і телефони запису, список замінюється новим, а не змінюється на місці
+        with self._locked():
+            if tag not in self.tags:
+                self._unindex("tags")
+                self.tags = self.tags + [sys.intern(tag)]
+                self._reindex("tags")
+    
+    '''delete tag'''
+    def remove_tag(self, tag):
+        with self._locked():
+            if tag in self.tags:
+                self._unindex("tags")
+                self.tags = [t for t in self.tags if t != tag]
+                self._reindex("tags")
+    
+    def __str__(self):
+        tag_str = f" [tags: {Fore.YELLOW}{', '.join(self.tags)}{Style.RESET_ALL}]" if self.tags else ""
+        return f"{self.text}{tag_str} (Created: {Fore.YELLOW}{self.created.strftime('%Y-%m-%d %H:%M')}{Style.RESET_ALL})"
+
+
+#--------------#
+'''Нотатки в порядку створення: відсортований список (час створення, id)'''
+class CreatedIndex(LazyIndex):
+    FIELDS = ()     # час створення нотатки не змінюється
+
+    def __init__(self):
+        self.keys = []
+
+    def build(self, entries):
+        self.keys = sorted(self._key(note_id, note) for note_id, note in entries)
+        self.built = True
+
+    @staticmethod
+    def _key(note_id, note):
+        return (note.created or datetime.min, note_id)
+
+    def add(self, note_id, note):
+        insort(self.keys, self._key(note_id, note))
+
+    def remove(self, note_id, note):
+        key = self._key(note_id, note)
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            del self.keys[i]
+
+    def newest(self, since=None):
+        '''id від найновішої нотатки до найстарішої, створеної не раніше since'''
+        low = bisect_left(self.keys, (since,)) if since else 0
+        for i in range(len(self.keys) - 1, low - 1, -1):
+            yield self.keys[i][1]
+
+    def _run(self, i):
+        '''Межі [lo, hi) ключів з тим самим значенням, що й ключ i (без id)'''
+        value = self.keys[i][:-1]
+        return (bisect_left(self.keys, value, 0, i, key=self._value),
+                bisect_right(self.keys, value, i, key=self._value))
+
+    @staticmethod
+    def _value(key):
+        return key[:-1]
+
+    def page(self, start=0, stop=None, reverse=False):
+        '''id з позицій start..stop за зростанням ключа (reverse - за спаданням); список не пересортовується.
+        Однакові ключі і з reverse йдуть у порядку id, як у стабільному sorted(..., reverse=True)'''
+        size = len(self.keys)
+        stop = size if stop is None else min(stop, size)
+        if start >= stop:
+            return []
+        if not reverse:
+            return [key[-1] for key in self.keys[start:stop]]
+        # групи однакових ключів - від останньої до першої, кожна група - вперед
+        lo, hi = self._run(size - 1 - start)
+        i = lo + start - (size - hi)
+        note_ids = []
+        while len(note_ids) < stop - start:
+            if i == hi:
+                hi = lo
+                lo, _ = self._run(hi - 1)
+                i = lo
+            note_ids.append(self.keys[i][-1])
+            i += 1
+        return note_ids
+
+
+'''Нотатки за кількістю тегів для sort-notes tag-count: (кількість, id)'''
+class TagCountIndex(CreatedIndex):
+    FIELDS = ("tags",)
+
+    @staticmethod
+    def _key(note_id, note):
+        return (len(note.tags), note_id)
+
+
+'''Нотатки за першим тегом для sort-notes tag-name: (тег у нижньому регістрі, id); без тегів - ""'''
+class TagNameIndex(CreatedIndex):
+    FIELDS = ("tags",)
+
+    @staticmethod
+    def _key(note_id, note):
+        return (note.tags[0].lower() if note.tags else "", note_id)
+
+
+#--------------#
+'''Кеш перенесеного тексту нотаток для show-notes; скидається, коли змінюється текст'''
+class WrapCache:
+    FIELDS = ("text",)
+    built = True
+
+    def __init__(self):
+        self.wrapped = {}
+
+    def get(self, note_id, note, width):
+        cached = self.wrapped.get(note_id)
+        if cached is None or cached[0] != width:
+            cached = self.wrapped[note_id] = (width, manual_wrap(note.text, width))
+        return cached[1]
+
+    def add(self, note_id, note):
+        pass
+
+    def remove(self, note_id, note):
+        self.wrapped.pop(note_id, None)
+
+
+#--------------#
+'''Інвертований повнотекстовий індекс нотаток: слово -> {id нотатки: [позиції]}'''
+class TextIndex(LazyIndex):
+    FIELDS = ("text",)
+    K1 = 1.5
+    B = 0.75
+
+    def __init__(self):
+        self.postings = {}
+        self.lengths = {}       # кількість слів у кожній нотатці - для BM25
+        self.total_length = 0
+
+    @staticmethod
+    def tokenize(text):
+        return re.findall(r"\w+", text.lower())
+
+    def add(self, note_id, note):
+        tokens = self.tokenize(note.text)
+        for position, term in enumerate(tokens):
+            self.postings.setdefault(term, {}).setdefault(note_id, []).append(position)
+        self.lengths[note_id] = len(tokens)
+        self.total_length += len(tokens)
+
+    def remove(self, note_id, note):
+        for term in set(self.tokenize(note.text)):
+            notes = self.postings.get(term)
+            if notes is not None:
+                notes.pop(note_id, None)
+                if not notes:
+                    del self.postings[term]
+        self.total_length -= self.lengths.pop(note_id, 0)
+
+    def _matching(self, terms):
+        '''id нотаток, що містять усі слова запиту (AND)'''
+        postings = sorted((self.postings.get(term, {}) for term in set(terms)), key=len)
+        if not postings:
+            return set()
+        result = set(postings[0])
+        for notes in postings[1:]:
+            if not result:
+                break
+            result &= notes.keys()
+        return result
+
+    def _has_phrase(self, note_id, terms):
+        positions = [set(self.postings[term][note_id]) for term in terms]
+        return any(all(start + i in positions[i] for i in range(1, len(terms)))
+                   for start in positions[0])
+
+    def _score(self, note_id, terms):
+        '''Оцінка BM25 нотатки для слів запиту'''
+        count = len(self.lengths)
+        average = self.total_length / count if count else 0
+        length = self.lengths[note_id]
+        score = 0.0
+        for term in set(terms):
+            notes = self.postings[term]
+            idf = math.log(1 + (count - len(notes) + 0.5) / (len(notes) + 0.5))
+            tf = len(notes[note_id])
+            norm = 1 - self.B + self.B * length / average if average else 1
+            score += idf * tf * (self.K1 + 1) / (tf + self.K1 * norm)
+        return score
+
+    def search(self, query, phrase=False, limit=None):
+        '''id нотаток за спаданням релевантності (при рівності - за id)'''
+        terms = self.tokenize(query)
+        matches = self._matching(terms)
+        if phrase and len(terms) > 1:
+            matches = [note_id for note_id in matches if self._has_phrase(note_id, terms)]
+        scored = [(-self._score(note_id, terms), note_id) for note_id in matches]
+        if limit is not None:
+            return [note_id for _, note_id in heapq.nsmallest(limit, scored)]
+        return [note_id for _, note_id in sorted(scored)]
+
+
+#--------------#
+'''Індекс тегів: тег (у нижньому регістрі) -> id нотаток, відсортований словник тегів і триграми тегів'''
+class TagIndex(LazyIndex):
+    FIELDS = ("tags",)
+
+    def __init__(self):
+        self.notes_by_tag = {}
+        self.sorted_tags = []   # для пошуку за префіксом
+        self.grams = {}         # триграма -> теги, для пошуку за підрядком
+
+    def add(self, note_id, note):
+        for tag in {tag.lower() for tag in note.tags}:
+            note_ids = self.notes_by_tag.get(tag)
+            if note_ids is None:
+                note_ids = self.notes_by_tag[tag] = set()
+                insort(self.sorted_tags, tag)
+                for gram in ngrams(tag):
+                    self.grams.setdefault(gram, set()).add(tag)
+            note_ids.add(note_id)
+
+    def remove(self, note_id, note):
+        for tag in {tag.lower() for tag in note.tags}:
+            note_ids = self.notes_by_tag.get(tag)
+            if note_ids is None:
+                continue
+            note_ids.discard(note_id)
+            if not note_ids:
+                del self.notes_by_tag[tag]
+                del self.sorted_tags[bisect_left(self.sorted_tags, tag)]
+                for gram in ngrams(tag):
+                    tags = self.grams[gram]
+                    tags.discard(tag)
+                    if not tags:
+                        del self.grams[gram]
+
+    def _union(self, tags):
+        result = set()
+        for tag in tags:
+            result |= self.notes_by_tag[tag]
+        return result
+
+    def with_prefix(self, prefix):
+        prefix = prefix.lower()
+        # теги з префіксом - суцільний діапазон, як у PrefixIndex: копіюємо лише його
+        start = bisect_left(self.sorted_tags, prefix)
+        stop = bisect_left(self.sorted_tags, prefix + PrefixIndex.END, start)
+        return self._union(self.sorted_tags[start:stop])
+
+    def containing(self, keyword):
+        keyword = keyword.lower()
+        grams = ngrams(keyword)
+        if grams:
+            tags = set.intersection(*(self.grams.get(gram, set()) for gram in grams))
+        else:
+            # короткий запит - перебираємо словник тегів, а не нотатки
+            tags = self.notes_by_tag
+        return self._union(tag for tag in tags if keyword in tag)
+
+
+#--------------#
+'''Монотонні id нотаток: секунда створення "%Y%m%d%H%M%S", а для наступних нотаток тієї ж секунди -
+з лічильником "-000001", "-000002"... Рядкове сортування id дає порядок додавання'''
+class NoteIds:
+    FORMAT = "%Y%m%d%H%M%S"
+    SEQUENCE_LIMIT = 999999     # шість цифр лічильника - ширина однакова, сортування не ламається
+
+    def __init__(self, last_id=None):
+        self.stamp = ""
+        self.sequence = 0
+        self.second = self.next_second = None   # межі секунди, для якої stamp уже пораховано
+        self.second_stamp = ""
+        if last_id:
+            stamp, _, sequence = last_id.partition("-")
+            self.stamp = stamp
+            self.sequence = int(sequence) if sequence.isdigit() else 0
+
+    def _stamp(self, created):
+        # strftime - найдорожча частина; нотатки однієї секунди беруть готовий рядок
+        if self.second is None or not self.second <= created < self.next_second:
+            self.second = created.replace(microsecond=0)
+            self.next_second = self.second + timedelta(seconds=1)
+            self.second_stamp = self.second.strftime(self.FORMAT)
+        return self.second_stamp
+
+    def next(self, created):
+        stamp = self._stamp(created)
+        if stamp > self.stamp:
+            self.stamp, self.sequence = stamp, 0
+            return stamp
+        # та сама секунда або старіший час (імпорт, переведений годинник): id все одно зростає
+        self.sequence += 1
+        if self.sequence > self.SEQUENCE_LIMIT:
+            moved = datetime.strptime(self.stamp, self.FORMAT) + timedelta(seconds=1)
+            self.stamp, self.sequence = moved.strftime(self.FORMAT), 0
+            return self.stamp
+        return f"{self.stamp}-{self.sequence:06d}"
+
+
+'''Клас Notebook- для зберігання та управління нотатками'''
+class Notebook(UserDict):
+    _lock = NO_LOCK     # ConcurrentNotebook замінює на RWLock
+    _ids = None         # NoteIds; створюється при першому додаванні, від найбільшого наявного id
+    _version = 0        # лічильник змін, як у AddressBook
+    _saved_version = 0
+    _dirty = None       # id нотаток, змінених після останнього changed_copy
+
+    def __init__(self, *args, **kwargs):
+        self._init_indexes()
+        self._journal = None
+        super().__init__(*args, **kwargs)
+
+    def _init_indexes(self):
+        self._text_index = TextIndex()
+        self._tag_index = TagIndex()
+        self._created_index = CreatedIndex()
+        self._wrap_cache = WrapCache()
+        self._id_index = NoteIdIndex()
+        # sort-notes: відсортовані списки, які оновлюються разом із нотатками
+        self._sort_indexes = {"date": self._created_index, "tag-count": TagCountIndex(), "tag-name": TagNameIndex()}
+        self._indexes = [self._text_index, self._tag_index, self._created_index, self._wrap_cache, self._id_index,
+                         self._sort_indexes["tag-count"], self._sort_indexes["tag-name"]]
+
+    def __getstate__(self):
+        # індекси не зберігаємо у pickle - вони перебудовуються при завантаженні
+        return {'data': self.data}
+
+    def __setstate__(self, state):
+        self.data = state['data']
+        self._init_indexes()
+        self._journal = None
+        for note_id, note in self.data.items():
+            note._notebook = self
+            note._id = note_id
+
+    def _use(self, index):
+        if not index.built:
+            index.build(self.data.items())
+        return index
+
+    def _index_note(self, note_id, note, field=None):
+        # field - змінене поле нотатки; None означає всю нотатку
+        for index in self._indexes:
+            if index.built and (field is None or field in index.FIELDS):
+                index.add(note_id, note)
+
+    def _unindex_note(self, note_id, note, field=None):
+        for index in self._indexes:
+            if index.built and (field is None or field in index.FIELDS):
+                index.remove(note_id, note)
+
+    def _changed(self, note_id):
+        '''Усі зміни нотаток проходять через цей метод'''
+        self._version += 1
+        if self._dirty is not None:
+            self._dirty[note_id] = self._dirty.get(note_id, False) or note_id not in self.data
+        if self._journal is not None:
+            self._journal.changed(note_id)
+
+    def changed_copy(self, shadow):
+        '''Знімок для фонового збереження, як у AddressBook.changed_copy'''
+        shadow = update_shadow(shadow, self.data, self._dirty)
+        self._dirty = {}
+        notebook = Notebook.__new__(Notebook)
+        notebook.data = shadow
+        return notebook, shadow
+
+    def commit(self):
+        '''Фіксує зміни, зроблені однією командою'''
+        if self._journal is not None:
+            self._journal.commit(self)
+
+    def _last_note_id(self):
+        return max(self.data, default=None)
+
+    def _note_ids(self):
+        if self._ids is None:
+            self._ids = NoteIds(self._last_note_id())
+        return self._ids
+
+    '''add note  with uniq_id as %Y%m%d%H%M%S (date and time creating), -000001... for the same second'''
+    def add_note(self, note):
+        self._put_note(self._note_ids().next(note.created), note)
+
+    def add_notes(self, notes):
+        '''Масове додавання: id видаються підряд, великі пачки не оновлюють індекси по одній нотатці'''
+        ids = self._note_ids()
+        incremental = len(notes) * 8 < len(self.data)
+        for note in notes:
+            note_id = ids.next(note.created)
+            self.data[note_id] = note
+            note._notebook = self
+            note._id = note_id
+            if incremental:
+                self._index_note(note_id, note)
+            self._changed(note_id)
+        if not incremental:
+            # індекси перебудуються одним проходом при наступному запиті
+            for index in self._indexes:
+                if isinstance(index, LazyIndex):
+                    index.reset()
+
+    def _put_note(self, note_id, note):
+        old_note = self.data.get(note_id)
+        if old_note is not None:
+            self._unindex_note(note_id, old_note)
+            old_note._notebook = None
+        self.data[note_id] = note
+        note._notebook = self
+        note._id = note_id
+        self._index_note(note_id, note)
+        self._changed(note_id)
+
+    def delete_note(self, note_id):
+        if note_id in self.data:
+            note = self.data.pop(note_id)
+            self._unindex_note(note_id, note)
+            note._notebook = None
+            note._id = None
+            self._changed(note_id)
+
+    def _restore(self, note_id, note):
+        '''Відтворення нотатки з журналу: None означає, що нотатку видалено'''
+        # id з журналу можуть бути більшими за вже видані - генератор почне від нового максимуму
+        self._ids = None
+        if note is None:
+            self.delete_note(note_id)
+        else:
+            self._put_note(note_id, note)
+
+    def snapshot(self):
+        '''Пари (id, нотатка) для перебору; у ConcurrentNotebook - незмінна копія'''
+        return self.data.items()
+
+    def _notes(self, note_ids):
+        # id зростають у порядку додавання, тож сортування дає хронологічний порядок
+        return [self.data[note_id] for note_id in sorted(note_ids)]
+
+    '''search tag as any - not district'''
+    def find_by_tag(self, keyword):
+        return self._notes(self._use(self._tag_index).containing(keyword))
+
+    def query_tags(self, words):
+        '''Булевий пошук за тегами: work AND urgent, work OR home, NOT done, wor* - префікс'''
+        words = list(words)
+        tags = self._use(self._tag_index)
+
+        def operand():
+            word = words.pop(0)
+            if word == "NOT":
+                return self.data.keys() - operand()
+            if word in ("AND", "OR"):
+                raise ValueError(f"Unexpected '{word}' in tag query.")
+            if word.endswith("*"):
+                return tags.with_prefix(word[:-1])
+            return tags.containing(word)
+
+        def conjunction():
+            result = operand()
+            while words and words[0] != "OR":
+                if words[0] == "AND":
+                    words.pop(0)
+                result = result & operand()
+            return result
+
+        result = conjunction()
+        while words:
+            words.pop(0)    # OR
+            result = result | conjunction()
+        return self._notes(result)
+
+    def search_text(self, keyword, mode="all", limit=None):
+        '''Пошук за текстом: "all" - усі слова (BM25), "phrase" - точна фраза, "substring" - підрядок (повільно)'''
+        if mode == "substring":
+            results = (note for _, note in self.snapshot() if keyword.lower() in note.text.lower())
+            return list(results if limit is None else itertools.islice(results, limit))
+        if mode not in ("all", "phrase"):
+            raise ValueError("Unsupported search mode.")
+        note_ids = self._use(self._text_index).search(keyword, phrase=(mode == "phrase"), limit=limit)
+        return [self.data[note_id] for note_id in note_ids]
+
+    def edit_note(self, note_id, new_text):
+        if note_id in self.data:
+            self.data[note_id].edit(new_text)
+
+    def get_all_notes(self):
+        return list(self.snapshot())
+
+    def recent_notes(self, start=0, stop=None, since=None):
+        '''(id, нотатка) від найновішої; since - лише створені не раніше цього часу'''
+        note_ids = itertools.islice(self._use(self._created_index).newest(since), start, stop)
+        return [(note_id, self.data[note_id]) for note_id in note_ids]
+
+    def wrapped_text(self, note_id, note, width):
+        return self._wrap_cache.get(note_id, note, width)
+
+    def complete_ids(self, prefix, limit=None):
+        '''id нотаток, що починаються з prefix'''
+        return self._use(self._id_index).complete(prefix, limit)
+    
+    #-------sort method for notes
+    def get_sorted_notes(self, sort_type="date", reverse=False, start=0, stop=None):
+        '''(id, нотатка) з позицій start..stop; однакові ключі - у порядку id (і з reverse)'''
+        index = self._sort_indexes.get(sort_type)
+        if index is None:
+            raise ValueError("Unsupported sort type.")
+        note_ids = self._use(index).page(start, stop, reverse)
+        return [(note_id, self.data[note_id]) for note_id in note_ids]
+
+
+#------LAZY STORAGE------#
+'''Відновлення полів запису зі сховища без повторної валідації'''
+def restore_field(cls, value):
+    # значення вже пройшли перевірку при додаванні (або записані старішою версією)
+    field = cls.__new__(cls)
+    field.value = value
+    return field
+
+
+def restore_fields(record, phones, birthday, email, address):
+    record.phones = [restore_field(Phone, phone) for phone in phones]
+    if birthday:
+        record.birthday = restore_field(Birthday, datetime.strptime(birthday, "%d.%m.%Y").date())
+    record.email = restore_field(Email, email) if email else None
+    record.address = restore_field(Address, address) if address else None
+
+
+def record_values(record):
+    '''Аргументи restore_record, з яких запис відтворюється (в іншому процесі, після злиття з імпортом)'''
+    return (record.name.value, [phone.value for phone in record.phones],
+            record.birthday.value if record.birthday else None,
+            record.email.value if record.email else None,
+            record.address.value if record.address else None)
+
+
+def restore_record(name, phones, birthday, email, address):
+    '''Record з уже перевірених значень: birthday - date, відсутні поля - None'''
+    record = Record(name)
+    record.phones = [restore_field(Phone, phone) for phone in phones]
+    record.birthday = restore_field(Birthday, birthday) if birthday else None
+    record.email = restore_field(Email, email) if email else None
+    record.address = restore_field(Address, address) if address else None
+    return record
+
+
+'''Перенесення тексту нотатки: рядки по width символів'''
+def manual_wrap(text, width=40):
+    if not text:
+        return ""
+    return '\n'.join([text[i:i+width] for i in range(0, len(text), width)])
@@ -0,0 +1,245 @@
+'''Збереження у pickle, журнал змін і завантаження'''
+import io
+import os
+import zlib
+import struct
+import pickle
+import threading
+from colorama import Fore, Style  #for color text
+from . import models, concurrent
+
+
+#---------------#
+'''Старі pickle записані ще з main.py: їхні класи мають модуль __main__ (або main), а тепер живуть у пакеті'''
+LEGACY_MODULES = {"__main__", "main"}
+
+
+class LegacyUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        if module in LEGACY_MODULES:
+            for source in (models, concurrent):
+                if hasattr(source, name):
+                    return getattr(source, name)
+        return super().find_class(module, name)
+
+
+def load_pickle(f):
+    return LegacyUnpickler(f).load()
+
+
+'''Серіалізація з pickle'''
+def save_data(obj, filename):
+    with open(filename, "wb") as f:
+        pickle.dump(obj, f)
+
+
+'''Атомарний запис знімка: тимчасовий файл + os.replace'''
+def save_data_atomic(obj, filename):
+    tmp = filename + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(obj, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, filename)
+
+
+def write_atomic(filename, payload):
+    '''Те саме для вже серіалізованих байтів (автозбереження серіалізує окремо від запису)'''
+    tmp = filename + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, filename)
+
+
+def save_if_changed(obj, filename):
+    '''Записує знімок, лише якщо після попереднього збереження щось змінилося (або файлу ще немає)'''
+    version = obj._version
+    if version == obj._saved_version and os.path.exists(filename):
+        return False
+    save_data_atomic(obj, filename)
+    obj._saved_version = version
+    return True
+
+
+'''Пошкоджений запис посеред журналу: журнал лишається як є, щоб його можна було розібрати вручну'''
+class JournalCorrupted(Exception):
+    pass
+
+
+#---------------#
+'''Журнал змін (write-ahead log) поруч зі знімком: <file>.pkl.journal. Запис - заголовок (довжина, crc32 даних,
+crc32 цих двох полів) і pickle (ключ, значення); обірваним після збою може бути лише останній запис'''
+class Journal:
+    ENTRY = struct.Struct("<III")
+
+    def __init__(self, filename, default_factory, fsync_every=1, compact_bytes=4 * 1024 * 1024):
+        self.filename = filename
+        self.path = filename + ".journal"
+        self.old_path = filename + ".journal.old"    # журнал, який саме зливається зі знімком
+        self.default_factory = default_factory
+        self.fsync_every = fsync_every
+        self.compact_bytes = compact_bytes
+        self.pending = set()
+        self.commits = 0
+        self.file = None
+        self.compactor = None
+
+    @classmethod
+    def entry(cls, key, value):
+        payload = pickle.dumps((key, value))
+        fields = struct.pack("<II", len(payload), zlib.crc32(payload))
+        return fields + struct.pack("<I", zlib.crc32(fields)) + payload
+
+    @classmethod
+    def replay(cls, obj, path):
+        '''Застосовує записи журналу до obj; повертає False, якщо журналу немає.
+        Хвіст після останнього цілого запису (обірваний чи заповнений нулями після збою) відрізається;
+        пошкоджений запис, після якого є ще цілі записи, - JournalCorrupted'''
+        try:
+            f = open(path, "r+b")
+        except FileNotFoundError:
+            return False
+        with f:
+            size = f.seek(0, os.SEEK_END)
+            f.seek(0)
+            good = 0
+            damaged = None
+            while good < size:
+                header = f.read(cls.ENTRY.size)
+                if len(header) < cls.ENTRY.size:
+                    break
+                length, crc, check = cls.ENTRY.unpack(header)
+                if zlib.crc32(header[:8]) != check:
+                    damaged = "entry header"
+                    break
+                payload = f.read(length)
+                if len(payload) < length:
+                    break
+                if zlib.crc32(payload) != crc:
+                    damaged = "entry"
+                    break
+                # запис цілий - помилки розбору чи застосування не про обірваний запис, їх не ковтаємо
+                key, value = load_pickle(io.BytesIO(payload))
+                obj._restore(key, value)
+                good += cls.ENTRY.size + length
+            if good < size:
+                if damaged and cls._entry_follows(f, good + 1):
+                    raise JournalCorrupted(f"{path}: damaged {damaged} at byte {good}, whole entries follow it")
+                f.truncate(good)
+        return True
+
+    @classmethod
+    def _entry_follows(cls, f, start):
+        '''Чи є в файлі з байта start хоч один цілий запис (заголовок і дані з правильними crc32)'''
+        f.seek(start)
+        tail = f.read()
+        for offset in range(len(tail) - cls.ENTRY.size + 1):
+            length, crc, check = cls.ENTRY.unpack_from(tail, offset)
+            if zlib.crc32(tail[offset:offset + 8]) != check:
+                continue
+            payload = tail[offset + cls.ENTRY.size:offset + cls.ENTRY.size + length]
+            if len(payload) == length and zlib.crc32(payload) == crc:
+                return True
+        return False
+
+    def open(self, obj):
+        '''Доганяє знімок журналом і підключає журнал до obj'''
+        if self.replay(obj, self.old_path):
+            self.replay(obj, self.path)
+            self._fold()
+        else:
+            self.replay(obj, self.path)
+        self.file = open(self.path, "ab")
+        obj._journal = self
+
+    def absorb(self, obj):
+        '''Без режиму журналу: застосовує залишені журнали і вбудовує їх у знімок'''
+        found = self.replay(obj, self.old_path)
+        found = self.replay(obj, self.path) or found
+        if found:
+            save_data_atomic(obj, self.filename)
+            for path in (self.old_path, self.path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def changed(self, key):
+        self.pending.add(key)
+
+    def commit(self, obj):
+        '''Дописує поточний стан змінених ключів (None - видалено)'''
+        if not self.pending:
+            return
+        for key in self.pending:
+            self.file.write(self.entry(key, obj.data.get(key)))
+        self.pending.clear()
+        self.file.flush()
+        self.commits += 1
+        if self.fsync_every and self.commits % self.fsync_every == 0:
+            os.fsync(self.file.fileno())
+        if self.file.tell() >= self.compact_bytes:
+            self.compact()
+
+    def compact(self):
+        '''Відкладає поточний журнал у .old і у фоні зливає його зі знімком'''
+        if self.compactor is not None and self.compactor.is_alive():
+            return
+        if not os.path.exists(self.old_path):
+            self.file.close()
+            os.replace(self.path, self.old_path)
+            self.file = open(self.path, "ab")
+        self.compactor = threading.Thread(target=self._fold_in_background)
+        self.compactor.start()
+
+    def _fold(self):
+        '''Зливає .old зі знімком; .old видаляється лише після того, як новий знімок записано'''
+        # працює тільки з файлами, тому не заважає командам, що змінюють живі об'єкти
+        try:
+            with open(self.filename, "rb") as f:
+                obj = load_pickle(f)
+        except FileNotFoundError:
+            obj = self.default_factory()
+        self.replay(obj, self.old_path)
+        save_data_atomic(obj, self.filename)
+        os.remove(self.old_path)
+
+    def _fold_in_background(self):
+        try:
+            self._fold()
+        except Exception as error:
+            # .old лишається на диску: наступна компакція чи запуск спробують ще раз
+            print(f"\n{Fore.RED}Journal compaction failed, {self.old_path} kept: {error}{Style.RESET_ALL}")
+
+    def close(self, obj):
+        self.commit(obj)
+        os.fsync(self.file.fileno())
+        self.file.close()
+        if self.compactor is not None:
+            self.compactor.join()
+        obj._journal = None
+
+
+#---------------#
+'''Десеріалізація з pickle'''
+def load_data(filename, default_factory, journal=False, fsync_every=1):
+    try:
+        with open(filename, "rb") as f:
+            obj = load_pickle(f)
+    except FileNotFoundError:
+        print(f"{Fore.RED}No file found:{Style.RESET_ALL} {filename}. {Fore.YELLOW}Creating new empty object...{Style.RESET_ALL}")
+        obj = default_factory()
+    # знімок + журнал змін, якщо він є
+    log = Journal(filename, default_factory, fsync_every)
+    if journal:
+        log.open(obj)
+    else:
+        log.absorb(obj)
+    # застосований журнал уже у знімку чи в журналі - завантажене не вважається зміненим
+    obj._saved_version = obj._version
+    return obj
+
+
+def commit_changes(*objects):
+    for obj in objects:
+        obj.commit()
@@ -0,0 +1,334 @@
+'''Мережевий режим: кілька клієнтів працюють з однією книгою'''
+import json
+import signal
+import asyncio
+from .commands import ANSI_CODES, BATCH_COMMANDS, dispatch, dump_stats, parse_input
+from .storage import close_storage, commit_changes, open_storage, persist
+
+
+#------SERVER------#
+'''Мережевий режим: кілька клієнтів працюють з однією книгою через ту саму таблицю команд'''
+# команди, що змінюють книгу чи нотатник; решта лише читають і можуть виконуватися одночасно
+WRITE_COMMANDS = {"add", "change", "add-birthday", "remove-phone", "add-phone", "add-email",
+                  "add-address", "delete-contact", "add-note", "delete-note", "edit-note", "add-tag", "delete-tag"}
+# "show" друкує меню в консоль сервера - клієнтам воно ні до чого; import, export і add-notes
+# читали б і писали довільні файли на машині сервера з його правами
+LOCAL_COMMANDS = {"show", "import", "export", "add-notes"}
+SERVER_COMMANDS = {command: handler for command, handler in BATCH_COMMANDS.items() if command not in LOCAL_COMMANDS}
+STREAM_CHUNK = 256      # рядків таблиці між передачами керування іншим клієнтам
+REFUSAL_LINGER = 1.0    # секунд, поки відмовленому клієнту дають дочитати відповідь
+# межі HTTP-запиту: більше сервер не буферизує
+MAX_BODY = 1024 * 1024
+MAX_HEADERS = 100
+MAX_LINE = 8192         # рядок запиту чи заголовка; довший asyncio відхиляє ще в readline
+
+
+'''Некоректний HTTP-запит: status - код відповіді, після якої з'єднання закривається'''
+class HttpRequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+'''Блокування "багато читачів або один письменник" для корутин; письменник, що чекає, має пріоритет.
+RWLock з concurrent тут не підходить: усі корутини працюють в одному потоці, і чекати треба через await'''
+class ReadWriteLock:
+    def __init__(self):
+        self.readers = 0
+        self.writing = False
+        self.waiting_writers = 0
+        self.waiters = []
+
+    async def _wait(self):
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await waiter
+        finally:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+
+    def _wake(self):
+        waiters, self.waiters = self.waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def acquire_read(self):
+        while self.writing or self.waiting_writers:
+            await self._wait()
+        self.readers += 1
+
+    def release_read(self):
+        self.readers -= 1
+        if not self.readers:
+            self._wake()
+
+    async def acquire_write(self):
+        self.waiting_writers += 1
+        try:
+            while self.writing or self.readers:
+                await self._wait()
+        except BaseException:
+            # письменник не дочекався (тайм-аут) - читачі, що стояли за ним, можуть іти
+            self.waiting_writers -= 1
+            self._wake()
+            raise
+        self.waiting_writers -= 1
+        self.writing = True
+
+    def release_write(self):
+        self.writing = False
+        self._wake()
+
+
+def parse_address(address):
+    '''"host:port" або "unix:/path/to/socket"'''
+    if address.startswith("unix:"):
+        return None, address[5:]
+    host, _, port = address.rpartition(":")
+    if not port.isdigit():
+        raise ValueError(f"Invalid address '{address}'. Use host:port or unix:/path.")
+    return host or "127.0.0.1", int(port)
+
+
+class CommandServer:
+    def __init__(self, options, book, notebook):
+        self.options = options
+        self.book = book
+        self.notebook = notebook
+        self.lock = ReadWriteLock()
+        self.connections = 0
+        self.writes = 0
+
+    async def execute(self, line):
+        '''Виконує один рядок-команду; повертає словник відповіді {"ok", "result" | "error"}'''
+        try:
+            command, args = parse_input(line)
+        except ValueError:
+            return {"ok": False, "error": "Empty command."}
+        handler = SERVER_COMMANDS.get(command)
+        if handler is None:
+            return {"ok": False, "error": "Command not recognized."}
+        try:
+            async with asyncio.timeout(self.options.request_timeout):
+                if command in WRITE_COMMANDS:
+                    text = await self._write(command, handler, args)
+                else:
+                    text = await self._read(command, handler, args)
+        except TimeoutError:
+            return {"ok": False, "error": "Request timed out."}
+        except Exception as error:
+            # помилка однієї команди не повинна зупиняти сервер
+            return {"ok": False, "error": f"{type(error).__name__}: {error}"}
+        return {"ok": True, "result": ANSI_CODES.sub("", text)}
+
+    async def _read(self, command, handler, args):
+        await self.lock.acquire_read()
+        try:
+            result = dispatch(command, handler, args, self.book, self.notebook)
+            if result is None or isinstance(result, str):
+                return result or ""
+            # довгі таблиці видаються частинами, між якими працюють інші клієнти
+            lines = []
+            for row in result:
+                lines.append(row)
+                if len(lines) % STREAM_CHUNK == 0:
+                    await asyncio.sleep(0)
+            return "\n".join(lines)
+        finally:
+            self.lock.release_read()
+
+    async def _write(self, command, handler, args):
+        await self.lock.acquire_write()
+        try:
+            result = dispatch(command, handler, args, self.book, self.notebook)
+            text = result if result is None or isinstance(result, str) else "\n".join(result)
+            commit_changes(self.book, self.notebook)
+            self.writes += 1
+            if self.options.save_every and self.writes % self.options.save_every == 0:
+                self.book, self.notebook = persist(self.options, self.book, self.notebook)
+            return text or ""
+        finally:
+            self.lock.release_write()
+
+    async def _admit(self, reader, writer, refusal):
+        if self.connections < self.options.max_connections:
+            self.connections += 1
+            return True
+        await self._refuse(reader, writer, refusal)
+        return False
+
+    async def _refuse(self, reader, writer, refusal):
+        # відмова, потім FIN; запит клієнта дочитуємо - close з непрочитаними даними скинув би
+        # з'єднання (RST), і клієнт міг би не отримати відмову
+        writer.write(refusal)
+        try:
+            await writer.drain()
+            writer.write_eof()
+            async with asyncio.timeout(REFUSAL_LINGER):
+                while await reader.read(65536):
+                    pass
+        except (ConnectionError, TimeoutError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve_lines(self, reader, writer):
+        '''Рядковий протокол: рядок команди -> рядок JSON з відповіддю, у тому ж порядку'''
+        refusal = json.dumps({"ok": False, "error": "Too many connections."}).encode() + b"\n"
+        if not await self._admit(reader, writer, refusal):
+            return
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                line = line.decode("utf-8", "replace").strip()
+                if not line:
+                    continue
+                if line in ("exit", "close"):
+                    break
+                response = await self.execute(line)
+                writer.write(json.dumps(response, ensure_ascii=False).encode() + b"\n")
+                # конвеєр: наступні запити вже можуть чекати в буфері читання, відповіді йдуть по порядку
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass    # клієнт відключився або надіслав задовгий рядок
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def serve_http(self, reader, writer):
+        '''JSON через HTTP/1.1: POST /command з {"command": "phone Ann"}; з'єднання тримаються відкритими'''
+        refusal = http_response(503, {"ok": False, "error": "Too many connections."}, keep_alive=False)
+        if not await self._admit(reader, writer, refusal):
+            return
+        try:
+            while True:
+                try:
+                    request_line = await reader.readline()
+                except ValueError:
+                    raise HttpRequestError(414, "Request line too long.")
+                if not request_line.strip():
+                    break
+                method, path, version = (request_line.decode("latin-1").split() + ["", "", ""])[:3]
+                try:
+                    # заголовки й тіло мають надійти за --request-timeout; очікування наступного запиту не обмежене
+                    async with asyncio.timeout(self.options.request_timeout):
+                        headers = await read_headers(reader)
+                        body = await reader.readexactly(content_length(headers))
+                except TimeoutError:
+                    raise HttpRequestError(408, "Request timed out.")
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                status, response = await self._http_request(method, path.split("?")[0], headers, body)
+                writer.write(http_response(status, response, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except HttpRequestError as error:
+            await self._refuse(reader, writer, http_response(error.status, {"ok": False, "error": str(error)},
+                                                             keep_alive=False))
+        except (ConnectionError, EOFError):
+            pass    # обірване з'єднання
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def _http_request(self, method, path, headers, body):
+        if path not in ("/", "/command"):
+            return 404, {"ok": False, "error": "Not found."}
+        if method != "POST":
+            return 405, {"ok": False, "error": "Use POST with {\"command\": \"...\"}."}
+        if headers.get("content-type", "").startswith("application/json"):
+            try:
+                request = json.loads(body)
+                line = request["command"] if isinstance(request, dict) else None
+            except (ValueError, KeyError):
+                line = None
+            if not isinstance(line, str):
+                return 400, {"ok": False, "error": "Expected {\"command\": \"<command line>\"}."}
+        else:
+            line = body.decode("utf-8", "replace")
+        response = await self.execute(line.strip())
+        return 200, response
+
+    async def start(self):
+        '''Відкриває сокети з --serve / --http і повертає сервери asyncio (порт 0 - будь-який вільний)'''
+        servers = []
+        for address, handler in ((self.options.serve, self.serve_lines), (self.options.http, self.serve_http)):
+            if not address:
+                continue
+            host, port = parse_address(address)
+            if host is None:
+                server = await asyncio.start_unix_server(handler, port)
+            else:
+                # для HTTP limit обмежує довжину рядка запиту й заголовків; команди в рядковому протоколі можуть бути довшими
+                limit = {"limit": MAX_LINE} if handler == self.serve_http else {}
+                server = await asyncio.start_server(handler, host, port, backlog=1024, **limit)
+            servers.append(server)
+            for sock in server.sockets:
+                print(f"Serving {'HTTP' if handler == self.serve_http else 'commands'} on {sock.getsockname()}", flush=True)
+        return servers
+
+    async def run(self):
+        servers = await self.start()
+        stop = asyncio.Event()
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+        except (NotImplementedError, AttributeError):
+            pass    # Windows: зупинка лише через Ctrl+C
+        try:
+            await stop.wait()
+        finally:
+            for server in servers:
+                server.close()
+
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 408: "Request Timeout",
+                413: "Content Too Large", 414: "URI Too Long", 431: "Request Header Fields Too Large",
+                503: "Service Unavailable"}
+
+
+async def read_headers(reader):
+    '''Заголовки до порожнього рядка; не більше MAX_HEADERS рядків по MAX_LINE байтів'''
+    headers = {}
+    for _ in range(MAX_HEADERS + 1):
+        try:
+            header = await reader.readline()
+        except ValueError:
+            raise HttpRequestError(431, "Header line too long.")
+        if header in (b"\r\n", b"\n", b""):
+            return headers
+        name, _, value = header.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    raise HttpRequestError(431, "Too many headers.")
+
+
+def content_length(headers):
+    value = headers.get("content-length", "0") or "0"
+    if not value.isascii() or not value.isdigit():
+        raise HttpRequestError(400, "Invalid Content-Length.")
+    if int(value) > MAX_BODY:
+        raise HttpRequestError(413, f"Request body is larger than {MAX_BODY} bytes.")
+    return int(value)
+
+
+def http_response(status, payload, keep_alive=True):
+    body = json.dumps(payload, ensure_ascii=False).encode()
+    return (f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode() + body
+
+
+def run_server(options):
+    book, notebook = open_storage(options)
+    server = CommandServer(options, book, notebook)
+    try:
+        asyncio.run(server.run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        close_storage(options, server.book, server.notebook)
+        dump_stats(options.stats_out)
@@ -0,0 +1,77 @@
+'''Сховища книги та нотатника: вибір за опціями командного рядка, збереження й закриття'''
+from colorama import Fore, Style  #for color text
+from ..models import AddressBook, Notebook
+from ..persistence import commit_changes, load_data, save_data_atomic, save_if_changed
+from .columnar import ColumnarAddressBook
+from .sharded import open_sharded
+from .snapshot import MappedAddressBook, load_snapshot, save_snapshot
+from .sqlite import SqliteAddressBook, SqliteNotebook, SqliteStore, migrate_to_sqlite
+
+
+#---------------#
+'''Відкриття та закриття сховища відповідно до опцій'''
+def open_storage(options):
+    if options.sqlite:
+        store = SqliteStore(options.sqlite)
+        if options.migrate:
+            contacts, notes = migrate_to_sqlite(store)
+            print(f"{Fore.YELLOW}Migrated {contacts} contacts and {notes} notes to {options.sqlite}.{Style.RESET_ALL}")
+        return SqliteAddressBook(store), SqliteNotebook(store)
+    return open_book(options), open_notebook(options)
+
+
+def open_book(options):
+    if options.shards:
+        return open_sharded(options.shards)
+    if options.snapshot:
+        return load_snapshot("addressbook.snap", "addressbook.pkl")
+    if options.columnar:
+        book = load_data("addressbook.pkl", ColumnarAddressBook)
+        if not isinstance(book, ColumnarAddressBook):
+            book = ColumnarAddressBook.from_book(book)
+        return book
+    return load_data("addressbook.pkl", AddressBook, options.journal, options.fsync_every)
+
+
+def open_notebook(options):
+    return load_data("notes.pkl", Notebook, options.journal, options.fsync_every)
+
+
+def close_storage(options, book, notebook):
+    if options.sqlite:
+        commit_changes(book, notebook)
+        book.store.close()
+    elif options.journal:
+        # усі зміни вже в журналі - знімок не переписуємо
+        book._journal.close(book)
+        notebook._journal.close(notebook)
+    elif options.snapshot:
+        save_snapshot(book, "addressbook.snap")
+        save_if_changed(notebook, "notes.pkl")
+    elif options.shards:
+        book.save()
+        book.close()
+        save_if_changed(notebook, "notes.pkl")
+    else:
+        # незмінене (або вже збережене автозбереженням) не переписуємо - вихід не чекає на запис
+        save_if_changed(book, "addressbook.pkl")
+        save_if_changed(notebook, "notes.pkl")
+
+
+def persist(options, book, notebook):
+    '''Проміжне збереження для --save-every; сховища лишаються відкритими'''
+    commit_changes(book, notebook)
+    if options.sqlite or options.journal:
+        # commit уже записав зміни в базу чи журнал
+        return book, notebook
+    if options.shards:
+        book.save()
+    elif options.snapshot:
+        if not isinstance(book, MappedAddressBook) or book.data.has_changes():
+            # save_snapshot закриває старий знімок - працюємо далі з новим
+            save_snapshot(book, "addressbook.snap")
+            book = load_snapshot("addressbook.snap", "addressbook.pkl")
+    else:
+        save_data_atomic(book, "addressbook.pkl")
+    save_data_atomic(notebook, "notes.pkl")
+    return book, notebook
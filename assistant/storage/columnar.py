@@ -0,0 +1,294 @@
+'''Колонкове сховище книги'''
+import copy
+import weakref
+import itertools
+from array import array
+from collections.abc import MutableMapping
+from datetime import date
+from ..models import Address, AddressBook, Birthday, Email, Phone, Record, restore_field
+from .lazy import LazyAddressBook
+
+
+#------COLUMNAR STORAGE------#
+'''Записи книги у колонках: телефони - числа в array, дні народження - ordinal дати.
+Record будується лише на час роботи з ним і тримається у слабкому кеші.'''
+class ColumnarRecords(MutableMapping):
+    ODD_PHONE = 1 << 63     # позначка номера, що не записується числом (збережений до валідації)
+
+    def __init__(self, owner):
+        self.owner = owner
+        self.rows = {}                  # ім'я -> рядок; рядки йдуть у порядку додавання
+        self.names = []                 # рядок -> ім'я, None для видалених
+        self.birthdays = array("l")     # date.toordinal() або 0
+        self.emails = []
+        self.addresses = []
+        self.phone_start = array("Q")   # де у self.phones починаються номери рядка
+        self.phone_count = array("H")
+        self.phones = array("Q")        # +380671234567 -> 380671234567
+        self.odd_phones = []
+        self.live_phones = 0
+        self.loaded = weakref.WeakValueDictionary()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['owner'], state['loaded']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.owner = None
+        self.loaded = weakref.WeakValueDictionary()
+
+    def copy_columns(self):
+        '''Незалежна копія колонок: масиви і списки копіюються цілком, записи не створюються'''
+        columns = ColumnarRecords(None)
+        for attr, value in self.__getstate__().items():
+            setattr(columns, attr, copy.copy(value))
+        return columns
+
+    def _pack_phone(self, value):
+        digits = value[1:]
+        if value.startswith('+') and digits.isascii() and digits.isdigit() and digits[:1] != '0' and len(digits) < 19:
+            return int(digits)
+        self.odd_phones.append(value)
+        return self.ODD_PHONE | (len(self.odd_phones) - 1)
+
+    def _unpack_phone(self, packed):
+        if packed & self.ODD_PHONE:
+            return self.odd_phones[packed ^ self.ODD_PHONE]
+        return '+' + str(packed)
+
+    def row_phones(self, row):
+        start = self.phone_start[row]
+        return [self._unpack_phone(packed) for packed in self.phones[start:start + self.phone_count[row]]]
+
+    def _write(self, row, record):
+        self._write_values(row, [phone.value for phone in record.phones],
+                           record.birthday.value.toordinal() if record.birthday else 0,
+                           record.email.value if record.email else None,
+                           record.address.value if record.address else None)
+
+    def _write_values(self, row, phones, birthday, email, address):
+        # нові номери дописуються в кінець, старі лишаються сміттям до compact()
+        self.live_phones -= self.phone_count[row]
+        self.phone_start[row] = len(self.phones)
+        self.phone_count[row] = len(phones)
+        self.phones.extend(map(self._pack_phone, phones))
+        self.live_phones += len(phones)
+        self.birthdays[row] = birthday
+        self.emails[row] = email
+        self.addresses[row] = address
+        if len(self.phones) > 2 * self.live_phones + 1024:
+            self.compact()
+
+    def _restore(self, name):
+        row = self.rows[name]
+        record = Record(name)
+        birthday = self.birthdays[row]
+        record.phones = [restore_field(Phone, phone) for phone in self.row_phones(row)]
+        record.birthday = restore_field(Birthday, date.fromordinal(birthday)) if birthday else None
+        record.email = restore_field(Email, self.emails[row]) if self.emails[row] is not None else None
+        record.address = restore_field(Address, self.addresses[row]) if self.addresses[row] is not None else None
+        return record
+
+    def _build(self, name):
+        record = self._restore(name)
+        record._book = self.owner
+        self.loaded[name] = record
+        return record
+
+    def records(self):
+        '''Усі записи як {ім'я: Record} у порядку книги; у loaded не кешуються і до книги не прив'язані'''
+        return {name: self._restore(name) for name in self.rows}
+
+    def compact(self):
+        '''Прибирає видалені рядки і старі номери, зберігаючи порядок записів'''
+        names = [name for name in self.names if name is not None]
+        old_rows = [self.rows[name] for name in names]
+        phones = array("Q")
+        phone_start = array("Q")
+        for row in old_rows:
+            phone_start.append(len(phones))
+            start = self.phone_start[row]
+            phones.extend(self.phones[start:start + self.phone_count[row]])
+        self.phones = phones
+        self.phone_start = phone_start
+        self.phone_count = array("H", (self.phone_count[row] for row in old_rows))
+        self.birthdays = array("l", (self.birthdays[row] for row in old_rows))
+        self.emails = [self.emails[row] for row in old_rows]
+        self.addresses = [self.addresses[row] for row in old_rows]
+        self.names = names
+        # self.rows правимо на місці - книга використовує його як словник позицій
+        self.rows.clear()
+        self.rows.update((name, row) for row, name in enumerate(names))
+
+    def __getitem__(self, name):
+        record = self.loaded.get(name)
+        if record is not None:
+            return record
+        return self._build(name)
+
+    def _row(self, name):
+        row = self.rows.get(name)
+        if row is None:
+            row = self.rows[name] = len(self.names)
+            self.names.append(name)
+            self.birthdays.append(0)
+            self.emails.append(None)
+            self.addresses.append(None)
+            self.phone_start.append(0)
+            self.phone_count.append(0)
+        return row
+
+    def __setitem__(self, name, record):
+        self._write(self._row(name), record)
+        self.loaded[name] = record
+
+    def put(self, name, phones, birthday, email, address):
+        '''Запис значень напряму в колонки, без Record; birthday - date.toordinal() або 0'''
+        old_record = self.loaded.pop(name, None)
+        if old_record is not None:
+            old_record._book = None
+        self._write_values(self._row(name), phones, birthday, email, address)
+
+    def extend(self, rows):
+        '''Масове додавання (name, phones, birthday, email, address): нові імена - одним extend на колонку'''
+        fresh = {}
+        for row in rows:
+            if row[0] in self.rows:
+                name, phones, birthday, email, address = row
+                self.put(name, phones, birthday.toordinal() if birthday else 0, email, address)
+            else:
+                # повтор імені в самих rows - останній рядок на місці першого, як у add_record
+                fresh[row[0]] = row
+        if not fresh:
+            return
+        start = len(self.names)
+        self.names.extend(fresh)
+        self.rows.update(zip(fresh, range(start, start + len(fresh))))
+        rows = fresh.values()
+        self.birthdays.extend(birthday.toordinal() if birthday else 0 for _, _, birthday, _, _ in rows)
+        self.emails.extend(email for _, _, _, email, _ in rows)
+        self.addresses.extend(address for _, _, _, _, address in rows)
+        counts = [len(phones) for _, phones, _, _, _ in rows]
+        self.phone_count.extend(counts)
+        self.phone_start.extend(itertools.accumulate(counts[:-1], initial=len(self.phones)))
+        # лише _pack_phone відрізняє номер без "+" чи з провідним нулем, які int() спакував би як інший номер
+        self.phones.extend(map(self._pack_phone, itertools.chain.from_iterable(phones for _, phones, _, _, _ in rows)))
+        self.live_phones += sum(counts)
+
+    def __delitem__(self, name):
+        row = self.rows.pop(name)
+        self.loaded.pop(name, None)
+        self.names[row] = None
+        self.live_phones -= self.phone_count[row]
+        self.phone_count[row] = 0
+        self.birthdays[row] = 0
+        self.emails[row] = self.addresses[row] = None
+        if len(self.names) > 2 * len(self.rows) + 1024:
+            self.compact()
+
+    def __contains__(self, name):
+        return name in self.rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def values(self):
+        return (self[name] for name in list(self.rows))
+
+    def changed(self, name):
+        record = self.loaded.get(name)
+        if record is not None:
+            self._write(self.rows[name], record)
+
+
+'''AddressBook з колонковим зберіганням записів; індекси ті самі, що й у звичайної книги'''
+class ColumnarAddressBook(AddressBook):
+    def __init__(self):
+        self.data = ColumnarRecords(self)
+        self._init_indexes()
+        self._journal = None
+
+    def _init_indexes(self):
+        super()._init_indexes()
+        # номер рядка і є позицією запису в книзі
+        self._positions = self.data.rows
+
+    def __reduce__(self):
+        # у addressbook.pkl пишемо звичайну книгу: її відкриває і запуск без --columnar
+        return (AddressBook, (), {'data': self.data.records()})
+
+    def __setstate__(self, state):
+        # файли, збережені ще з колонками
+        self.data = state['columns']
+        self.data.owner = self
+        self._init_indexes()
+        self._journal = None
+
+    @classmethod
+    def from_book(cls, book):
+        columnar = cls()
+        for record in book.data.values():
+            columnar.data[record.name.value] = record
+        # записи старої книги не кешуємо - їх _book вказує на неї
+        columnar.data.loaded.clear()
+        return columnar
+
+    def _changed(self, name):
+        self.data.changed(name)
+        super()._changed(name)
+
+    def changed_copy(self, shadow):
+        # колонки компактні: скопіювати їх дешевше, ніж тримати тінь із Record на кожен рядок
+        book = ColumnarAddressBook.__new__(ColumnarAddressBook)
+        book.data = self.data.copy_columns()
+        return book, None
+
+    def add_record(self, record):
+        name = record.name.value
+        if name in self.data:
+            old_record = self.data[name]
+            self._unindex_record(old_record)
+            old_record._book = None
+        self.data[name] = record
+        record._book = self
+        self._index_record(record)
+        super()._changed(name)
+
+    def add_records(self, records):
+        for record in records:
+            name = record.name.value
+            old_record = self.data.loaded.get(name)
+            if old_record is not None:
+                old_record._book = None
+            self.data[name] = record
+            record._book = self
+            super()._changed(name)
+        for index in self._indexes:
+            index.reset()
+
+    def add_rows(self, rows):
+        # перевірені рядки пишуться прямо в колонки, Record не створюються
+        self.data.extend(rows)
+        self._version += len(rows)
+        if self._journal is not None:
+            for row in rows:
+                self._journal.changed(row[0])
+        for index in self._indexes:
+            index.reset()
+
+    def delete(self, name):
+        if name in self.data:
+            record = self.data[name]
+            self._unindex_record(record)
+            record._book = None
+            del self.data[name]
+            super()._changed(name)
+
+    def _find_phone(self, record, value):
+        # індекс телефонів тримає Phone інших екземплярів запису, тож шукаємо у самому записі
+        return LazyAddressBook._find_phone(self, record, value)
@@ -0,0 +1,48 @@
+'''Спільна основа книг, що тримають записи поза пам'яттю'''
+from ..models import AddressBook
+
+
+'''Спільна основа книг, що тримають записи поза пам'яттю: data - ледачий словник з методом changed'''
+class LazyAddressBook(AddressBook):
+    def __getstate__(self):
+        raise TypeError(f"{type(self).__name__} is kept in its own storage, not pickled.")
+
+    def _changed(self, name):
+        self._version += 1
+        self.data.changed(name)
+
+    def add_record(self, record):
+        name = record.name.value
+        self._version += 1
+        old_record = self.data.loaded.get(name)
+        if old_record is not None and old_record is not record:
+            old_record._book = None
+        if any(index.built for index in self._indexes) and name not in self.data:
+            # у пам'яті лише індекси імен - їм потрібне тільки ім'я нового запису
+            for index in self._indexes:
+                if index.built:
+                    index.add_name(name)
+        self.data[name] = record
+        record._book = self
+
+    def add_records(self, records):
+        # у пам'яті лише індекс імен - масове додавання нічим не відрізняється
+        for record in records:
+            self.add_record(record)
+
+    def delete(self, name):
+        if name in self.data:
+            self._version += 1
+            record = self.data.loaded.get(name)
+            if record is not None:
+                record._book = None
+            del self.data[name]
+            for index in self._indexes:
+                if index.built:
+                    index.remove_name(name)
+
+    def _find_phone(self, record, value):
+        for phone in record.phones:
+            if phone.value == value:
+                return phone
+        return None
@@ -0,0 +1,315 @@
+'''Книга, розділена на шарди в окремих процесах'''
+import os
+import weakref
+import zlib
+from colorama import Fore, Style  #for color text
+import heapq
+import itertools
+from operator import attrgetter
+from collections.abc import MutableMapping
+from ..models import AddressBook, NameIndex, Phone, record_values, restore_record
+from ..persistence import load_data, load_pickle, save_data_atomic
+from .lazy import LazyAddressBook
+
+
+#------SHARDED STORAGE------#
+'''Операції, які процес-шард виконує над своєю частиною книги (звичайною AddressBook).
+Між процесами записи передаються значеннями для restore_record: pickle самих Record
+з полями-об'єктами у кілька разів повільніший. Списки йдуть відсортованими за ім'ям,
+щоб головний процес лише злив відсортовані відповіді шардів'''
+record_name = attrgetter("name.value")
+
+
+def sorted_values(records):
+    return [record_values(record) for record in sorted(records, key=record_name)]
+
+
+def shard_write(book, changes):
+    # changes: ім'я -> значення запису або None (видалено)
+    for name, values in changes.items():
+        if values is None:
+            book.delete(name)
+    book.add_rows([values for values in changes.values() if values is not None])
+
+
+def shard_birthdays(book, start, end):
+    # 29 лютого в невисокосний рік іде після всіх 28 лютого - позначка зберігає цей порядок при злитті
+    return [(bday, bday.day != book.data[name].birthday.value.day, name)
+            for bday, name in book._birthdays(start, end)]
+
+
+SHARD_OPERATIONS = {
+    "get": lambda book, names: [record_values(book.data[name]) if name in book.data else None for name in names],
+    "contains": lambda book, name: name in book.data,
+    "len": lambda book: len(book.data),
+    "write": shard_write,
+    "add_rows": lambda book, rows: book.add_rows(rows),
+    "names": lambda book, prefix, limit: book.complete_names(prefix, limit),
+    "records": lambda book: sorted_values(book.data.values()),
+    "search": lambda book, keyword: sorted_values(book.search(keyword)),
+    "phone": lambda book, value: sorted_values(book.find_by_phone(value)),
+    "birthdays": shard_birthdays,
+    "save": lambda book, path: save_data_atomic(book, path),
+}
+
+
+def shard_worker(connection, path):
+    '''Головний цикл процесу-шарда: (операція, аргументи) -> (True, результат) або (False, виняток)'''
+    import gc
+    import signal
+    # Ctrl+C обробляє головний процес - він і зберігає шарди перед виходом
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        with open(path, "rb") as f:
+            book = load_pickle(f)
+    except FileNotFoundError:
+        book = AddressBook()
+    # записи шарда живуть до кінця процесу: gc не обходить їх щоразу, коли запит створює багато об'єктів
+    gc.freeze()
+    while True:
+        try:
+            request = connection.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        operation, args = request
+        try:
+            connection.send((True, SHARD_OPERATIONS[operation](book, *args)))
+        except Exception as error:
+            connection.send((False, error))
+        if operation in ("write", "add_rows"):
+            gc.freeze()
+
+
+'''Процеси-шарди: запис належить шарду за crc32 імені (hash() рядків у кожному процесі різний)'''
+class ShardPool:
+    def __init__(self, paths):
+        import multiprocessing
+        self.paths = paths
+        self.connections = []
+        self.processes = []
+        for path in paths:
+            connection, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=shard_worker, args=(child, path), daemon=True)
+            process.start()
+            child.close()
+            self.connections.append(connection)
+            self.processes.append(process)
+
+    def __len__(self):
+        return len(self.connections)
+
+    def shard(self, name):
+        return zlib.crc32(name.encode("utf-8")) % len(self.connections)
+
+    @staticmethod
+    def _receive(connection):
+        ok, result = connection.recv()
+        if not ok:
+            raise result
+        return result
+
+    def call(self, shard, operation, *args):
+        self.connections[shard].send((operation, args))
+        return self._receive(self.connections[shard])
+
+    def scatter(self, operation, args_by_shard):
+        '''Одна операція на кількох шардах одночасно: {шард: аргументи} -> {шард: результат}'''
+        # спершу всі запити, потім відповіді - шарди працюють паралельно
+        for shard, args in args_by_shard.items():
+            self.connections[shard].send((operation, args))
+        return {shard: self._receive(self.connections[shard]) for shard in args_by_shard}
+
+    def broadcast(self, operation, *args):
+        results = self.scatter(operation, {shard: args for shard in range(len(self.connections))})
+        return [results[shard] for shard in range(len(self.connections))]
+
+    def close(self):
+        for connection in self.connections:
+            try:
+                connection.send(None)
+            except OSError:
+                pass    # процес уже завершився
+        for process in self.processes:
+            process.join(timeout=10)
+
+
+'''Записи в процесах-шардах: змінені записи чекають у pending і йдуть у шарди пачками на commit'''
+class ShardedRecords(MutableMapping):
+    def __init__(self, pool, owner):
+        self.pool = pool
+        self.owner = owner
+        self.loaded = weakref.WeakValueDictionary()     # копії записів, якими зараз користуються
+        self.pending = {}                               # ім'я -> запис або None (видалено), ще не в шарді
+
+    def _get_loaded(self, values):
+        name = values[0]
+        loaded = self.loaded.get(name)
+        if loaded is not None:
+            return loaded
+        record = restore_record(*values)
+        record._book = self.owner
+        self.loaded[name] = record
+        return record
+
+    def get_many(self, names):
+        '''Записи з іменами names (відсутні пропускаються); кожен шард читається одним запитом'''
+        found = {}
+        missing = {}
+        for name in names:
+            if name in self.pending:
+                if self.pending[name] is not None:
+                    found[name] = self.pending[name]
+                continue
+            record = self.loaded.get(name)
+            if record is not None:
+                found[name] = record
+            else:
+                missing.setdefault(self.pool.shard(name), []).append(name)
+        results = self.pool.scatter("get", {shard: (shard_names,) for shard, shard_names in missing.items()})
+        for shard, records in results.items():
+            for name, values in zip(missing[shard], records):
+                if values is not None:
+                    found[name] = self._get_loaded(values)
+        return [found[name] for name in names if name in found]
+
+    def merged(self, lists):
+        '''Злиття відсортованих за ім'ям відповідей шардів у один потік записів'''
+        return (self._get_loaded(values) for values in heapq.merge(*lists))
+
+    def __getitem__(self, key):
+        records = self.get_many([key])
+        if not records:
+            raise KeyError(key)
+        return records[0]
+
+    def __setitem__(self, key, record):
+        self.loaded[key] = record
+        self.pending[key] = record
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.loaded.pop(key, None)
+        self.pending[key] = None
+
+    def __contains__(self, key):
+        if key in self.pending:
+            return self.pending[key] is not None
+        return key in self.loaded or self.pool.call(self.pool.shard(key), "contains", key)
+
+    def __iter__(self):
+        self.flush()
+        return heapq.merge(*self.pool.broadcast("names", "", None))
+
+    def __len__(self):
+        self.flush()
+        return sum(self.pool.broadcast("len"))
+
+    def values(self):
+        self.flush()
+        return self.merged(self.pool.broadcast("records"))
+
+    def items(self):
+        return ((record.name.value, record) for record in self.values())
+
+    def changed(self, key):
+        record = self.loaded.get(key)
+        if record is not None:
+            self.pending[key] = record
+
+    def flush(self):
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, {}
+        changes = {}
+        for name, record in pending.items():
+            changes.setdefault(self.pool.shard(name), {})[name] = record_values(record) if record is not None else None
+        self.pool.scatter("write", {shard: (shard_changes,) for shard, shard_changes in changes.items()})
+
+
+'''Книга, розкладена по процесах-шардах. Імена, телефони, записи - у шардах; пошук, дні народження,
+сторінки і збереження виконуються всіма шардами одночасно, результати зливаються.
+Порядок перебору - за ім'ям: порядок додавання між шардами не зберігається'''
+class ShardedAddressBook(LazyAddressBook):
+    def __init__(self, pool):
+        self.pool = pool
+        self.data = ShardedRecords(pool, self)
+        self._journal = None
+        # у головному процесі - лише індекс імен для "did you mean", решту індексів ведуть шарди
+        self._name_index = NameIndex()
+        self._indexes = [self._name_index]
+
+    def commit(self):
+        self.data.flush()
+
+    def add_rows(self, rows):
+        # перевірені рядки йдуть прямо в шарди - Record будують самі шарди, паралельно
+        self.data.flush()
+        by_shard = {}
+        for row in rows:
+            by_shard.setdefault(self.pool.shard(row[0]), []).append(row)
+            record = self.data.loaded.pop(row[0], None)
+            if record is not None:
+                record._book = None
+        self.pool.scatter("add_rows", {shard: (shard_rows,) for shard, shard_rows in by_shard.items()})
+        self._version += len(rows)
+        self._name_index.reset()
+
+    def existing_records(self, names):
+        # кожен шард перевіряє свої імена одним запитом
+        self.data.flush()
+        return self.data.get_many(names)
+
+    def find_by_phone(self, phone_number):
+        value = Phone(phone_number).value
+        self.data.flush()
+        return list(self.data.merged(self.pool.broadcast("phone", value)))
+
+    def search(self, keyword):
+        self.data.flush()
+        return list(self.data.merged(self.pool.broadcast("search", keyword)))
+
+    def complete_names(self, prefix, limit=None):
+        self.data.flush()
+        return list(itertools.islice(heapq.merge(*self.pool.broadcast("names", prefix, limit)), limit))
+
+    def page(self, start, stop):
+        # кожен шард віддає перші stop імен за абеткою, сторінка - зріз їхнього злиття
+        self.data.flush()
+        names = itertools.islice(heapq.merge(*self.pool.broadcast("names", "", stop)), start, stop)
+        return self.data.get_many(list(names))
+
+    def _birthdays(self, start, end):
+        # дні народження кожного шарда вже у порядку настання - злиття зберігає його
+        self.data.flush()
+        return [(bday, name) for bday, _, name in heapq.merge(*self.pool.broadcast("birthdays", start, end))]
+
+    def save(self):
+        '''Кожен шард записує свій файл сам - усі одночасно'''
+        self.data.flush()
+        self.pool.scatter("save", {shard: (path,) for shard, path in enumerate(self.pool.paths)})
+
+    def close(self):
+        self.pool.close()
+
+
+def shard_paths(count, filename="addressbook.pkl"):
+    base, ext = os.path.splitext(filename)
+    return [f"{base}.shard-{i + 1}-of-{count}{ext}" for i in range(count)]
+
+
+def open_sharded(count, legacy_filename="addressbook.pkl"):
+    '''Запускає count процесів-шардів; якщо файлів шардів ще немає, розкладає по них addressbook.pkl'''
+    paths = shard_paths(count, legacy_filename)
+    fresh = not any(os.path.exists(path) for path in paths)
+    book = ShardedAddressBook(ShardPool(paths))
+    if fresh and os.path.exists(legacy_filename):
+        legacy = load_data(legacy_filename, AddressBook)
+        for record in legacy.data.values():
+            record._book = None
+            book.data[record.name.value] = record
+        book.commit()
+        print(f"{Fore.YELLOW}Split {legacy_filename} into {count} shards.{Style.RESET_ALL}")
+    return book
@@ -0,0 +1,342 @@
+'''Знімок книги, відображений у пам'ять (mmap)'''
+import os
+import sys
+import mmap
+import struct
+import weakref
+import heapq
+import itertools
+from array import array
+from bisect import bisect_left
+from collections.abc import MutableMapping
+from ..models import AddressBook, BirthdayIndex, NameIndex, Phone, Record, restore_fields
+from ..persistence import load_data
+from .lazy import LazyAddressBook
+
+
+#------MMAP SNAPSHOT------#
+'''Рядок запису для знімка: (ім'я, [телефони], день народження, email, адреса)'''
+def record_row(record):
+    return (record.name.value, [phone.value for phone in record.phones],
+            str(record.birthday) if record.birthday else "",
+            str(record.email) if record.email else "",
+            str(record.address) if record.address else "")
+
+
+'''Колонковий знімок книги контактів, відкритий через mmap: колонки фіксованої ширини + купа рядків'''
+class MappedSnapshot:
+    MAGIC = b"DFXSNAP1"
+    # секції: купа рядків, зміщення імен, зміщення решти полів, записи за іменем,
+    # ключі днів народження (місяць*100 + день), записи за днем народження, зміщення телефонів, власники телефонів
+    SECTIONS = ("heap", "name_offsets", "payload_offsets", "by_name", "bday_keys", "by_bday",
+                "phone_offsets", "owners")
+    # магія, порядок байтів, кількість записів / днів народження / телефонів, початок і кінець кожної секції
+    HEADER = struct.Struct(f"<8sc3I{2 * len(SECTIONS)}Q")
+    FORMATS = (None, "Q", "Q", "I", "H", "I", "Q", "I")
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, order, self.count, self.bday_count, self.phone_count, *bounds = self.HEADER.unpack_from(self.mm)
+        starts, ends = bounds[0::2], bounds[1::2]
+        if magic != self.MAGIC:
+            raise ValueError(f"{path} is not an address book snapshot.")
+        if order != sys.byteorder[0].encode():
+            raise ValueError(f"{path} was written on a machine with a different byte order.")
+        self.view = memoryview(self.mm)
+        self.columns = []
+        for name, fmt, start, end in zip(self.SECTIONS, self.FORMATS, starts, ends):
+            column = self.view[start:end] if fmt is None else self.view[start:end].cast(fmt)
+            self.columns.append(column)
+            setattr(self, name, column)
+
+    def close(self):
+        for column in self.columns:
+            column.release()
+        self.view.release()
+        self.mm.close()
+
+    def _string(self, start, end):
+        return str(self.heap[start:end], "utf-8")
+
+    def name(self, i):
+        # у купі ім'я запису i одразу передує решті його полів
+        return self._string(self.name_offsets[i], self.payload_offsets[i])
+
+    def phone(self, j):
+        return self._string(self.phone_offsets[j], self.phone_offsets[j + 1])
+
+    def row(self, i):
+        payload = self._string(self.payload_offsets[i], self.name_offsets[i + 1])
+        phones, birthday, email, address = payload.split("\x1f")
+        return self.name(i), phones.split(" ") if phones else [], birthday, email, address
+
+    def find(self, name):
+        '''Номер запису з таким ім'ям (бінарний пошук по колонці by_name) або None'''
+        j = bisect_left(self.by_name, name, key=self.name)
+        if j < self.count and self.name(self.by_name[j]) == name:
+            return self.by_name[j]
+        return None
+
+    def names_with_prefix(self, prefix):
+        '''Імена з префіксом за абеткою - суцільний діапазон колонки by_name; розбираються лише вони'''
+        j = bisect_left(self.by_name, prefix, key=self.name)
+        while j < self.count:
+            name = self.name(self.by_name[j])
+            if not name.startswith(prefix):
+                break
+            yield name
+            j += 1
+
+    def birthday_keys(self, low, high):
+        '''Ключі (місяць, день, ім'я) з low <= (місяць, день) < high - прямо з колонок'''
+        lo = bisect_left(self.bday_keys, low[0] * 100 + low[1])
+        hi = bisect_left(self.bday_keys, high[0] * 100 + high[1])
+        return [(self.bday_keys[j] // 100, self.bday_keys[j] % 100, self.name(self.by_bday[j])) for j in range(lo, hi)]
+
+    def phone_owners(self, value):
+        '''Номери записів, яким належить телефон'''
+        j = bisect_left(range(self.phone_count), value, key=self.phone)
+        owners = set()
+        while j < self.phone_count and self.phone(j) == value:
+            owners.add(self.owners[j])
+            j += 1
+        return owners
+
+    @classmethod
+    def write(cls, rows, path):
+        '''Записує знімок з рядків record_row (підміну файлу робить save_snapshot)'''
+        heap = bytearray()
+        name_offsets, payload_offsets = array("Q"), array("Q")
+        names, birthdays, phones = [], [], []
+        for i, (name, record_phones, birthday, email, address) in enumerate(rows):
+            name_offsets.append(len(heap))
+            heap += name.encode()
+            payload_offsets.append(len(heap))
+            heap += "\x1f".join((" ".join(record_phones), birthday, email, address)).encode()
+            names.append(name)
+            if birthday:
+                day, month, _ = birthday.split(".")
+                birthdays.append((int(month) * 100 + int(day), name, i))
+            phones.extend((phone, i) for phone in record_phones)
+        name_offsets.append(len(heap))
+        phone_offsets = array("Q", [len(heap)])
+        phones.sort()
+        for phone, _ in phones:
+            heap += phone.encode()
+            phone_offsets.append(len(heap))
+        birthdays.sort()
+        columns = [bytes(heap), name_offsets, payload_offsets,
+                   array("I", sorted(range(len(names)), key=names.__getitem__)),
+                   array("H", [key for key, _, _ in birthdays]), array("I", [i for _, _, i in birthdays]),
+                   phone_offsets, array("I", [owner for _, owner in phones])]
+
+        with open(path, "wb") as f:
+            position = cls.HEADER.size
+            bounds = []
+            f.write(bytes(position))
+            for column in columns:
+                data = column if isinstance(column, bytes) else column.tobytes()
+                padding = -position % 8     # колонки вирівняні по 8 байт
+                f.write(bytes(padding))
+                position += padding
+                f.write(data)
+                bounds += [position, position + len(data)]
+                position += len(data)
+            f.seek(0)
+            f.write(cls.HEADER.pack(cls.MAGIC, sys.byteorder[0].encode(), len(names), len(birthdays), len(phones), *bounds))
+            f.flush()
+            os.fsync(f.fileno())
+
+
+'''Ледачий словник записів: знімок (лише читання) + словник змін поверх нього'''
+class MappedRecords(MutableMapping):
+    def __init__(self, snapshot, owner):
+        self.snapshot = snapshot        # None - знімка ще немає
+        self.owner = owner
+        self.loaded = weakref.WeakValueDictionary()
+        self.overlay = {}               # ім'я -> змінений або новий Record
+        self.removed = set()            # записи знімка, що видалені (або додані заново в кінець)
+        self.added = {}                 # нові імена у порядку додавання -> порядковий номер додавання
+        self._next_added = 0
+
+    def _index(self, name):
+        return self.snapshot.find(name) if self.snapshot is not None else None
+
+    def _base_count(self):
+        return self.snapshot.count if self.snapshot is not None else 0
+
+    def _build(self, i):
+        name, phones, birthday, email, address = self.snapshot.row(i)
+        record = Record(name)
+        restore_fields(record, phones, birthday, email, address)
+        record._book = self.owner
+        self.loaded[name] = record
+        return record
+
+    def in_snapshot(self, name):
+        '''Чи актуальний рядок знімка для цього імені (запис не змінювався)'''
+        return name not in self.overlay and name not in self.removed
+
+    def position(self, name):
+        # номери додавання лише зростають: після видалень бувають пропуски, але порядок той самий, що в __iter__
+        if name in self.added:
+            return self._base_count() + self.added[name]
+        return self._index(name)
+
+    def __getitem__(self, name):
+        if name in self.overlay:
+            return self.overlay[name]
+        if name in self.removed:
+            raise KeyError(name)
+        record = self.loaded.get(name)
+        if record is not None:
+            return record
+        i = self._index(name)
+        if i is None:
+            raise KeyError(name)
+        return self._build(i)
+
+    def __setitem__(self, name, record):
+        if name not in self.overlay and (name in self.removed or self._index(name) is None):
+            self.added[name] = self._next_added
+            self._next_added += 1
+        self.overlay[name] = record
+        self.loaded[name] = record
+
+    def __delitem__(self, name):
+        if name not in self:
+            raise KeyError(name)
+        self.loaded.pop(name, None)
+        self.overlay.pop(name, None)
+        if name in self.added:
+            del self.added[name]
+        if self._index(name) is not None:
+            self.removed.add(name)
+
+    def __contains__(self, name):
+        if name in self.overlay:
+            return True
+        return name not in self.removed and self._index(name) is not None
+
+    def __iter__(self):
+        for i in range(self._base_count()):
+            name = self.snapshot.name(i)
+            if name not in self.removed:
+                yield name
+        yield from list(self.added)
+
+    def __len__(self):
+        return self._base_count() - len(self.removed) + len(self.added)
+
+    def values(self):
+        return (self[name] for name in self)
+
+    def changed(self, name):
+        record = self.loaded.get(name)
+        if record is not None:
+            self.overlay[name] = record
+
+    def has_changes(self):
+        return bool(self.overlay or self.removed)
+
+    def rows(self):
+        '''Рядки для нового знімка; незмінені записи копіюються з колонок без побудови Record'''
+        for i in range(self._base_count()):
+            name = self.snapshot.name(i)
+            if name in self.removed:
+                continue
+            yield record_row(self.overlay[name]) if name in self.overlay else self.snapshot.row(i)
+        for name in self.added:
+            yield record_row(self.overlay[name])
+
+
+'''Календарний індекс на колонках знімка + змінені записи'''
+class MappedBirthdayIndex(BirthdayIndex):
+    built = True
+
+    def __init__(self, records):
+        self.records = records
+
+    def _range(self, low, high):
+        records = self.records
+        base = []
+        if records.snapshot is not None:
+            base = [key for key in records.snapshot.birthday_keys(low, high) if records.in_snapshot(key[2])]
+        changed = sorted(BirthdayIndex._key(record) for record in records.overlay.values()
+                         if record.birthday and low <= (record.birthday.value.month, record.birthday.value.day) < high)
+        return list(heapq.merge(base, changed))
+
+
+'''AddressBook поверх mmap-знімка: старт без розпаковування записів, Record будується при зверненні'''
+class MappedAddressBook(LazyAddressBook):
+    def __init__(self, snapshot=None):
+        self.data = MappedRecords(snapshot, self)
+        self._journal = None
+        self._name_index = NameIndex()
+        self._indexes = [self._name_index]
+        self._birthday_index = MappedBirthdayIndex(self.data)
+
+    def complete_names(self, prefix, limit=None):
+        # by_name уже відсортована - як find, беремо її діапазон і зливаємо з новими іменами
+        data = self.data
+        base = ()
+        if data.snapshot is not None:
+            base = (name for name in data.snapshot.names_with_prefix(prefix) if name not in data.removed)
+        added = sorted(name for name in data.added if name.startswith(prefix))
+        return list(itertools.islice(heapq.merge(base, added), limit))
+
+    def find_by_phone(self, phone_number):
+        value = Phone(phone_number).value
+        data = self.data
+        names = []
+        if data.snapshot is not None:
+            names = [data.snapshot.name(i) for i in data.snapshot.phone_owners(value)]
+            names = [name for name in names if data.in_snapshot(name)]
+        names += [name for name, record in data.overlay.items()
+                  if any(phone.value == value for phone in record.phones)]
+        return [data[name] for name in sorted(names, key=data.position)]
+
+    def search(self, keyword):
+        keyword = keyword.lower()
+        data = self.data
+        results = []
+        for i in range(data._base_count()):
+            # рядки беремо прямо з колонок, Record будуємо лише для збігів
+            name = data.snapshot.name(i)
+            if name in data.removed:
+                continue
+            if name in data.overlay:
+                if self._matches(data.overlay[name], keyword):
+                    results.append(data.overlay[name])
+                continue
+            _, phones, _, _, _ = data.snapshot.row(i)
+            if keyword in name.lower() or any(keyword in phone for phone in phones):
+                results.append(data[name])
+        results += [data.overlay[name] for name in data.added if self._matches(data.overlay[name], keyword)]
+        return results
+
+
+'''Відкриття знімка (або старого pickle, якщо знімка ще немає)'''
+def load_snapshot(filename, legacy_filename):
+    if os.path.exists(filename):
+        return MappedAddressBook(MappedSnapshot(filename))
+    if os.path.exists(legacy_filename):
+        # перший запуск: читаємо pickle, а при виході збережемо вже знімок
+        return load_data(legacy_filename, AddressBook)
+    return MappedAddressBook()
+
+
+def save_snapshot(book, filename):
+    if isinstance(book, MappedAddressBook):
+        if not book.data.has_changes():
+            return
+        rows = book.data.rows()
+    else:
+        rows = (record_row(record) for record in book.data.values())
+    # новий знімок пишемо поруч і підміняємо старий перейменуванням
+    tmp = filename + ".tmp"
+    MappedSnapshot.write(rows, tmp)
+    if isinstance(book, MappedAddressBook) and book.data.snapshot is not None:
+        book.data.snapshot.close()
+    os.replace(tmp, filename)
@@ -0,0 +1,392 @@
+'''Сховище в SQLite'''
+import sqlite3
+import weakref
+from collections.abc import MutableMapping
+from datetime import datetime
+from ..models import (AddressBook, BirthdayIndex, NameIndex, Note, Notebook, Phone, PrefixIndex, Record,
+                      TextIndex, WrapCache, restore_fields)
+from ..persistence import commit_changes, load_data
+from .lazy import LazyAddressBook
+
+
+#------SQLITE STORAGE------#
+'''Сховище SQLite: одна база для контактів і нотаток (":memory:" - для тестів)'''
+class SqliteStore:
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS contacts (
+            name TEXT PRIMARY KEY,
+            name_lower TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            birthday TEXT,
+            bday_month INTEGER,
+            bday_day INTEGER,
+            email TEXT,
+            address TEXT);
+        CREATE INDEX IF NOT EXISTS contacts_position ON contacts (position);
+        CREATE INDEX IF NOT EXISTS contacts_birthday ON contacts (bday_month, bday_day, name);
+        CREATE TABLE IF NOT EXISTS phones (
+            name TEXT NOT NULL REFERENCES contacts (name) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            phone TEXT NOT NULL);
+        CREATE INDEX IF NOT EXISTS phones_name ON phones (name, position);
+        CREATE INDEX IF NOT EXISTS phones_phone ON phones (phone);
+        CREATE TABLE IF NOT EXISTS notes (
+            id TEXT PRIMARY KEY,
+            text TEXT NOT NULL,
+            created TEXT NOT NULL);
+        CREATE INDEX IF NOT EXISTS notes_created ON notes (created, id);
+        CREATE TABLE IF NOT EXISTS note_tags (
+            note_id TEXT NOT NULL REFERENCES notes (id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            tag TEXT NOT NULL,
+            tag_lower TEXT NOT NULL);
+        CREATE INDEX IF NOT EXISTS note_tags_note ON note_tags (note_id, position);
+        CREATE INDEX IF NOT EXISTS note_tags_tag ON note_tags (tag_lower);
+        CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5 (text, tokenize = 'unicode61 remove_diacritics 0');
+    """
+
+    def __init__(self, path=":memory:"):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript(self.SCHEMA)
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+'''Ледачий словник поверх таблиці: об'єкти будуються лише при зверненні, зміни пишуться в базу при flush'''
+class SqliteMapping(MutableMapping):
+    SELECT = TABLE = KEY = ORDER = None
+
+    def __init__(self, store, owner):
+        self.store = store
+        self.owner = owner
+        self.loaded = weakref.WeakValueDictionary()     # уже побудовані об'єкти, доки ними хтось користується
+        self.pending = {}                               # ключ -> об'єкт або None (видалено), ще не записані
+
+    def _get_loaded(self, row):
+        obj = self.loaded.get(row[0])
+        if obj is None:
+            obj = self._build(row)
+            self.loaded[row[0]] = obj
+        return obj
+
+    def __getitem__(self, key):
+        if key in self.pending:
+            if self.pending[key] is None:
+                raise KeyError(key)
+            return self.pending[key]
+        obj = self.loaded.get(key)
+        if obj is not None:
+            return obj
+        row = self.store.conn.execute(f"{self.SELECT} WHERE {self.KEY} = ?", (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return self._get_loaded(row)
+
+    def __setitem__(self, key, obj):
+        self.loaded[key] = obj
+        self.pending[key] = obj
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.loaded.pop(key, None)
+        self.pending[key] = None
+
+    def __contains__(self, key):
+        if key in self.pending:
+            return self.pending[key] is not None
+        query = f"SELECT 1 FROM {self.TABLE} WHERE {self.KEY} = ?"
+        return self.store.conn.execute(query, (key,)).fetchone() is not None
+
+    def __iter__(self):
+        self.flush()
+        for (key,) in self.store.conn.execute(f"SELECT {self.KEY} FROM {self.TABLE} ORDER BY {self.ORDER}"):
+            yield key
+
+    def __len__(self):
+        self.flush()
+        return self.store.conn.execute(f"SELECT COUNT(*) FROM {self.TABLE}").fetchone()[0]
+
+    def select(self, tail="", params=()):
+        '''Об'єкти з рядків запиту SELECT + tail (умова і порядок) - без окремого запиту на кожен'''
+        self.flush()
+        return [self._get_loaded(row) for row in self.store.conn.execute(f"{self.SELECT} {tail}", params)]
+
+    def items(self):
+        self.flush()
+        for row in self.store.conn.execute(f"{self.SELECT} ORDER BY {self.ORDER}"):
+            yield row[0], self._get_loaded(row)
+
+    def values(self):
+        return (obj for _, obj in self.items())
+
+    def changed(self, key):
+        # об'єкт живий - його саме зараз змінюють
+        obj = self.loaded.get(key)
+        if obj is not None:
+            self.pending[key] = obj
+
+    def flush(self):
+        pending, self.pending = self.pending, {}
+        for key, obj in pending.items():
+            if obj is None:
+                self._delete(key)
+            else:
+                self._write(key, obj)
+
+
+class SqliteRecords(SqliteMapping):
+    # номери в порядку запису; group_concat зберігає порядок упорядкованого підзапиту,
+    # а роздільник char(31) не зустрічається в номерах (старі невалідовані номери можуть мати пробіли)
+    SELECT = """SELECT name, birthday, email, address,
+                       (SELECT group_concat(phone, char(31))
+                          FROM (SELECT phone FROM phones p WHERE p.name = c.name ORDER BY position))
+                FROM contacts c"""
+    TABLE = "contacts"
+    KEY = "name"
+    ORDER = "position"
+
+    def _build(self, row):
+        name, birthday, email, address, phones = row
+        record = Record(name)
+        restore_fields(record, phones.split('\x1f') if phones else [], birthday, email, address)
+        record._book = self.owner
+        return record
+
+    def _write(self, name, record):
+        bday = record.birthday.value if record.birthday else None
+        self.store.conn.execute(
+            """INSERT INTO contacts (name, name_lower, position, birthday, bday_month, bday_day, email, address)
+               VALUES (?, ?, (SELECT COALESCE(MAX(position), 0) + 1 FROM contacts), ?, ?, ?, ?, ?)
+               ON CONFLICT (name) DO UPDATE SET birthday = excluded.birthday, bday_month = excluded.bday_month,
+                   bday_day = excluded.bday_day, email = excluded.email, address = excluded.address""",
+            (name, name.lower(), str(record.birthday) if bday else None,
+             bday.month if bday else None, bday.day if bday else None,
+             str(record.email) if record.email else None, str(record.address) if record.address else None))
+        self.store.conn.execute("DELETE FROM phones WHERE name = ?", (name,))
+        self.store.conn.executemany("INSERT INTO phones (name, position, phone) VALUES (?, ?, ?)",
+                                    [(name, i, phone.value) for i, phone in enumerate(record.phones)])
+
+    def _delete(self, name):
+        self.store.conn.execute("DELETE FROM contacts WHERE name = ?", (name,))
+
+
+class SqliteNotes(SqliteMapping):
+    SELECT = """SELECT id, text, created,
+                       (SELECT group_concat(tag, char(31))
+                          FROM (SELECT tag FROM note_tags t WHERE t.note_id = n.id ORDER BY position))
+                FROM notes n"""
+    TABLE = "notes"
+    KEY = "id"
+    ORDER = "id"
+
+    def _build(self, row):
+        note_id, text, created, tags = row
+        note = Note(text, tags.split('\x1f') if tags else [])
+        note.created = datetime.fromisoformat(created)
+        note._notebook = self.owner
+        note._id = note_id
+        return note
+
+    def _rowid(self, note_id):
+        row = self.store.conn.execute("SELECT rowid FROM notes WHERE id = ?", (note_id,)).fetchone()
+        return row[0] if row else None
+
+    def _write(self, note_id, note):
+        conn = self.store.conn
+        conn.execute("""INSERT INTO notes (id, text, created) VALUES (?, ?, ?)
+                        ON CONFLICT (id) DO UPDATE SET text = excluded.text, created = excluded.created""",
+                     (note_id, note.text, note.created.isoformat()))
+        rowid = self._rowid(note_id)
+        conn.execute("DELETE FROM notes_fts WHERE rowid = ?", (rowid,))
+        conn.execute("INSERT INTO notes_fts (rowid, text) VALUES (?, ?)", (rowid, note.text))
+        conn.execute("DELETE FROM note_tags WHERE note_id = ?", (note_id,))
+        conn.executemany("INSERT INTO note_tags (note_id, position, tag, tag_lower) VALUES (?, ?, ?, ?)",
+                         [(note_id, i, tag, tag.lower()) for i, tag in enumerate(note.tags)])
+
+    def _delete(self, note_id):
+        rowid = self._rowid(note_id)
+        if rowid is not None:
+            self.store.conn.execute("DELETE FROM notes_fts WHERE rowid = ?", (rowid,))
+            self.store.conn.execute("DELETE FROM notes WHERE id = ?", (note_id,))
+
+
+'''Календарний індекс на SQL-індексі contacts_birthday'''
+class SqliteBirthdayIndex(BirthdayIndex):
+    built = True
+
+    def __init__(self, records):
+        self.records = records
+
+    def _range(self, low, high):
+        self.records.flush()
+        return self.records.store.conn.execute(
+            """SELECT bday_month, bday_day, name FROM contacts
+               WHERE (bday_month, bday_day) >= (?, ?) AND (bday_month, bday_day) < (?, ?)
+               ORDER BY bday_month, bday_day, name""", low + high).fetchall()
+
+
+'''Індекс тегів на SQL-індексі note_tags_tag'''
+class SqliteTagIndex:
+    built = True
+
+    def __init__(self, notes):
+        self.notes = notes
+
+    def _note_ids(self, condition, params):
+        self.notes.flush()
+        rows = self.notes.store.conn.execute(f"SELECT DISTINCT note_id FROM note_tags WHERE {condition}", params)
+        return {note_id for (note_id,) in rows}
+
+    def with_prefix(self, prefix):
+        prefix = prefix.lower()
+        return self._note_ids("tag_lower >= ? AND tag_lower < ?", (prefix, prefix + "\U0010ffff"))
+
+    def containing(self, keyword):
+        return self._note_ids("instr(tag_lower, ?) > 0", (keyword.lower(),))
+
+
+'''AddressBook, що зберігає записи в SQLite і будує Record лише при зверненні'''
+class SqliteAddressBook(LazyAddressBook):
+    def __init__(self, store):
+        self.store = store
+        self.data = SqliteRecords(store, self)
+        self._journal = None
+        # решту індексів веде сама база; нечіткого пошуку імен у SQLite немає
+        self._name_index = NameIndex()
+        self._indexes = [self._name_index]
+        self._birthday_index = SqliteBirthdayIndex(self.data)
+
+    def commit(self):
+        '''Одна команда - одна транзакція'''
+        self.data.flush()
+        self.store.commit()
+
+    def find_by_phone(self, phone_number):
+        value = Phone(phone_number).value
+        return self.data.select("WHERE name IN (SELECT name FROM phones WHERE phone = ?) ORDER BY position", (value,))
+
+    def complete_names(self, prefix, limit=None):
+        # діапазон первинного ключа - той самий, що й у PrefixIndex
+        self.data.flush()
+        rows = self.store.conn.execute("SELECT name FROM contacts WHERE name >= ? AND name < ? ORDER BY name LIMIT ?",
+                                       (prefix, prefix + PrefixIndex.END, -1 if limit is None else limit))
+        return [name for name, in rows]
+
+    def search(self, keyword):
+        keyword = keyword.lower()
+        return self.data.select("""WHERE instr(name_lower, ?) > 0
+                                      OR name IN (SELECT name FROM phones WHERE instr(phone, ?) > 0)
+                                   ORDER BY position""", (keyword, keyword))
+
+
+'''Notebook, що зберігає нотатки в SQLite (повнотекстовий пошук - FTS5)'''
+class SqliteNotebook(Notebook):
+    def __init__(self, store):
+        self.store = store
+        self.data = SqliteNotes(store, self)
+        self._journal = None
+        self._tag_index = SqliteTagIndex(self.data)
+        self._wrap_cache = WrapCache()
+        self._indexes = [self._wrap_cache]
+
+    def __getstate__(self):
+        raise TypeError("SqliteNotebook is kept in its own storage, not pickled.")
+
+    def _changed(self, note_id):
+        self._version += 1
+        self.data.changed(note_id)
+
+    def commit(self):
+        '''Одна команда - одна транзакція'''
+        self.data.flush()
+        self.store.commit()
+
+    def _last_note_id(self):
+        self.data.flush()
+        return self.store.conn.execute("SELECT MAX(id) FROM notes").fetchone()[0]
+
+    def _put_note(self, note_id, note):
+        self._version += 1
+        old_note = self.data.loaded.get(note_id)
+        if old_note is not None and old_note is not note:
+            old_note._notebook = None
+        self._wrap_cache.remove(note_id, old_note)
+        self.data[note_id] = note
+        note._notebook = self
+        note._id = note_id
+
+    def delete_note(self, note_id):
+        if note_id in self.data:
+            self._version += 1
+            note = self.data.loaded.get(note_id)
+            if note is not None:
+                note._notebook = None
+                note._id = None
+            self._wrap_cache.remove(note_id, note)
+            del self.data[note_id]
+
+    def complete_ids(self, prefix, limit=None):
+        self.data.flush()
+        rows = self.store.conn.execute("SELECT id FROM notes WHERE id >= ? AND id < ? ORDER BY id LIMIT ?",
+                                       (prefix, prefix + PrefixIndex.END, -1 if limit is None else limit))
+        return [note_id for note_id, in rows]
+
+    def recent_notes(self, start=0, stop=None, since=None):
+        notes = self.data.select("WHERE created >= ? ORDER BY created DESC, id DESC LIMIT ? OFFSET ?",
+                                 (since.isoformat() if since else "", -1 if stop is None else stop - start, start))
+        return [(note._id, note) for note in notes]
+
+    # ключі sort-notes; за датою - індекс notes_created, за тегами SQLite сортує сам
+    SORT_KEYS = {
+        "date": "created",
+        "tag-count": "(SELECT count(*) FROM note_tags t WHERE t.note_id = n.id)",
+        "tag-name": "coalesce((SELECT tag_lower FROM note_tags t WHERE t.note_id = n.id AND position = 0), '')",
+    }
+
+    def get_sorted_notes(self, sort_type="date", reverse=False, start=0, stop=None):
+        key = self.SORT_KEYS.get(sort_type)
+        if key is None:
+            raise ValueError("Unsupported sort type.")
+        # однакові ключі - у порядку id і з DESC, як у Notebook
+        order = "DESC" if reverse else "ASC"
+        notes = self.data.select(f"ORDER BY {key} {order}, id LIMIT ? OFFSET ?",
+                                 (-1 if stop is None else max(stop - start, 0), start))
+        return [(note._id, note) for note in notes]
+
+    def search_text(self, keyword, mode="all", limit=None):
+        if mode == "substring":
+            return super().search_text(keyword, mode, limit)
+        if mode not in ("all", "phrase"):
+            raise ValueError("Unsupported search mode.")
+        terms = TextIndex.tokenize(keyword)
+        if not terms:
+            return []
+        if mode == "phrase":
+            query = '"' + ' '.join(terms) + '"'
+        else:
+            query = ' '.join(f'"{term}"' for term in terms)
+        return self.data.select("""JOIN (SELECT rowid AS fts_rowid, rank FROM notes_fts WHERE notes_fts MATCH ?) f
+                                     ON f.fts_rowid = n.rowid
+                                   ORDER BY f.rank, n.id LIMIT ?""", (query, -1 if limit is None else limit))
+
+
+'''Одноразове перенесення контактів і нотаток з pickle у SQLite'''
+def migrate_to_sqlite(store, book_file="addressbook.pkl", notes_file="notes.pkl"):
+    book = load_data(book_file, AddressBook)
+    notebook = load_data(notes_file, Notebook)
+    sql_book = SqliteAddressBook(store)
+    sql_notebook = SqliteNotebook(store)
+    for record in list(book.data.values()):
+        sql_book.add_record(record)
+    for note_id, note in list(notebook.data.items()):
+        sql_notebook._put_note(note_id, note)
+    commit_changes(sql_book, sql_notebook)
+    return len(book.data), len(notebook.data)
@@ -0,0 +1,674 @@
+'''Бенчмарки помічника на синтетичних книгах контактів і нотатках.
+
+    python benchmark.py run --scales 1k,100k,1m --out bench.json
+    python benchmark.py run --scales 1k --out new.json --baseline bench.json --threshold 10
+    python benchmark.py compare bench.json new.json --threshold 10
+    python benchmark.py stress --scale 10k --threads 1,2,4,8 --duration 3
+    python benchmark.py memory --count 10000
+
+Кожен обробник з COMMANDS (а також save_data / load_data) виконується, доки не скінчиться
+--iterations або --budget секунд. Підготовка аргументів у вимір не входить.
+Результати пишуться в JSON; compare повертає код 1, якщо є регресії понад поріг.
+stress навантажує ConcurrentAddressBook / ConcurrentNotebook потоками-читачами і письменниками
+і повертає код 1, якщо хоч одна операція завершилася винятком.
+memory показує, скільки байтів займає один контакт у звичайній і колонковій книзі.'''
+import os
+import sys
+import gc
+import json
+import time
+import random
+import platform
+import argparse
+import tempfile
+import functools
+import threading
+import tracemalloc
+from datetime import datetime, date, timedelta
+
+from assistant.models import AddressBook, Notebook, Note, Record, restore_record
+from assistant.concurrent import ConcurrentAddressBook, ConcurrentNotebook
+from assistant.persistence import save_data, load_data
+from assistant.exchange import export_file
+from assistant.commands import COMMANDS, PAGE_SIZE, grid_widths, grid_lines
+from assistant.storage.columnar import ColumnarAddressBook
+
+
+#------SYNTHETIC DATA------#
+FIRST_NAMES = ("Olena", "Andrii", "Oksana", "Taras", "Iryna", "Mykola", "Nataliia", "Serhii",
+               "Yuliia", "Dmytro", "Kateryna", "Oleksandr", "Sofiia", "Volodymyr", "Anastasiia",
+               "Bohdan", "Mariia", "Yaroslav", "Halyna", "Petro", "Viktoriia", "Ihor", "Larysa",
+               "Roman", "Tetiana", "Vasyl", "Khrystyna", "Maksym", "Liudmyla", "Yurii")
+LAST_NAMES = ("Shevchenko", "Kovalenko", "Bondarenko", "Tkachenko", "Kravchenko", "Melnyk",
+              "Boiko", "Koval", "Oliinyk", "Shevchuk", "Polishchuk", "Lysenko", "Marchenko",
+              "Savchenko", "Rudenko", "Moroz", "Petrenko", "Klymenko", "Pavlenko", "Kuzmenko",
+              "Ponomarenko", "Levchenko", "Kharchenko", "Karpenko", "Tymoshenko", "Hnatiuk")
+# коди мобільних операторів України
+OPERATOR_CODES = ("50", "66", "95", "99", "67", "68", "96", "97", "98", "63", "73", "93", "91", "92")
+MAIL_DOMAINS = ("ukr.net", "gmail.com", "i.ua", "meta.ua", "outlook.com", "bigmir.net")
+CITIES = ("Kyiv", "Lviv", "Kharkiv", "Odesa", "Dnipro", "Zaporizhzhia", "Vinnytsia", "Poltava",
+          "Chernihiv", "Ivano-Frankivsk", "Uzhhorod", "Ternopil")
+STREETS = ("Khreshchatyk", "Shevchenka", "Franka", "Hrushevskoho", "Sadova", "Nezalezhnosti",
+           "Lesi Ukrainky", "Soborna", "Peremohy", "Heroiv Maidanu")
+WORDS = ("meeting", "call", "budget", "report", "dentist", "birthday", "gift", "groceries",
+         "project", "deadline", "review", "invoice", "trip", "tickets", "train", "hotel",
+         "lecture", "homework", "exam", "python", "refactor", "deploy", "release", "bug",
+         "doctor", "pharmacy", "football", "concert", "museum", "recipe", "borshch", "varenyky",
+         "garden", "repair", "plumber", "insurance", "bank", "passport", "visa", "book")
+TAGS = ("work", "home", "urgent", "family", "study", "health", "finance", "travel", "shopping",
+        "ideas", "later", "python", "goit", "friends", "sport") + tuple(f"project-{i}" for i in range(1, 60))
+# популярні теги трапляються значно частіше за рідкісні (розподіл Ципфа)
+TAG_WEIGHTS = tuple(1 / rank for rank in range(1, len(TAGS) + 1))
+
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+NOTES_START = datetime(2022, 1, 1, 8, 0)
+
+
+def phone_digits(rng):
+    return rng.choice(OPERATOR_CODES) + f"{rng.randrange(10_000_000):07d}"
+
+
+'''Номер у одному з форматів, які приймає Phone'''
+def raw_phone(rng):
+    digits = phone_digits(rng)
+    style = rng.randrange(4)
+    if style == 0:
+        return "+380" + digits
+    if style == 1:
+        return "380" + digits
+    if style == 2:
+        return "0" + digits
+    return f"0{digits[:2]}-{digits[2:5]}-{digits[5:7]}-{digits[7:]}"
+
+
+def contact_rows(rng, count):
+    '''Рядки (name, phones, birthday, email, address) для AddressBook.add_rows'''
+    seen = {}
+    for _ in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        base = f"{first}_{last}"
+        seen[base] = seen.get(base, 0) + 1
+        name = base if seen[base] == 1 else f"{base}_{seen[base]}"
+        phones = ["+380" + phone_digits(rng) for _ in range(rng.choices((0, 1, 2, 3), (5, 60, 28, 7))[0])]
+        birthday = date(rng.randint(1950, 2010), 1, 1) + timedelta(days=rng.randrange(365)) \
+            if rng.random() < 0.7 else None
+        email = f"{first.lower()}.{last.lower()}{seen[base]}@{rng.choice(MAIL_DOMAINS)}" \
+            if rng.random() < 0.6 else None
+        address = f"{rng.choice(CITIES)}, {rng.choice(STREETS)} {rng.randint(1, 150)}" \
+            if rng.random() < 0.4 else None
+        yield name, phones, birthday, email, address
+
+
+def note_text(rng):
+    return " ".join(rng.choices(WORDS, k=rng.randint(3, 25)))
+
+
+def note_tags(rng):
+    return list(dict.fromkeys(rng.choices(TAGS, TAG_WEIGHTS, k=rng.choices((0, 1, 2, 3, 4), (15, 35, 30, 15, 5))[0])))
+
+
+def build_book(rng, count):
+    book = AddressBook()
+    rows = contact_rows(rng, count)
+    while True:
+        chunk = [row for _, row in zip(range(50_000), rows)]
+        if not chunk:
+            return book
+        book.add_rows(chunk)
+
+
+def build_notebook(rng, count):
+    notebook = Notebook()
+    created = NOTES_START
+    notes = []
+    for _ in range(count):
+        created += timedelta(seconds=rng.randint(1, 180))
+        note = Note(note_text(rng), note_tags(rng))
+        note.created = created
+        notes.append(note)
+    notebook.add_notes(notes)
+    return notebook
+
+
+#------SCENARIOS------#
+'''Контекст прогону: дані, генератор випадкових чисел, тимчасова тека'''
+class Context:
+    def __init__(self, book, notebook, rng, workdir):
+        self.book = book
+        self.notebook = notebook
+        self.rng = rng
+        self.workdir = workdir
+        self.names = list(book.data)
+        self.note_ids = list(notebook.data)
+        self.serial = 0
+
+    def name(self):
+        return self.rng.choice(self.names)
+
+    def record(self, where=lambda record: True):
+        # у синтетичній книзі потрібні записи трапляються часто - кількох спроб вистачає
+        for _ in range(100):
+            record = self.book.find(self.name())
+            if record is not None and where(record):
+                return record
+        raise LookupError("no suitable contact in the benchmark book")
+
+    def note_id(self):
+        for _ in range(100):
+            note_id = self.rng.choice(self.note_ids)
+            if note_id in self.notebook.data:
+                return note_id
+        raise LookupError("no note in the benchmark notebook")
+
+    def fresh_name(self):
+        self.serial += 1
+        return f"Bench_Contact_{self.serial}"
+
+    def path(self, filename):
+        return os.path.join(self.workdir, filename)
+
+
+def with_phone(record):
+    return bool(record.phones)
+
+
+def delete_contact_args(ctx):
+    name = ctx.fresh_name()
+    ctx.book.add_record(restore_record(name, ["+380" + phone_digits(ctx.rng)], None, None, None))
+    return [name]
+
+
+def change_args(ctx):
+    record = ctx.record(with_phone)
+    return [record.name.value, ctx.rng.choice(record.phones).value, raw_phone(ctx.rng)]
+
+
+def remove_phone_args(ctx):
+    record = ctx.record()
+    phone = "+380" + phone_digits(ctx.rng)
+    record.add_phone(phone)
+    return [record.name.value, phone]
+
+
+def import_args(ctx):
+    path = ctx.path("import.csv")
+    if not os.path.exists(path):
+        rng = random.Random("import")
+        book = AddressBook()
+        book.add_rows(list(contact_rows(rng, IMPORT_ROWS)))
+        export_file(book, path, "csv")
+    return [path, "--rejects", ctx.path("import.rejects.csv")]
+
+
+def add_notes_args(ctx):
+    path = ctx.path("notes.txt")
+    if not os.path.exists(path):
+        rng = random.Random("add-notes")
+        with open(path, "w", encoding="utf-8") as f:
+            for _ in range(IMPORT_ROWS):
+                f.write(f"{note_text(rng)} --tags {';'.join(note_tags(rng))}\n")
+    return [path]
+
+
+def delete_note_args(ctx):
+    note = Note(note_text(ctx.rng), note_tags(ctx.rng))
+    ctx.notebook.add_note(note)
+    return [note._id]
+
+
+def delete_tag_args(ctx):
+    note_id = ctx.note_id()
+    tag = ctx.rng.choice(TAGS)
+    ctx.notebook.data[note_id].add_tag(tag)
+    return [note_id, tag]
+
+
+IMPORT_ROWS = 1_000
+
+# команда -> підготовка аргументів (не входить у вимір); команди без сценарію запускаються без аргументів
+SCENARIOS = {
+    "add": lambda ctx: [ctx.fresh_name(), raw_phone(ctx.rng)],
+    "change": change_args,
+    "phone": lambda ctx: [ctx.name()],
+    "search": lambda ctx: [ctx.record(with_phone).phones[0].value[-7:]],
+    "all": lambda ctx: ["--page", str(ctx.rng.randint(1, max(1, len(ctx.book) // PAGE_SIZE)))],
+    "add-birthday": lambda ctx: [ctx.name(), f"{ctx.rng.randint(1, 28):02d}.{ctx.rng.randint(1, 12):02d}.{ctx.rng.randint(1950, 2010)}"],
+    "show-birthday": lambda ctx: [ctx.record(lambda record: record.birthday).name.value],
+    "birthdays-in": lambda ctx: [str(ctx.rng.randint(1, 60))],
+    "remove-phone": remove_phone_args,
+    "add-phone": lambda ctx: [ctx.name(), raw_phone(ctx.rng)],
+    "who": lambda ctx: [ctx.record(with_phone).phones[0].value],
+    "import": import_args,
+    "export": lambda ctx: [ctx.path("export.csv")],
+    "add-email": lambda ctx: [ctx.name(), f"bench{ctx.rng.randrange(10**6)}@{ctx.rng.choice(MAIL_DOMAINS)}"],
+    "show-email": lambda ctx: [ctx.record(lambda record: record.email).name.value],
+    "add-address": lambda ctx: [ctx.name(), ctx.rng.choice(CITIES), ctx.rng.choice(STREETS), str(ctx.rng.randint(1, 150))],
+    "show-address": lambda ctx: [ctx.record(lambda record: record.address).name.value],
+    "delete-contact": delete_contact_args,
+    "add-note": lambda ctx: note_text(ctx.rng).split() + ["--tags", ";".join(note_tags(ctx.rng))],
+    "add-notes": add_notes_args,
+    "delete-note": delete_note_args,
+    "show-notes": lambda ctx: ["--page", str(ctx.rng.randint(1, max(1, len(ctx.notebook) // PAGE_SIZE)))],
+    "find-tag": lambda ctx: [ctx.rng.choices(TAGS, TAG_WEIGHTS)[0]],
+    "find-note": lambda ctx: ctx.rng.sample(WORDS, ctx.rng.choice((1, 1, 2))),
+    "edit-note": lambda ctx: [ctx.note_id()] + note_text(ctx.rng).split(),
+    "add-tag": lambda ctx: [ctx.note_id(), ctx.rng.choice(TAGS)],
+    "delete-tag": delete_tag_args,
+    "sort-notes": lambda ctx: [ctx.rng.choice(("date", "tag-count", "tag-name"))],
+}
+
+
+def command_operation(command):
+    handler = COMMANDS[command]
+    prepare = SCENARIOS.get(command, lambda ctx: [])
+
+    def setup(ctx):
+        return prepare(ctx)
+
+    def run(ctx, args):
+        result = handler(args, ctx.book, ctx.notebook)
+        # таблиці видаються генераторами - вимір включає всі рядки відповіді
+        if result is not None and not isinstance(result, str):
+            for _ in result:
+                pass
+    return setup, run
+
+
+def storage_operations():
+    '''save_data / load_data для книги і нотатника: ключ -> (setup, run)'''
+    operations = {}
+    for what, factory in (("book", AddressBook), ("notebook", Notebook)):
+        def save_setup(ctx, what=what):
+            return ctx.path(f"{what}.pkl")
+
+        def save_run(ctx, filename, what=what):
+            save_data(getattr(ctx, what), filename)
+
+        def load_setup(ctx, what=what):
+            filename = ctx.path(f"{what}.pkl")
+            if not os.path.exists(filename):
+                save_data(getattr(ctx, what), filename)
+            return filename
+
+        def load_run(ctx, filename, factory=factory):
+            load_data(filename, factory)
+
+        operations[f"save_data:{what}"] = (save_setup, save_run)
+        operations[f"load_data:{what}"] = (load_setup, load_run)
+    return operations
+
+
+#------MEASUREMENT------#
+def percentile(samples, fraction):
+    '''samples відсортовані; метод найближчого рангу'''
+    index = max(0, min(len(samples) - 1, round(fraction * len(samples) + 0.5) - 1))
+    return samples[index]
+
+
+def measure(ctx, setup, run, iterations, budget, memory_iterations):
+    timings = []
+    spent = 0.0
+    while len(timings) < iterations and (spent < budget or not timings):
+        args = setup(ctx)
+        started = time.perf_counter()
+        run(ctx, args)
+        elapsed = time.perf_counter() - started
+        timings.append(elapsed)
+        spent += elapsed
+    timings.sort()
+
+    # окремий прохід під tracemalloc: він сповільнює виконання і не повинен псувати час
+    peaks = []
+    blocks = []
+    gc.collect()
+    tracemalloc.start()
+    try:
+        for _ in range(min(memory_iterations, len(timings))):
+            args = setup(ctx)
+            gc.collect()
+            tracemalloc.reset_peak()
+            before_bytes = tracemalloc.get_traced_memory()[0]
+            before_blocks = sys.getallocatedblocks()
+            run(ctx, args)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before_bytes)
+            blocks.append(sys.getallocatedblocks() - before_blocks)
+    finally:
+        tracemalloc.stop()
+
+    ms = [t * 1000 for t in timings]
+    return {
+        "iterations": len(ms),
+        "mean_ms": sum(ms) / len(ms),
+        "p50_ms": percentile(ms, 0.50),
+        "p90_ms": percentile(ms, 0.90),
+        "p99_ms": percentile(ms, 0.99),
+        "max_ms": ms[-1],
+        "peak_kib": max(peaks) / 1024 if peaks else None,
+        # чистий приріст виділених об'єктів за виклик (те, що команда залишила в пам'яті)
+        "allocated_blocks": sum(blocks) / len(blocks) if blocks else None,
+    }
+
+
+def operations(only=None):
+    result = {command: command_operation(command) for command in COMMANDS}
+    result.update(storage_operations())
+    if only:
+        unknown = set(only) - set(result)
+        if unknown:
+            raise SystemExit(f"Unknown operations: {', '.join(sorted(unknown))}")
+        result = {name: result[name] for name in only}
+    return result
+
+
+def run_scale(label, count, options, log):
+    rng = random.Random(f"{options.seed}:{label}")
+    started = time.perf_counter()
+    book = build_book(rng, count)
+    notebook = build_notebook(rng, count)
+    build_seconds = time.perf_counter() - started
+    log(f"{label}: built {len(book)} contacts and {len(notebook)} notes in {build_seconds:.1f}s")
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        ctx = Context(book, notebook, random.Random(f"{options.seed}:{label}:run"), workdir)
+        with open(os.devnull, "w") as devnull:
+            for name, (setup, run) in operations(options.only).items():
+                # "show" і завантаження без файлу друкують у stdout - у звіт це не потрапляє
+                stdout, sys.stdout = sys.stdout, devnull
+                try:
+                    results[name] = measure(ctx, setup, run, options.iterations, options.budget,
+                                            options.memory_iterations)
+                finally:
+                    sys.stdout = stdout
+                log(f"  {name:<22} p50 {results[name]['p50_ms']:10.3f} ms  "
+                    f"p99 {results[name]['p99_ms']:10.3f} ms  ({results[name]['iterations']} runs)")
+    return {"contacts": count, "notes": count, "build_s": build_seconds, "operations": results}
+
+
+def run_benchmarks(options, log=print):
+    report = {
+        "format": 1,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": options.seed,
+        "scales": {},
+    }
+    for label in options.scales:
+        report["scales"][label] = run_scale(label, SCALES[label], options, log)
+    return report
+
+
+#------COMPARISON------#
+def compare(baseline, current, threshold, metric="p50_ms", min_delta_ms=0.01):
+    '''Рядки (scale, operation, base, new, зміна %, регресія?) для операцій, що є в обох звітах'''
+    rows = []
+    for label, scale in current["scales"].items():
+        base_scale = baseline["scales"].get(label)
+        if base_scale is None:
+            continue
+        for name, result in scale["operations"].items():
+            base_result = base_scale["operations"].get(name)
+            if base_result is None or base_result.get(metric) is None or result.get(metric) is None:
+                continue
+            old, new = base_result[metric], result[metric]
+            change = (new - old) / old * 100 if old else 0.0
+            # зовсім малі абсолютні різниці - шум таймера, а не регресія
+            regressed = change > threshold and (not metric.endswith("_ms") or new - old > min_delta_ms)
+            rows.append((label, name, old, new, change, regressed))
+    return rows
+
+
+def comparison_lines(rows, metric):
+    headers = ("Scale", "Operation", f"Base {metric}", f"New {metric}", "Change", "")
+    cells = [(label, name, f"{old:.3f}", f"{new:.3f}", f"{change:+.1f}%", "REGRESSION" if regressed else "")
+             for label, name, old, new, change, regressed in rows]
+    return grid_lines(headers, cells, grid_widths(headers, cells))
+
+
+def report_comparison(baseline_path, current, options):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    rows = compare(baseline, current, options.threshold, options.metric, options.min_delta)
+    for line in comparison_lines(rows, options.metric):
+        print(line)
+    regressions = [row for row in rows if row[-1]]
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {options.threshold:g}% ({options.metric})")
+        return 1
+    print(f"No regressions over {options.threshold:g}% ({options.metric})")
+    return 0
+
+
+#------THREADS------#
+def read_page(ctx):
+    start = ctx.rng.randrange(len(ctx.book))
+    return ctx.book.page(start, start + PAGE_SIZE)
+
+
+# читання: довгі перебори (пошук двома літерами, уся книга) і короткі запити до індексів
+STRESS_READS = {
+    "search-scan": lambda ctx: ctx.book.search(ctx.name()[:2]),
+    "search": lambda ctx: ctx.book.search(ctx.record(with_phone).phones[0].value[-7:]),
+    "who": lambda ctx: ctx.book.find_by_phone(ctx.record(with_phone).phones[0].value),
+    "birthdays-in": lambda ctx: ctx.book.get_birthdays_in_days(ctx.rng.randint(1, 60)),
+    "page": read_page,
+    "scan": lambda ctx: sum(len(record.phones) for record in ctx.book.snapshot()),
+    "find-tag": lambda ctx: ctx.notebook.find_by_tag(ctx.rng.choices(TAGS, TAG_WEIGHTS)[0]),
+    "find-note": lambda ctx: ctx.notebook.search_text(ctx.rng.choice(WORDS)),
+    "recent-notes": lambda ctx: ctx.notebook.recent_notes(0, PAGE_SIZE),
+}
+
+
+def stress_write(ctx, created):
+    '''Одна зміна: новий контакт (найстаріший зі своїх видаляється), телефон, нотатка чи тег'''
+    choice = ctx.rng.randrange(4)
+    if choice == 0:
+        name = ctx.fresh_name()
+        ctx.book.add_record(restore_record(name, ["+380" + phone_digits(ctx.rng)], None, None, None))
+        created.append(name)
+        if len(created) > 100:
+            ctx.book.delete(created.pop(0))
+    elif choice == 1:
+        record = ctx.record()
+        phone = "+380" + phone_digits(ctx.rng)
+        record.add_phone(phone)
+        record.remove_phone(phone)
+    elif choice == 2:
+        note = Note(note_text(ctx.rng), note_tags(ctx.rng))
+        ctx.notebook.add_note(note)
+        ctx.notebook.delete_note(note._id)
+    else:
+        note = ctx.notebook.data.get(ctx.rng.choice(ctx.note_ids))
+        if note is not None:
+            note.add_tag(ctx.rng.choice(TAGS))
+    ctx.book.commit()
+    ctx.notebook.commit()
+
+
+def stress_round(contexts, readers, writers, duration):
+    '''readers потоків читають, writers - пишуть duration секунд; повертає (читань, записів, помилки)'''
+    counts = [0] * (readers + writers)
+    errors = []
+    start = threading.Barrier(readers + writers + 1)
+    stop = threading.Event()
+
+    def worker(slot, ctx, operation):
+        start.wait()
+        while not stop.is_set():
+            try:
+                operation(ctx)
+            except Exception as error:
+                errors.append(f"{type(error).__name__}: {error}")
+            counts[slot] += 1
+
+    def read(ctx):
+        STRESS_READS[ctx.rng.choice(tuple(STRESS_READS))](ctx)
+
+    threads = []
+    for slot in range(readers + writers):
+        ctx = contexts[slot]
+        operation = read if slot < readers else functools.partial(stress_write, created=[])
+        threads.append(threading.Thread(target=worker, args=(slot, ctx, operation), daemon=True))
+    for thread in threads:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return sum(counts[:readers]) / elapsed, sum(counts[readers:]) / elapsed, errors
+
+
+def run_stress(options, log=print):
+    rng = random.Random(f"{options.seed}:stress")
+    count = SCALES[options.scale]
+    book = ConcurrentAddressBook.from_book(build_book(rng, count))
+    notebook = ConcurrentNotebook.from_notebook(build_notebook(rng, count))
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    log(f"{options.scale}: {len(book)} contacts, {len(notebook)} notes; "
+        f"{os.cpu_count()} CPU(s), GIL {'enabled' if gil else 'disabled'}")
+
+    # контекст (і генератор випадкових чисел) у кожного потоку свій; індекси будуються заздалегідь
+    contexts = [Context(book, notebook, random.Random(f"{options.seed}:stress:{slot}"), None)
+                for slot in range(max(options.threads) + options.writers)]
+    for operation in STRESS_READS.values():
+        operation(contexts[0])
+
+    rows = []
+    failures = []
+    base = None
+    for readers in options.threads:
+        reads, writes, errors = stress_round(contexts, readers, options.writers, options.duration)
+        base = base or reads
+        speedup = reads / base
+        rows.append((str(readers), f"{reads:.0f}", f"{speedup:.2f}x", f"{speedup / readers:.0%}",
+                     f"{writes:.0f}", str(len(errors))))
+        failures += errors
+    headers = ("Readers", "Reads/s", "Speedup", "Per thread", "Writes/s", "Errors")
+    for line in grid_lines(headers, rows, grid_widths(headers, rows)):
+        log(line)
+    if gil:
+        # потоки одного процесу з GIL виконують байт-код по черзі: сумарна швидкість читань
+        # обмежена одним ядром, лінійне зростання можливе лише на збірці без GIL
+        log("Note: with the GIL reads/s stays close to one core; reads scale with threads on a free-threaded build.")
+    for error in sorted(set(failures))[:10]:
+        log(f"  {error}")
+    return 1 if failures else 0
+
+
+#------MEMORY------#
+def memory_per_contact(book_factory, count):
+    '''Скільки байтів пам'яті займає один контакт у книзі, створеній book_factory'''
+    gc.collect()
+    tracemalloc.start()
+    book = book_factory()
+    for i in range(count):
+        record = Record(f"Contact {i}")
+        record.add_phone(f"067{i:07d}")
+        record.add_phone(f"050{i:07d}")
+        record.add_birthday(f"{i % 28 + 1:02d}.{i % 12 + 1:02d}.{1950 + i % 50}")
+        record.add_email(f"contact{i}@example.com")
+        book.add_record(record)
+        del record
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return used / count
+
+
+def run_memory(options, log=print):
+    for factory in (AddressBook, ColumnarAddressBook):
+        log(f"{factory.__name__}: {memory_per_contact(factory, options.count):.0f} bytes per contact")
+    return 0
+
+
+#------COMMAND LINE------#
+def scale_list(value):
+    labels = [label.strip().lower() for label in value.split(",") if label.strip()]
+    unknown = [label for label in labels if label not in SCALES]
+    if unknown or not labels:
+        raise argparse.ArgumentTypeError(f"scales must be from: {', '.join(SCALES)}")
+    return labels
+
+
+def thread_counts(value):
+    try:
+        counts = [int(count) for count in value.split(",") if count.strip()]
+    except ValueError:
+        counts = []
+    if not counts or min(counts) < 1:
+        raise argparse.ArgumentTypeError("threads must be positive integers, e.g. 1,2,4,8")
+    return counts
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the personal assistant bot")
+    commands = parser.add_subparsers(dest="mode", required=True)
+
+    def comparison_options(sub):
+        sub.add_argument("--threshold", type=float, default=10.0, metavar="PCT",
+                         help="report a regression when the metric grows by more than PCT percent")
+        sub.add_argument("--metric", default="p50_ms",
+                         choices=("mean_ms", "p50_ms", "p90_ms", "p99_ms", "max_ms", "peak_kib", "allocated_blocks"))
+        sub.add_argument("--min-delta", type=float, default=0.01, metavar="MS",
+                         help="ignore time differences smaller than MS milliseconds")
+
+    run = commands.add_parser("run", help="generate data, run the benchmarks and write JSON results")
+    run.add_argument("--scales", type=scale_list, default=["1k", "100k", "1m"],
+                     help=f"comma separated sizes from {', '.join(SCALES)} (default 1k,100k,1m)")
+    run.add_argument("--seed", type=int, default=2024)
+    run.add_argument("--iterations", type=int, default=200, help="maximum timed runs per operation")
+    run.add_argument("--budget", type=float, default=2.0, metavar="SECONDS",
+                     help="stop timing an operation after this much time (at least one run)")
+    run.add_argument("--memory-iterations", type=int, default=5,
+                     help="runs per operation under tracemalloc for peak memory and allocations")
+    run.add_argument("--only", type=lambda value: value.split(","), metavar="OP,OP",
+                     help="run only these operations (command names, save_data:book, ...)")
+    run.add_argument("--out", metavar="FILE", help="write JSON results to FILE")
+    run.add_argument("--baseline", metavar="FILE", help="compare the results with an earlier JSON file")
+    comparison_options(run)
+
+    diff = commands.add_parser("compare", help="compare two JSON result files")
+    diff.add_argument("baseline")
+    diff.add_argument("current")
+    comparison_options(diff)
+
+    stress = commands.add_parser("stress", help="run reader and writer threads against a thread-safe book")
+    stress.add_argument("--scale", choices=tuple(SCALES), default="10k")
+    stress.add_argument("--threads", type=thread_counts, default=[1, 2, 4, 8], metavar="N,N",
+                        help="reader thread counts to compare (default 1,2,4,8)")
+    stress.add_argument("--writers", type=int, default=1, help="writer threads running alongside the readers")
+    stress.add_argument("--duration", type=float, default=3.0, metavar="SECONDS", help="length of each round")
+    stress.add_argument("--seed", type=int, default=2024)
+
+    memory = commands.add_parser("memory", help="print bytes per contact in each in-memory book mode")
+    memory.add_argument("--count", type=int, default=10000, help="synthetic contacts per book")
+    return parser.parse_args(argv)
+
+
+def main_cli(argv=None):
+    options = parse_arguments(argv)
+    if options.mode == "compare":
+        with open(options.current, encoding="utf-8") as f:
+            current = json.load(f)
+        return report_comparison(options.baseline, current, options)
+    if options.mode == "stress":
+        return run_stress(options)
+    if options.mode == "memory":
+        return run_memory(options)
+
+    report = run_benchmarks(options)
+    if options.out:
+        with open(options.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {options.out}")
+    if options.baseline:
+        return report_comparison(options.baseline, report, options)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1 @@
+'''Тести помічника: python -m pytest'''
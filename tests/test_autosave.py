@@ -0,0 +1,114 @@
+'''Автозбереження: знімок під блокуванням, pickle і запис - без нього'''
+import pickle
+
+import main
+from assistant.concurrent import ConcurrentAddressBook, RWLock
+from assistant.models import AddressBook, Notebook, Note, Record
+from assistant.persistence import load_data
+from assistant.storage.columnar import ColumnarAddressBook
+
+
+def contact(name, *phones):
+    record = Record(name)
+    for phone in phones:
+        record.add_phone(phone)
+    return record
+
+
+def phones(book):
+    return {name: [phone.value for phone in record.phones] for name, record in book.data.items()}
+
+
+def test_changed_copy_follows_book():
+    book = AddressBook()
+    for name in ("Ann", "Bob", "Cid"):
+        book.add_record(contact(name, "0501234567"))
+    snapshot, shadow = book.changed_copy(None)
+
+    book.find("Ann").add_phone("0671112233")
+    book.delete("Bob")
+    book.add_record(contact("Bob", "0939998877"))
+    book.add_record(contact("Dan", "0631112233"))
+    book.delete("Cid")
+    # перший знімок уже відокремлений від книги
+    assert phones(pickle.loads(pickle.dumps(snapshot))) == {
+        "Ann": ["+380501234567"], "Bob": ["+380501234567"], "Cid": ["+380501234567"]}
+
+    snapshot, shadow = book.changed_copy(shadow)
+    restored = pickle.loads(pickle.dumps(snapshot))
+    assert list(restored.data) == list(book.data) == ["Ann", "Bob", "Dan"]
+    assert phones(restored) == phones(book)
+
+
+def test_changed_copy_notebook():
+    notebook = Notebook()
+    notebook.add_note(Note("first", ["a"]))
+    snapshot, shadow = notebook.changed_copy(None)
+    note_id = next(iter(notebook.data))
+    notebook.data[note_id].add_tag("b")
+    notebook.add_note(Note("second"))
+    snapshot, shadow = notebook.changed_copy(shadow)
+    restored = pickle.loads(pickle.dumps(snapshot))
+    assert [(note.text, note.tags) for note in restored.data.values()] == [("first", ["a", "b"]), ("second", [])]
+
+
+def test_changed_copy_columnar():
+    book = ColumnarAddressBook()
+    book.add_record(contact("Ann", "0501234567"))
+    snapshot, _ = book.changed_copy(None)
+    book.add_record(contact("Bob", "0671112233"))
+    book.find("Ann").add_phone("0931112233")
+    restored = pickle.loads(pickle.dumps(snapshot))
+    assert phones(restored) == {"Ann": ["+380501234567"]}
+
+
+def test_autosaver_writes_snapshot(tmp_path):
+    lock = RWLock()
+    book = ConcurrentAddressBook.from_book(AddressBook(), lock)
+    book.add_record(contact("Ann", "0501234567"))
+    filename = str(tmp_path / "addressbook.pkl")
+    load = main.BackgroundLoad("addressbook", lambda: book)
+    load.result()
+    saver = main.Autosaver([(load, filename)], lock, interval=0)
+    try:
+        saver.save()
+        book.add_record(contact("Bob", "0671112233"))
+        saver.save()
+    finally:
+        saver.close()
+    assert book._saved_version == book._version
+    saved = load_data(filename, AddressBook)
+    # у файлі - звичайна книга
+    assert type(saved) is AddressBook
+    assert phones(saved) == phones(book)
+
+
+def test_prompt_outside_command_lock(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    savers = []
+
+    def start_autosave(*args):
+        saver = original(*args)
+        savers.append(saver)
+        return saver
+
+    original = main.start_autosave
+    monkeypatch.setattr(main, "start_autosave", start_autosave)
+    answers = iter(["add-note", "buy milk", "home;shop", "exit"])
+
+    def fake_input(prompt=""):
+        # ні запрошення, ні питання add-note не чекають під блокуванням команд
+        assert savers[0].lock._writer is None
+        return next(answers)
+
+    monkeypatch.setattr("builtins.input", fake_input)
+    main.main(["--autosave-every", "1", "--result-cache-mb", "0"])
+    notebook = load_data("notes.pkl", Notebook)
+    assert [(note.text, note.tags) for note in notebook.data.values()] == [("buy milk", ["home", "shop"])]
+
+
+def test_autosave_is_off_by_default():
+    assert not main.autosaves(main.parse_arguments([]))
+    assert main.autosaves(main.parse_arguments(["--autosave", "30"]))
+    assert main.autosaves(main.parse_arguments(["--autosave-every", "20"]))
+    assert not main.autosaves(main.parse_arguments(["--autosave", "30", "--sqlite", "data.db"]))
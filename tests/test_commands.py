@@ -0,0 +1,225 @@
+'''Кеш відповідей команд: ключ - мітка екземпляра сховища і його _version'''
+import json
+import pickle
+import sys
+
+import pytest
+from colorama import Fore, Style
+
+from assistant import commands
+from assistant.instrumentation import CommandStats, ResultCache
+from assistant.models import AddressBook, Note, Notebook, Record
+from main import BackgroundLoad, Completer, parse_arguments
+
+
+@pytest.fixture
+def result_cache(monkeypatch):
+    monkeypatch.setattr(commands, "RESULT_CACHE", None)
+    return commands.enable_result_cache(1024 * 1024)
+
+
+def book_with(name, phone):
+    book = AddressBook()
+    record = Record(name)
+    record.add_phone(phone)
+    book.add_record(record)
+    return book
+
+
+def phone(book):
+    return commands.dispatch("phone", commands.COMMANDS["phone"], ["Ann"], book, Notebook())
+
+
+def test_cache_is_off_by_default():
+    assert parse_arguments([]).result_cache_mb == 0
+
+
+def test_reopened_storage_misses_cache(result_cache):
+    first = book_with("Ann", "0501234567")
+    assert "+380501234567" in str(phone(first))
+    assert "+380501234567" in str(phone(first))
+    assert result_cache.hits == 1
+
+    # той самий _version, інші дані: раніше ключ на id() міг збігтися, коли перша книга звільнена
+    second = book_with("Ann", "0671234567")
+    assert second._version == first._version
+    assert "+380671234567" in str(phone(second))
+
+    reopened = pickle.loads(pickle.dumps(first))
+    assert commands.cache_token(reopened) != commands.cache_token(first)
+    assert commands.cache_token(first) == commands.cache_token(first)
+
+
+def test_changes_invalidate_cached_answers(result_cache):
+    book = book_with("Ann", "0501234567")
+    table = commands.dispatch("all", commands.COMMANDS["all"], [], book, Notebook())
+    assert commands.dispatch("all", commands.COMMANDS["all"], [], book, Notebook()) == table
+    phone(book)
+    book.find("Ann").add_phone("0671112233")
+    assert "+380671112233" in str(phone(book))
+    assert (result_cache.hits, result_cache.misses) == (1, 3)
+
+
+def test_cache_evicts_least_recently_used():
+    answer = "x" * 100
+    cache = ResultCache(3 * sys.getsizeof(answer))
+    computed = []
+
+    def call(key, generation=0, result=answer):
+        return cache.call(key, generation, lambda: computed.append(key) or result)
+
+    for key in ("a", "b", "c"):
+        call(key)
+    call("a")                   # "a" тепер використаний останнім
+    call("d")                   # витісняє "b"
+    assert list(cache.entries) == ["c", "a", "d"] and cache.bytes == 3 * sys.getsizeof(answer)
+    call("b")
+    call("a", generation=1)     # дані змінилися - рахуємо заново
+    assert computed == ["a", "b", "c", "d", "b", "a"]
+    assert (cache.hits, cache.misses) == (1, 6) and cache.bytes <= cache.max_bytes
+
+    # відповідь, більша за весь кеш, не кешується і нічого не витісняє
+    call("huge", result="y" * 1000)
+    assert "huge" not in cache.entries and len(cache.entries) == 3
+    # рядки таблиці зберігаються списком, тож повторна відповідь не порожня
+    assert call("table", result=(line for line in ["+--+", "|a |"])) == ["+--+", "|a |"]
+    assert call("table") == ["+--+", "|a |"]
+
+
+class FakeReadline:
+    def __init__(self, line):
+        self.line = line
+
+    def get_line_buffer(self):
+        return self.line
+
+    def get_begidx(self):
+        return self.line.rfind(" ") + 1
+
+
+def completions(completer, line):
+    completer.readline = FakeReadline(line)
+    text = line[completer.readline.get_begidx():]
+    matches = []
+    while (match := completer.complete(text, len(matches))) is not None:
+        matches.append(match)
+    return matches
+
+
+def test_completion_of_commands_names_and_note_ids():
+    book = AddressBook()
+    for name in ("Ann", "Anna-Maria", "Bob", "anton"):
+        book.add_record(Record(name))
+    notebook = Notebook()
+    for text in ("first", "second"):
+        notebook.add_note(Note(text))
+    note_ids = sorted(notebook.data)
+    completer = Completer(None, BackgroundLoad("book", lambda: book), BackgroundLoad("notes", lambda: notebook))
+
+    assert completions(completer, "show-") == ["show-address ", "show-birthday ", "show-email ", "show-notes "]
+    assert completions(completer, "add-phone An") == ["Ann ", "Anna-Maria "]
+    assert completions(completer, "add-phone Ann 050") == []
+    assert completions(completer, "stats re") == ["remove-phone "]
+    assert completions(completer, "edit-note ") == [note_id + " " for note_id in note_ids]
+    # нові й видалені контакти одразу видно в доповненні
+    book.add_record(Record("Anka"))
+    book.delete("Ann")
+    assert completions(completer, "phone An") == ["Anka ", "Anna-Maria "]
+
+
+def contacts_book(count):
+    book = AddressBook()
+    for i in range(count):
+        record = Record(f"Contact {i:02d}")
+        record.add_phone(f"050{i:07d}")
+        if i % 3 == 0:
+            record.add_phone(f"067{i:07d}")
+            record.add_birthday("01.02.1990")
+        book.add_record(record)
+    return book
+
+
+def table_names(lines):
+    return [line.split("|")[1].strip() for line in lines if line.startswith("|") and "Contact" in line]
+
+
+def test_all_table_keeps_tabulate_layout():
+    # той самий вигляд, що давав tabulate(tablefmt="grid") з вирівнюванням по центру
+    book = AddressBook()
+    record = Record("Ann")
+    record.add_phone("0501234567")
+    record.add_phone("0671112233")
+    record.add_birthday("01.02.1990")
+    book.add_record(record)
+    record = Record("Bob Lee")
+    record.add_email("bob@example.com")
+    book.add_record(record)
+    assert "\n".join(commands.COMMANDS["all"]([], book, None)) == Fore.GREEN + """\
++---------+---------------+-------------+-----------------+------------+
+|  Name   |    Phones     |  Birthday   |      Email      |  Address   |
++=========+===============+=============+=================+============+
+|   Ann   | +380501234567 | 01.02.1990  |    No email     | No address |
+|         | +380671112233 |             |                 |            |
++---------+---------------+-------------+-----------------+------------+
+| Bob Lee |               | No birthday | bob@example.com | No address |
++---------+---------------+-------------+-----------------+------------+""" + Style.RESET_ALL
+
+
+def test_all_pages():
+    book = contacts_book(45)
+    names = list(book.data)
+    show_all = commands.COMMANDS["all"]
+    assert table_names(show_all(["--page", "2"], book, None)) == names[20:40]
+    assert table_names(show_all(["--page", "3", "--size", "20"], book, None)) == names[40:]
+    assert table_names(show_all(["--size", "5"], book, None)) == names[:5]
+    assert table_names(show_all(["--limit", "3"], book, None)) == names[:3]
+    assert table_names(show_all(["--page", "2", "--size", "10", "--limit", "4"], book, None)) == names[10:14]
+    assert "No contacts on this page" in show_all(["--page", "4"], book, None)
+    assert "valid page size" in show_all(["--size", "0"], book, None)
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    monkeypatch.setattr(commands, "STATS", None)
+    return commands.enable_stats(memory_every=2)
+
+
+def run(command, *args, book=None):
+    result = commands.dispatch(command, commands.COMMANDS[command], list(args), book, Notebook())
+    return result if result is None or isinstance(result, str) else "\n".join(result)
+
+
+def test_stats_count_calls_errors_and_memory(stats, tmp_path):
+    book = book_with("Ann", "0501234567")
+    run("phone", "Ann", book=book)
+    run("phone", "Bob", book=book)
+    run("phone", "Ann", book=book)
+    run("add-birthday", "Bob", "01.01.2000", book=book)
+    lines = commands.dispatch("all", commands.COMMANDS["all"], [], book, Notebook())
+    assert stats.commands["all"].calls == 0     # таблиця ще не видана
+    list(lines)
+
+    data = stats.to_dict()["commands"]
+    assert data["phone"]["calls"] == 3 and data["all"]["calls"] == 1
+    assert data["add-birthday"]["errors"] == {"ContactNotFound": 1}
+    assert data["phone"]["memory"]["samples"] == 1 and "memory" not in data["all"]
+    assert sum(data["phone"]["histogram_us"].values()) == 3
+
+    lines = run("stats").split("\n")
+    rows = [[cell.strip() for cell in line.split("|")[1:-1]] for line in lines if line.startswith("|")]
+    assert {row[0]: (row[1], row[2]) for row in rows[1:]} == {
+        "phone": ("3", "0"), "add-birthday": ("1", "1"), "all": ("1", "0")}
+    assert "ContactNotFound x1" in run("stats", "add-birthday")
+    assert "No statistics for 'hello'" in run("stats", "hello")
+    commands.dump_stats(tmp_path / "stats.json")
+    assert json.loads((tmp_path / "stats.json").read_text())["commands"]["phone"]["calls"] == 3
+
+
+def test_percentiles_are_bucket_bounds():
+    stats = CommandStats()
+    for elapsed in [0.000003] * 90 + [0.0005] * 9 + [0.02]:
+        stats.record(elapsed)
+    # верхні межі кошиків (степені двійки мікросекунд), не більші за максимум
+    assert stats.percentile(0.5) == 0.004
+    assert stats.percentile(0.99) == 0.512
+    assert stats.percentile(1.0) == pytest.approx(20.0)
@@ -0,0 +1,141 @@
+'''Потокобезпечні книга й нотатник під одночасними читачами і письменниками'''
+import sys
+import random
+import threading
+
+import pytest
+
+from assistant.concurrent import ConcurrentAddressBook, ConcurrentNotebook, RWLock
+from assistant.models import Note, Record
+
+THREADS = 4
+OPERATIONS = 300
+
+
+@pytest.fixture(autouse=True)
+def frequent_switches():
+    # потоки перемикаються частіше - гонки проявляються швидше
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def phone_of(number):
+    return f"050{number:07d}"
+
+
+def contact(number):
+    record = Record(f"Person_{number}")
+    record.add_phone(phone_of(number))
+    return record
+
+
+def run_threads(*targets):
+    errors = []
+
+    def guarded(target, seed):
+        try:
+            target(random.Random(seed))
+        except BaseException as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=guarded, args=(target, seed)) for seed, target in enumerate(targets)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors, errors
+
+
+def test_readers_and_writers_keep_book_consistent():
+    book = ConcurrentAddressBook()
+    for number in range(200):
+        book.add_record(contact(number))
+
+    def writer(rng):
+        for _ in range(OPERATIONS):
+            number = rng.randrange(400)
+            if rng.random() < 0.5:
+                book.add_record(contact(number))
+            else:
+                book.delete(f"Person_{number}")
+
+    def reader(rng):
+        for _ in range(OPERATIONS):
+            number = rng.randrange(400)
+            # знайдений за телефоном запис - саме той контакт, а не напівзмінений
+            assert [record.name.value for record in book.find_by_phone(phone_of(number))] in ([], [f"Person_{number}"])
+            for record in book.snapshot()[:20]:
+                assert record.phones[0].value.endswith(record.name.value.split("_")[1].rjust(7, "0"))
+            assert all(record.name.value.startswith("Person") for record in book.search("Person_1"))
+
+    run_threads(*([writer] * 2 + [reader] * THREADS))
+    # індекси збігаються з даними
+    for name, record in book.data.items():
+        assert book.find_by_phone(record.phones[0].value) == [record]
+    assert len(book.snapshot()) == len(book.data)
+    assert sorted(record.name.value for record in book.search("Person")) == sorted(book.data)
+
+
+def test_readers_and_writers_keep_notebook_consistent():
+    notebook = ConcurrentNotebook()
+
+    def writer(rng):
+        for number in range(OPERATIONS):
+            notebook.add_note(Note(f"note {number}", [f"tag{number % 7}"]))
+
+    def reader(rng):
+        for _ in range(OPERATIONS):
+            tag = f"tag{rng.randrange(7)}"
+            for note in notebook.find_by_tag(tag):
+                assert tag in note.tags
+
+    run_threads(writer, writer, *([reader] * THREADS))
+    # id не повторюються навіть для нотаток, доданих в одну секунду з різних потоків
+    assert len(notebook.data) == 2 * OPERATIONS
+    assert len(notebook.get_sorted_notes("date")) == 2 * OPERATIONS
+
+
+def test_read_inside_write_outlives_write():
+    lock = RWLock()
+    lock.acquire_write()
+    lock.acquire_read()
+    lock.release_write()
+    # тепер це звичайне читання: письменник іншого потоку чекає, поки його відпустять
+    acquired = threading.Event()
+
+    def writer():
+        with lock.write():
+            acquired.set()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    assert not acquired.wait(0.1)
+    lock.release_read()
+    thread.join(1)
+    assert acquired.is_set()
+    assert lock._readers == 0
+
+
+def test_nested_read_inside_write():
+    lock = RWLock()
+    with lock.write():
+        with lock.read():
+            with lock.read():
+                pass
+        with lock.write():
+            pass
+    assert lock._readers == 0 and lock._writer is None
+    with lock.read():
+        pass
+    assert lock._readers == 0
+
+
+def test_reader_cannot_upgrade():
+    lock = RWLock()
+    with lock.read():
+        with pytest.raises(RuntimeError):
+            lock.acquire_write()
+    with lock.write():
+        pass
@@ -0,0 +1,66 @@
+'''Імпорт контактів: злиття з наявними записами, --replace і ті самі правила номерів, що й у Phone'''
+import pandas as pd
+import pytest
+
+from assistant.commands import COMMANDS
+from assistant.exchange import EXCHANGE_COLUMNS, validate_chunk
+from assistant.models import AddressBook, Notebook, Phone, Record
+from assistant.storage.columnar import ColumnarAddressBook
+
+
+@pytest.fixture(params=[AddressBook, ColumnarAddressBook])
+def book(request):
+    book = request.param()
+    record = Record("Ann")
+    record.add_phone("0501234567")
+    record.add_birthday("01.02.1990")
+    record.add_email("ann@example.com")
+    book.add_record(record)
+    return book
+
+
+def import_csv(book, tmp_path, lines, *options):
+    path = tmp_path / "contacts.csv"
+    path.write_text("\n".join([",".join(EXCHANGE_COLUMNS), *lines]) + "\n", encoding="utf-8")
+    return COMMANDS["import"]([str(path), *options], book, Notebook())
+
+
+def fields(record):
+    return ([phone.value for phone in record.phones], str(record.birthday) if record.birthday else None,
+            record.email.value if record.email else None, record.address.value if record.address else None)
+
+
+def test_import_merges_existing_contact(book, tmp_path):
+    message = import_csv(book, tmp_path, ["Ann,0671112233;0501234567,,,Kyiv", "Bob,0939998877,,,",
+                                          "Ann,0631112233,,ann@work.com,"])
+    assert "Imported 2 contacts" in message and "1 existing contacts updated" in message
+    # нові номери дописуються, порожні колонки не стирають наявні поля
+    assert fields(book.find("Ann")) == (["+380501234567", "+380671112233", "+380631112233"],
+                                        "01.02.1990", "ann@work.com", "Kyiv")
+    assert fields(book.find("Bob")) == (["+380939998877"], None, None, None)
+
+
+def test_import_replace_reports_overwritten(book, tmp_path):
+    message = import_csv(book, tmp_path, ["Ann,0671112233,,,", "Bob,0939998877,,,"], "--replace")
+    assert "Replaced 1 existing contacts: Ann." in message
+    assert fields(book.find("Ann")) == (["+380671112233"], None, None, None)
+
+
+PHONES = ["+380501234567", "380501234567", "0501234567", "5012345678", "050-123-45-67", "+38 (050) 123 45 67",
+          "(050)1234567", "050123456", "05012345678", "+3805012345678", "3805012345678", "+1234567890",
+          "+050123456", "0+50123456", "٠٥٠١٢٣٤٥٦٧", "０５０１２３４５６７", "050１２３４５６７", "abc", "+", "0"]
+
+
+@pytest.mark.parametrize("raw", PHONES)
+def test_bulk_phone_rules_match_phone(raw):
+    try:
+        expected = Phone(raw).value
+    except ValueError:
+        expected = None
+    chunk = pd.DataFrame([{"name": "Ann", "phones": raw, "birthday": "", "email": "", "address": "",
+                           "line": 2, "error": ""}])
+    rows, rejected = validate_chunk(chunk)
+    if expected is None:
+        assert not rows and len(rejected) == 1
+    else:
+        assert rows and rows[0][1] == [expected]
@@ -0,0 +1,206 @@
+'''Індекси книги й нотатника: відповіді індексу збігаються з прямим перебором'''
+import calendar
+from datetime import date, timedelta
+
+from assistant.commands import COMMANDS
+from assistant.models import (AddressBook, BirthdayIndex, Note, Notebook, PhoneIndex, Record, TagIndex,
+                              TrigramIndex)
+
+BIRTHDAYS = {"Ann": "29.02.2000", "Bob": "28.02.1990", "Cid": "31.12.1985", "Dan": "01.01.1991",
+             "Eve": "01.03.1970", "Fay": "15.06.2001", "Gus": None}
+
+
+def texts(notes):
+    return [note.text for note in notes]
+
+
+def test_tag_substring_and_find_tag_follow_edits():
+    notebook = Notebook()
+    for text, tags in [("a", ["Homework"]), ("b", ["home"]), ("c", ["work", "urgent"]), ("d", [])]:
+        notebook.add_note(Note(text, tags))
+    assert texts(notebook.find_by_tag("work")) == ["a", "c"]
+    assert texts(notebook.find_by_tag("om")) == ["a", "b"]      # короткий запит - без триграм
+    note_ids = list(notebook.data)
+    notebook.data[note_ids[0]].remove_tag("Homework")
+    notebook.data[note_ids[3]].add_tag("network")
+    notebook.delete_note(note_ids[1])
+    assert texts(notebook.find_by_tag("work")) == ["c", "d"]
+    assert texts(notebook.find_by_tag("om")) == []
+    assert texts(notebook.query_tags(["net*", "OR", "urg*"])) == ["c", "d"]
+    assert "network" in COMMANDS["find-tag"](["NOT", "urgent"], None, notebook)
+
+
+def birthday_book():
+    book = AddressBook()
+    for name, birthday in BIRTHDAYS.items():
+        record = Record(name)
+        if birthday:
+            record.add_birthday(birthday)
+        book.add_record(record)
+    return book
+
+
+def scan_birthdays(book, start, end):
+    # перебір без індексу: найближчий день народження не раніше start, 29.02 у невисокосний рік - 28.02
+    result = []
+    for record in book.data.values():
+        if not record.birthday:
+            continue
+        bday = record.birthday.value
+        for year in (start.year, start.year + 1):
+            day = 28 if (bday.month, bday.day) == (2, 29) and not calendar.isleap(year) else bday.day
+            occurrence = date(year, bday.month, day)
+            if occurrence >= start:
+                if occurrence <= end:
+                    result.append((occurrence, record.name.value))
+                break
+    return sorted(result)
+
+
+def test_birthdays_across_year_end_and_feb_29():
+    book = birthday_book()
+    assert list(book._birthdays(date(2025, 12, 30), date(2026, 1, 2))) == [
+        (date(2025, 12, 31), "Cid"), (date(2026, 1, 1), "Dan")]
+    # у невисокосний рік 29.02 святкується 28.02, навіть коли вікно закінчується цим днем
+    assert sorted(book._birthdays(date(2025, 2, 20), date(2025, 2, 28))) == [
+        (date(2025, 2, 28), "Ann"), (date(2025, 2, 28), "Bob")]
+    assert list(book._birthdays(date(2027, 12, 31), date(2028, 2, 29))) == [
+        (date(2027, 12, 31), "Cid"), (date(2028, 1, 1), "Dan"), (date(2028, 2, 28), "Bob"),
+        (date(2028, 2, 29), "Ann")]
+    # вікно довше за рік не повторює іменинників
+    assert len(list(book._birthdays(date(2025, 3, 2), date(2027, 1, 1)))) == 6
+
+
+def test_birthday_window_matches_scan():
+    book = birthday_book()
+    start = date(2023, 12, 1)
+    while start < date(2028, 4, 1):
+        for days in (0, 1, 7, 40, 365):
+            end = start + timedelta(days=days)
+            found = list(book._birthdays(start, end))
+            assert sorted(found) == scan_birthdays(book, start, end)
+            assert [bday for bday, _ in found] == sorted(bday for bday, _ in found)
+        start += timedelta(days=9)
+
+
+def test_birthday_index_follows_edits():
+    book = birthday_book()
+    book._use(book._birthday_index)
+    book.find("Gus").add_birthday("05.05.1995")
+    book.find("Ann").add_birthday("02.01.2000")
+    book.delete("Cid")
+    record = Record("Cid")
+    record.add_birthday("30.12.1999")
+    book.add_record(record)
+    book.delete("Fay")
+    # індекс, оновлений по одному запису, збігається з побудованим заново
+    fresh = BirthdayIndex()
+    fresh.build((record,) for record in book.data.values())
+    assert book._birthday_index.keys == fresh.keys
+    assert list(book._birthdays(date(2025, 12, 29), date(2026, 1, 3))) == [
+        (date(2025, 12, 30), "Cid"), (date(2026, 1, 1), "Dan"), (date(2026, 1, 2), "Ann")]
+
+
+def test_tag_prefix_range():
+    index = TagIndex()
+    for note_id, tags in enumerate([["work"], ["workshop"], ["wor"], ["world"], ["homework"], ["worké"], ["wp"]]):
+        index.add(str(note_id), Note(str(note_id), tags))
+    assert index.with_prefix("work") == {"0", "1", "5"}
+    assert index.with_prefix("WOR") == {"0", "1", "2", "3", "5"}
+    assert index.with_prefix("zz") == set()
+    index.remove("1", Note("1", ["workshop"]))
+    assert index.with_prefix("work") == {"0", "5"}
+
+
+def test_tag_query_prefix_and_or_not():
+    notebook = Notebook()
+    for text, tags in [("a", ["work", "urgent"]), ("b", ["workshop"]), ("c", ["home"]), ("d", ["home", "urgent"])]:
+        notebook.add_note(Note(text, tags))
+    assert texts(notebook.query_tags(["work*"])) == ["a", "b"]
+    assert texts(notebook.query_tags(["work*", "AND", "urgent"])) == ["a"]
+    assert texts(notebook.query_tags(["work", "OR", "home"])) == ["a", "b", "c", "d"]
+    assert texts(notebook.query_tags(["urgent", "NOT", "home"])) == ["a"]
+
+
+def phone_book():
+    book = AddressBook()
+    for name, phones in [("Ann", ["0501234567"]), ("Anna Lee", ["0671112233", "0501110000"]),
+                         ("Bob", ["0931234560"]), ("Олена", ["0501234567"]), ("ZED", [])]:
+        record = Record(name)
+        for phone in phones:
+            record.add_phone(phone)
+        book.add_record(record)
+    return book
+
+
+SEARCHES = ["an", "ann", "Anna", "nna l", "050", "1234", "+38067", "олен", "zed", "ed", "x", "", "0501234567"]
+
+
+def check_search(book):
+    # відповідь через триграми - та сама, що й перебір усіх записів у порядку книги
+    for keyword in SEARCHES:
+        expected = [record.name.value for record in book.data.values()
+                    if AddressBook._matches(record, keyword.lower())]
+        assert [record.name.value for record in book.search(keyword)] == expected, keyword
+
+
+def test_trigram_search_matches_scan():
+    book = phone_book()
+    check_search(book)
+    book.find("Bob").add_phone("0671234599")
+    book.find("Anna Lee").remove_phone("0671112233")
+    book.find("Ann").edit_phone("0501234567", "0991234567")
+    book.delete("Олена")
+    book.add_record(Record("Annette"))
+    check_search(book)
+    fresh = TrigramIndex()
+    fresh.build((record,) for record in book.data.values())
+    assert book._trigram_index.postings == fresh.postings
+
+
+def owners(book, number):
+    return [record.name.value for record in book.find_by_phone(number)]
+
+
+def test_phone_lookup_normalizes_number():
+    book = phone_book()
+    for number in ("0501234567", "+380501234567", "380501234567", "050-123-45-67", "+38 (050) 123 45 67"):
+        assert owners(book, number) == ["Ann", "Олена"]
+    assert owners(book, "0501110000") == ["Anna Lee"]
+    assert owners(book, "0991234567") == []
+    assert "Ann" in COMMANDS["who"](["050 123 45 67"], book, None)
+    assert "No contacts" in COMMANDS["who"](["0991234567"], book, None)
+    assert "Invalid phone" in COMMANDS["who"](["12ab"], book, None)
+
+
+def test_phone_index_follows_edits():
+    book = phone_book()
+    book._use(book._phone_index)
+    book.find("Ann").edit_phone("0501234567", "0991234567")
+    book.find("Bob").add_phone("0501110000")
+    book.delete("Anna Lee")
+    assert owners(book, "0501234567") == ["Олена"]
+    assert owners(book, "0991234567") == ["Ann"]
+    assert owners(book, "0501110000") == ["Bob"]
+    fresh = PhoneIndex()
+    fresh.build((record,) for record in book.data.values())
+    assert book._phone_index.owners_by_phone == fresh.owners_by_phone
+
+
+def test_name_suggestions():
+    book = AddressBook()
+    for name in ("Alexander Smith", "Olena Kovalenko", "John", "Marta", "Marty", "Mark_Twain"):
+        book.add_record(Record(name))
+    assert book.suggest_names("Alexnder Smith") == ["Alexander Smith"]
+    assert book.suggest_names("olena kovalenko") == ["Olena Kovalenko"]
+    assert book.suggest_names("Mart") == ["Marta", "Marty"]
+    assert book.suggest_names("Marta") == ["Marty"]       # саме ім'я не пропонується
+    assert book.suggest_names("Mark Twain") == ["Mark_Twain"]
+    # у коротких словах помилок не шукаємо, у словах до п'яти літер - лише одну
+    assert book.suggest_names("Jo") == book.suggest_names("Jhon") == []
+    assert "Did you mean: " in COMMANDS["add-birthday"](["Mart", "01.01.2000"], book, None)
+
+    book.delete("Marta")
+    book.add_record(Record("Maria"))
+    assert book.suggest_names("Mart") == ["Marty"]
+    assert book.suggest_names("Marie") == ["Maria"]
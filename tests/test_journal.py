@@ -0,0 +1,110 @@
+'''Журнал змін: обірваний останній запис відрізається, решта помилок не втрачає записів'''
+import os
+
+import pytest
+
+from assistant import persistence
+from assistant.models import AddressBook, Record
+from assistant.persistence import Journal, JournalCorrupted, load_data
+
+JOURNAL = "addressbook.pkl.journal"
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def write_journal(*names):
+    '''Журнал, у якому кожна команда додає один контакт; повертає межі записів'''
+    book = load_data("addressbook.pkl", AddressBook, journal=True)
+    ends = []
+    for name in names:
+        record = Record(name)
+        record.add_phone("0501234567")
+        book.add_record(record)
+        book.commit()
+        ends.append(book._journal.file.tell())
+    book._journal.close(book)
+    return ends
+
+
+def test_torn_tail_is_cut(workdir):
+    ends = write_journal("Ann", "Bob", "Cid")
+    with open(JOURNAL, "r+b") as f:
+        f.truncate(ends[-1] - 3)
+    book = load_data("addressbook.pkl", AddressBook, journal=True)
+    book._journal.close(book)
+    assert list(book.data) == ["Ann", "Bob"]
+    assert os.path.getsize(JOURNAL) == ends[1]
+
+
+def test_damaged_middle_entry_keeps_journal(workdir):
+    ends = write_journal("Ann", "Bob", "Cid")
+    with open(JOURNAL, "r+b") as f:
+        f.seek(ends[0] + Journal.ENTRY.size + 5)
+        byte = f.read(1)
+        f.seek(-1, os.SEEK_CUR)
+        f.write(bytes([byte[0] ^ 0xFF]))
+    with pytest.raises(JournalCorrupted):
+        load_data("addressbook.pkl", AddressBook, journal=True)
+    assert os.path.getsize(JOURNAL) == ends[-1]
+
+
+def test_restore_error_propagates(workdir):
+    ends = write_journal("Ann", "Bob")
+
+    class Broken(AddressBook):
+        def _restore(self, name, record):
+            raise RuntimeError("broken restore")
+
+    with pytest.raises(RuntimeError):
+        Journal.replay(Broken(), JOURNAL)
+    assert os.path.getsize(JOURNAL) == ends[-1]
+
+
+def test_failed_fold_keeps_old_journal(workdir, monkeypatch, capsys):
+    write_journal("Ann")
+    os.replace(JOURNAL, JOURNAL + ".old")
+
+    def fail(obj, filename):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(persistence, "save_data_atomic", fail)
+    Journal("addressbook.pkl", AddressBook)._fold_in_background()
+    assert "disk full" in capsys.readouterr().out
+    assert os.path.exists(JOURNAL + ".old")
+
+    monkeypatch.undo()
+    monkeypatch.chdir(workdir)
+    book = load_data("addressbook.pkl", AddressBook, journal=True)
+    book._journal.close(book)
+    assert list(book.data) == ["Ann"]
+    assert not os.path.exists(JOURNAL + ".old")
+
+
+ENTRY = Journal.entry("Cid", None)
+
+
+@pytest.mark.parametrize("tail", [b"\0" * Journal.ENTRY.size, b"\0" * 4096, ENTRY[:3] + b"\0" * 64,
+                                  ENTRY[:11] + bytes([ENTRY[11] ^ 0xFF]) + ENTRY[12:20]])
+def test_damaged_tail_header_is_cut(workdir, tail):
+    # збій посеред дописування чи нулі після втрати живлення: цілих записів після пошкодження немає
+    ends = write_journal("Ann", "Bob")
+    with open(JOURNAL, "ab") as f:
+        f.write(tail)
+    book = load_data("addressbook.pkl", AddressBook, journal=True)
+    book._journal.close(book)
+    assert list(book.data) == ["Ann", "Bob"]
+    assert os.path.getsize(JOURNAL) == ends[-1]
+
+
+def test_damaged_header_before_entries_raises(workdir):
+    ends = write_journal("Ann", "Bob", "Cid")
+    with open(JOURNAL, "r+b") as f:
+        f.seek(ends[0])
+        f.write(b"\0" * Journal.ENTRY.size)
+    with pytest.raises(JournalCorrupted):
+        load_data("addressbook.pkl", AddressBook, journal=True)
+    assert os.path.getsize(JOURNAL) == ends[-1]
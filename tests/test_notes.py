@@ -0,0 +1,191 @@
+'''Нотатник: сторінки show-notes, сортування і сторінки збігаються зі стабільним sorted, як до індексів, пошук, id і add-notes'''
+import json
+import pickle
+from datetime import datetime, timedelta
+
+import pytest
+
+from assistant.commands import COMMANDS
+from assistant.models import Note, NoteIds, Notebook
+from assistant.storage.sqlite import SqliteNotebook, SqliteStore
+
+KEYS = {
+    "date": lambda note: note.created,
+    "tag-count": lambda note: len(note.tags),
+    "tag-name": lambda note: note.tags[0].lower() if note.tags else "",
+}
+
+
+def make_notebook(request, kind):
+    if kind == "sqlite":
+        store = SqliteStore(":memory:")
+        request.addfinalizer(store.close)
+        return SqliteNotebook(store)
+    return Notebook()
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def notebook(request):
+    # багато однакових ключів: три часи створення, 0-2 теги
+    notebook = make_notebook(request, request.param)
+    base = datetime(2024, 5, 1, 10, 0)
+    for i in range(30):
+        note = Note(f"note {i}", ["work", "home"][:i % 3] if i % 4 else ["Urgent"])
+        note.created = base + timedelta(minutes=i % 3)
+        notebook.add_note(note)
+    return notebook
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def dated_notebook(request):
+    # 12 нотаток за 6 днів, по дві на день
+    notebook = make_notebook(request, request.param)
+    for i in range(12):
+        note = Note(f"note {i} " + "long text " * 6, ["work"])
+        note.created = datetime(2024, 5, 1, 9) + timedelta(days=i // 2, hours=i % 2)
+        notebook.add_note(note)
+    return notebook
+
+
+def table_ids(lines):
+    cells = (line.split("|")[1].strip() for line in lines if line.startswith("|"))
+    return [cell for cell in cells if cell[:1].isdigit()]
+
+
+def test_show_notes_since_and_pages(dated_notebook):
+    show_notes = COMMANDS["show-notes"]
+    ids = [note_id for note_id, _ in dated_notebook.get_sorted_notes("date")]
+    newest = ids[::-1]
+    assert table_ids(show_notes([], None, dated_notebook)) == ids
+    assert table_ids(show_notes(["--page", "1", "--size", "5"], None, dated_notebook)) == newest[:5]
+    assert table_ids(show_notes(["--page", "3", "--size", "5"], None, dated_notebook)) == newest[10:]
+    assert table_ids(show_notes(["--since", "04.05.2024"], None, dated_notebook)) == newest[:6]
+    assert table_ids(show_notes(["--since", "04.05.2024", "--page", "2", "--size", "4"],
+                                None, dated_notebook)) == newest[4:6]
+    assert "No notes found" in show_notes(["--since", "01.06.2024"], None, dated_notebook)
+    assert "Invalid date format" in show_notes(["--since", "2024-05-04"], None, dated_notebook)
+
+
+def test_show_notes_rewraps_edited_text(dated_notebook):
+    note_id = next(iter(dated_notebook.recent_notes(0, 1)))[0]
+    before = "\n".join(COMMANDS["show-notes"](["--size", "1"], None, dated_notebook))
+    dated_notebook.edit_note(note_id, "short")
+    after = "\n".join(COMMANDS["show-notes"](["--size", "1"], None, dated_notebook))
+    assert "long text" in before and "long text" not in after and "short" in after
+
+
+@pytest.mark.parametrize("sort_type", KEYS)
+@pytest.mark.parametrize("reverse", [False, True])
+def test_sorted_notes_keep_insertion_order_for_ties(notebook, sort_type, reverse):
+    notes = [note for _, note in notebook.get_sorted_notes("date")]
+    notes.sort(key=lambda note: note._id)
+    expected = [note.text for note in sorted(notes, key=KEYS[sort_type], reverse=reverse)]
+    assert [note.text for _, note in notebook.get_sorted_notes(sort_type, reverse)] == expected
+    for start in range(0, 31, 7):
+        for stop in (start + 1, start + 5, start + 11, None):
+            page = notebook.get_sorted_notes(sort_type, reverse, start, stop)
+            assert [note.text for _, note in page] == expected[start:stop]
+
+
+def sorted_ids(notebook, sort_type, reverse=False):
+    notes = sorted(notebook.get_sorted_notes("date"), key=lambda item: item[0])
+    return [note_id for note_id, note in sorted(notes, key=lambda item: KEYS[sort_type](item[1]), reverse=reverse)]
+
+
+def test_sort_notes_top_and_pages(notebook):
+    sort_notes = COMMANDS["sort-notes"]
+
+    def listed(*args):
+        return [line.split(":")[0] for line in sort_notes(list(args), None, notebook).split("\n")]
+
+    assert listed() == sorted_ids(notebook, "date")
+    expected = sorted_ids(notebook, "tag-count", reverse=True)
+    assert listed("tag-count", "desc", "--top", "4") == expected[:4]
+    assert listed("tag-count", "desc", "--page", "2", "--size", "7") == expected[7:14]
+    assert listed("tag-count", "desc", "--page", "2", "--size", "7", "--top", "10") == expected[7:10]
+    assert listed("tag-name", "--page", "5", "--size", "7") == sorted_ids(notebook, "tag-name")[28:]
+    assert "No notes found" in sort_notes(["date", "--page", "6", "--size", "7"], None, notebook)
+    assert "Unsupported sort type" in sort_notes(["colour"], None, notebook)
+
+
+def test_sorted_views_follow_changes(notebook):
+    notebook.get_sorted_notes("tag-count")
+    notebook.get_sorted_notes("tag-name")
+    notes = notebook.get_sorted_notes("date")
+    notebook.delete_note(notes[0][0])
+    COMMANDS["add-tag"]([notes[1][0], "aaa"], None, notebook)
+    urgent = next(note_id for note_id, note in notes[2:] if note.tags == ["Urgent"])
+    assert "removed" in COMMANDS["delete-tag"]([urgent, "Urgent"], None, notebook)
+    note = Note("late", ["zzz", "b", "c"])
+    note.created = datetime(2024, 4, 1)
+    notebook.add_note(note)
+    for sort_type in KEYS:
+        for reverse in (False, True):
+            found = [note_id for note_id, _ in notebook.get_sorted_notes(sort_type, reverse)]
+            assert found == sorted_ids(notebook, sort_type, reverse)
+
+
+def test_find_note_matches_whole_words_by_default():
+    notebook = Notebook()
+    for text in ("Team meeting at ten", "Meet Ann at the station", "Buy milk"):
+        notebook.add_note(Note(text))
+    find_note = COMMANDS["find-note"]
+    found = find_note(["meet"], None, notebook)
+    assert "Meet Ann" in found and "Team meeting" not in found
+    found = find_note(["meet", "--substring"], None, notebook)
+    assert "Meet Ann" in found and "Team meeting" in found
+    assert "use --substring" in find_note(["meeti"], None, notebook)
+    found = find_note(["at", "ten"], None, notebook)
+    assert "Team meeting" in found and "Meet Ann" not in found
+
+
+def test_note_ids_grow_within_a_second_and_backwards():
+    ids = NoteIds()
+    second = datetime(2024, 5, 1, 10, 0, 0)
+    issued = [ids.next(second), ids.next(second.replace(microsecond=5)), ids.next(second - timedelta(days=1)),
+              ids.next(second + timedelta(seconds=1))]
+    assert issued == ["20240501100000", "20240501100000-000001", "20240501100000-000002", "20240501100001"]
+    # лічильник продовжується від останнього id, а після 999999 id переходить на наступну секунду
+    ids = NoteIds("20240501100000-999998")
+    assert [ids.next(second) for _ in range(3)] == [
+        "20240501100000-999999", "20240501100001", "20240501100001-000001"]
+
+
+def test_reopened_notebook_continues_ids():
+    notebook = Notebook()
+    created = datetime(2024, 5, 1, 10, 0, 0)
+    for text in ("a", "b"):
+        note = Note(text)
+        note.created = created
+        notebook.add_note(note)
+    notebook = pickle.loads(pickle.dumps(notebook))
+    note = Note("c")
+    note.created = created
+    notebook.add_note(note)
+    assert list(notebook.data) == ["20240501100000", "20240501100000-000001", "20240501100000-000002"]
+    assert [note.text for note in notebook.data.values()] == ["a", "b", "c"]
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_add_notes_from_files(request, tmp_path, kind):
+    notebook = make_notebook(request, kind)
+    notebook.add_note(Note("existing", ["old"]))
+    text = tmp_path / "notes.txt"
+    text.write_text("".join(f"text note {i} --tags bulk; n{i}\n" for i in range(25)) + "\n", encoding="utf-8")
+    lines = [json.dumps({"text": f"json note {i}", "tags": "bulk", "created": "2024-05-01T10:00:00"})
+             for i in range(5)]
+    lines[2] = "{broken"
+    lines.append(json.dumps({"text": "bad date", "created": "yesterday"}))
+    jsonl = tmp_path / "notes.jsonl"
+    jsonl.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    add_notes = COMMANDS["add-notes"]
+    assert "Added 25 notes" in add_notes([str(text), "--chunk", "7"], None, notebook)
+    message = add_notes([str(jsonl)], None, notebook)
+    assert "Added 4 notes" in message and "2 invalid lines skipped" in message
+    note_ids = list(notebook.data)
+    assert len(note_ids) == len(set(note_ids)) == 30 and note_ids == sorted(note_ids)
+    # пачки, додані повз індекси, видно в пошуку
+    assert len(notebook.query_tags(["bulk"])) == 29
+    assert [note.text for note in notebook.query_tags(["n13"])] == ["text note 13"]
+    assert len(notebook.search_text("json note")) == 4
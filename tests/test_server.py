@@ -0,0 +1,173 @@
+'''Сервер команд на випадковому вільному порту: JSON-відповіді, помилки, ліміт з'єднань, тайм-аут'''
+import json
+import asyncio
+
+from main import parse_arguments
+from assistant.models import AddressBook, Notebook
+from assistant.server import MAX_HEADERS, MAX_LINE, CommandServer
+
+
+def make_server(*argv):
+    options = parse_arguments(["--serve", "127.0.0.1:0", "--http", "127.0.0.1:0", "--result-cache-mb", "0", *argv])
+    return CommandServer(options, AddressBook(), Notebook())
+
+
+def serve(server, scenario):
+    '''Запускає сервер, передає сценарію порти (рядковий, HTTP) і зупиняє сервер після нього'''
+    async def main():
+        servers = await server.start()
+        ports = [srv.sockets[0].getsockname()[1] for srv in servers]
+        try:
+            await scenario(*ports)
+        finally:
+            for srv in servers:
+                srv.close()
+                await srv.wait_closed()
+    asyncio.run(main())
+
+
+async def ask(reader, writer, line):
+    writer.write(line.encode() + b"\n")
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+
+async def post(port, body, content_type="application/json", method="POST", path="/command"):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    payload = body.encode()
+    writer.write(f"{method} {path} HTTP/1.1\r\nContent-Type: {content_type}\r\n"
+                 f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode() + payload)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    while (await reader.readline()) not in (b"\r\n", b""):
+        pass
+    response = json.loads(await reader.read())
+    writer.close()
+    return status, response
+
+
+def test_line_protocol_replies():
+    server = make_server()
+
+    async def scenario(port, http_port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        assert await ask(reader, writer, "add Ann 0501234567") == {"ok": True, "result": "Contact added."}
+        reply = await ask(reader, writer, "phone Ann")
+        assert reply["ok"] and "+380501234567" in reply["result"]
+        # кольори консолі до клієнта не доходять
+        assert "\x1b[" not in (await ask(reader, writer, "all"))["result"]
+        assert await ask(reader, writer, "no-such-command") == {"ok": False, "error": "Command not recognized."}
+        assert (await ask(reader, writer, "show"))["ok"] is False
+        writer.write(b"exit\n")
+        await writer.drain()
+        assert await reader.read() == b""
+        writer.close()
+
+    serve(server, scenario)
+    assert "Ann" in server.book.data
+
+
+def test_file_commands_refused(tmp_path):
+    # клієнт мережі не повинен читати чи писати файли на машині сервера
+    server = make_server()
+    target = tmp_path / "book.csv"
+    source = tmp_path / "notes.txt"
+    source.write_text("secret --tags x\n", encoding="utf-8")
+
+    async def scenario(port, http_port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        for line in (f"export {target}", f"import {source}", f"add-notes {source}"):
+            assert await ask(reader, writer, line) == {"ok": False, "error": "Command not recognized."}
+        status, response = await post(http_port, json.dumps({"command": f"export {target}"}))
+        assert status == 200 and response == {"ok": False, "error": "Command not recognized."}
+        writer.close()
+
+    serve(server, scenario)
+    assert not target.exists()
+    assert len(server.notebook.data) == 0
+
+
+def test_http_replies():
+    server = make_server()
+
+    async def scenario(port, http_port):
+        assert await post(http_port, json.dumps({"command": "add Bob 0671112233"})) == \
+            (200, {"ok": True, "result": "Contact added."})
+        status, response = await post(http_port, "phone Bob", content_type="text/plain")
+        assert status == 200 and "+380671112233" in response["result"]
+        assert (await post(http_port, "{not json"))[0] == 400
+        assert (await post(http_port, "", method="GET"))[0] == 405
+        assert (await post(http_port, "phone Bob", path="/other"))[0] == 404
+
+    serve(server, scenario)
+
+
+def test_connection_limit():
+    server = make_server("--max-connections", "1")
+
+    async def scenario(port, http_port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        assert (await ask(reader, writer, "hello"))["ok"]
+        extra_reader, extra_writer = await asyncio.open_connection("127.0.0.1", port)
+        assert json.loads(await extra_reader.readline()) == {"ok": False, "error": "Too many connections."}
+        assert await extra_reader.read() == b""
+        extra_writer.close()
+        status, response = await post(http_port, json.dumps({"command": "hello"}))
+        assert status == 503 and response["error"] == "Too many connections."
+        # місце звільняється, щойно клієнт відключився
+        writer.close()
+        await writer.wait_closed()
+        await asyncio.sleep(0.05)
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        assert (await ask(reader, writer, "hello"))["ok"]
+        writer.close()
+
+    serve(server, scenario)
+
+
+def test_request_timeout():
+    server = make_server("--request-timeout", "0.1")
+
+    async def scenario(port, http_port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        # довге читання іншого клієнта тримає блокування - запис не дочекається
+        await server.lock.acquire_read()
+        assert await ask(reader, writer, "add Ann 0501234567") == {"ok": False, "error": "Request timed out."}
+        # читачі за письменником, що не дочекався, не застрягають
+        assert (await ask(reader, writer, "all"))["ok"]
+        server.lock.release_read()
+        assert await ask(reader, writer, "add Ann 0501234567") == {"ok": True, "result": "Contact added."}
+        writer.close()
+
+    serve(server, scenario)
+    assert list(server.book.data) == ["Ann"]
+
+
+async def raw_request(port, head):
+    '''Надсилає сирий початок запиту; повертає статус відповіді'''
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(head)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    await reader.read()
+    writer.close()
+    return status
+
+
+def test_http_request_limits():
+    server = make_server("--request-timeout", "0.2")
+
+    async def scenario(port, http_port):
+        start = b"POST /command HTTP/1.1\r\n"
+        # тіло такого розміру сервер не читає і не буферизує
+        assert await raw_request(http_port, start + b"Content-Length: 10000000000\r\n\r\n") == 413
+        assert await raw_request(http_port, start + b"Content-Length: -5\r\n\r\n") == 400
+        assert await raw_request(http_port, start + b"X-Long: " + b"a" * (MAX_LINE + 1) + b"\r\n\r\n") == 431
+        assert await raw_request(http_port, start + b"X-Header: 1\r\n" * (MAX_HEADERS + 1) + b"\r\n") == 431
+        assert await raw_request(http_port, b"POST /" + b"a" * (MAX_LINE + 1) + b" HTTP/1.1\r\n\r\n") == 414
+        # тіло, що не надходить, - 408 після --request-timeout
+        assert await raw_request(http_port, start + b"Content-Length: 10\r\n\r\nhel") == 408
+        # межа не стосується звичайних запитів
+        assert (await post(http_port, json.dumps({"command": "hello"})))[0] == 200
+
+    serve(server, scenario)
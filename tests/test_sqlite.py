@@ -0,0 +1,87 @@
+'''SQLite-сховище в пам'яті: те, що записано в базу, читається назад без змін'''
+import pytest
+
+from assistant.models import Note, Record, restore_record
+from assistant.storage.sqlite import SqliteAddressBook, SqliteNotebook, SqliteStore
+
+
+@pytest.fixture
+def store():
+    store = SqliteStore(":memory:")
+    yield store
+    store.close()
+
+
+def reread(book):
+    '''Забуває побудовані записи, щоб наступне звернення прочитало їх з бази'''
+    book.commit()
+    book.data.loaded.clear()
+
+
+def phones(record):
+    return [phone.value for phone in record.phones]
+
+
+def test_address_book_round_trip(store):
+    book = SqliteAddressBook(store)
+    record = Record("Ann")
+    # порядок номерів - порядок додавання, а не сортування
+    for phone in ("0931112233", "0501234567", "0671112233"):
+        record.add_phone(phone)
+    record.add_birthday("01.02.1990")
+    book.add_record(record)
+    # номер, записаний старішою версією без перевірки, може містити пробіли
+    book.add_record(restore_record("Bob", ["+380 50 987 65 43", "ext 12"], None, None, None))
+    reread(book)
+
+    ann = book.find("Ann")
+    assert ann is not record
+    assert phones(ann) == ["+380931112233", "+380501234567", "+380671112233"]
+    assert str(ann.birthday) == "01.02.1990"
+    assert phones(book.find("Bob")) == ["+380 50 987 65 43", "ext 12"]
+    assert list(book.data) == ["Ann", "Bob"]
+
+    ann.edit_phone("0501234567", "0951234567")
+    ann.add_email("ann@example.com")
+    reread(book)
+    ann = book.find("Ann")
+    # edit_phone ставить новий номер у кінець
+    assert phones(ann) == ["+380931112233", "+380671112233", "+380951234567"]
+    assert str(ann.email) == "ann@example.com"
+
+    assert [r.name.value for r in book.search("ann")] == ["Ann"]
+    assert [r.name.value for r in book.search("987")] == ["Bob"]
+    assert [r.name.value for r in book.find_by_phone("0951234567")] == ["Ann"]
+    assert book.find_by_phone("0501234567") == []
+
+    book.delete("Bob")
+    reread(book)
+    assert book.find("Bob") is None
+    assert list(book.data) == ["Ann"]
+    assert store.conn.execute("SELECT COUNT(*) FROM phones WHERE name = 'Bob'").fetchone()[0] == 0
+
+
+def test_notebook_round_trip(store):
+    notebook = SqliteNotebook(store)
+    notebook.add_note(Note("buy milk and bread", ["shop", "home", "asap"]))
+    notebook.add_note(Note("call the plumber", ["home"]))
+    reread(notebook)
+
+    notes = [(note.text, note.tags) for note in notebook.data.values()]
+    assert notes == [("buy milk and bread", ["shop", "home", "asap"]), ("call the plumber", ["home"])]
+    first_id, second_id = list(notebook.data)
+
+    notebook.edit_note(first_id, "buy milk and cheese")
+    notebook.data[second_id].add_tag("urgent")
+    reread(notebook)
+    assert notebook.data[first_id].text == "buy milk and cheese"
+    assert notebook.data[second_id].tags == ["home", "urgent"]
+
+    assert [note.text for note in notebook.search_text("cheese")] == ["buy milk and cheese"]
+    assert notebook.search_text("bread") == []
+    assert sorted(note.text for note in notebook.find_by_tag("home")) == ["buy milk and cheese", "call the plumber"]
+
+    notebook.delete_note(first_id)
+    reread(notebook)
+    assert list(notebook.data) == [second_id]
+    assert [note.text for note in notebook.find_by_tag("shop")] == []
@@ -0,0 +1,189 @@
+'''Кожен режим сховища: зміни, збережені при закритті, видно після повторного відкриття; пакетний режим'''
+import io
+import pickle
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+import main
+from main import parse_arguments, run_batch
+from assistant.models import AddressBook, Notebook, Record
+from assistant.persistence import load_data
+from assistant.storage import open_storage, close_storage
+from assistant.storage.columnar import ColumnarAddressBook
+from assistant.storage.snapshot import MappedAddressBook, MappedSnapshot, save_snapshot
+
+
+MODES = {
+    "pickle": [],
+    "journal": ["--journal"],
+    "sqlite": ["--sqlite", "book.db"],
+    "snapshot": ["--snapshot"],
+    "columnar": ["--columnar"],
+    "shards": ["--shards", "2"],
+}
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # сховища пишуть файли в поточний каталог
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def session(argv, *commands):
+    '''Відкриває сховище, виконує команди як --batch і закриває його; повертає відповіді'''
+    options = parse_arguments(argv)
+    book, notebook = open_storage(options)
+    output = []
+    book, notebook = run_batch(options, book, notebook, commands, output.append)
+    close_storage(options, book, notebook)
+    return "".join(output)
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_round_trip(workdir, mode):
+    argv = MODES[mode]
+    session(argv,
+            "add Ann 0501234567",
+            "add-phone Ann 0671112233",
+            "add-birthday Ann 01.02.1990",
+            "add-email Ann ann@example.com",
+            "add Bob 0509876543",
+            "add-note first note --tags work;home")
+
+    output = session(argv, "phone Ann", "show-email Ann", "find-tag work", "all")
+    assert "+380501234567" in output and "+380671112233" in output
+    assert "ann@example.com" in output
+    assert "first note" in output
+    assert "Bob" in output
+
+    session(argv, "delete-contact Bob", "remove-phone Ann 0501234567")
+    output = session(argv, "all", "phone Ann")
+    assert "Bob" not in output
+    assert "+380501234567" not in output and "+380671112233" in output
+    assert "01.02.1990" in output
+
+
+BATCH = """\
+# коментарі й порожні рядки пропускаються
+
+add Ann 0501234567
+add-note buy milk --tags home;shop
+bogus
+phone Ann
+exit
+add Bob 0509876543
+"""
+
+
+def test_batch_file(workdir, capsys):
+    (workdir / "commands.txt").write_text(BATCH, encoding="utf-8")
+    main.main(["--batch", "commands.txt"])
+    # перші рядки - повідомлення про ще не створені файли даних
+    answers = capsys.readouterr().out.splitlines()[2:]
+    assert answers == ["Contact added.", "Note added.", "Command not recognized.",
+                       "Contact name: Ann, phones: +380501234567"]
+    # exit зупиняє пакет; зроблене до нього збережено
+    book = load_data("addressbook.pkl", AddressBook)
+    assert list(book.data) == ["Ann"]
+    notes = list(load_data("notes.pkl", Notebook).data.values())
+    assert [(note.text, note.tags) for note in notes] == [("buy milk", ["home", "shop"])]
+
+
+def test_batch_stdin_saves_every_n_commands(workdir, capsys, monkeypatch):
+    saves = []
+    persist = main.persist
+
+    def counting_persist(options, book, notebook):
+        saves.append(len(book.data))
+        return persist(options, book, notebook)
+
+    monkeypatch.setattr(main, "persist", counting_persist)
+    monkeypatch.setattr(sys, "stdin", io.StringIO("".join(f"add C{i} 050000000{i}\n" for i in range(5))))
+    main.main(["--batch", "-", "--save-every", "2"])
+    assert saves == [2, 4]
+    assert len(load_data("addressbook.pkl", AddressBook).data) == 5
+
+
+def test_legacy_pickles(workdir):
+    # файли з репозиторію записані ще з main.py: класи в них - __main__.AddressBook, __main__.Record...
+    root = Path(__file__).resolve().parent.parent
+    for name in ("addressbook.pkl", "notes.pkl"):
+        shutil.copy(root / name, workdir / name)
+    output = session([], "all", "show-notes")
+    assert "Felix" in output
+    assert "checking new input" in output
+
+
+def test_snapshot_positions_follow_iteration(tmp_path):
+    # find_by_phone сортує за data.position; порядок має збігатися з обходом книги після видалень і повторних додавань
+    def contact(name):
+        record = Record(name)
+        record.add_phone("0501234567")
+        return record
+
+    path = str(tmp_path / "book.snap")
+    book = AddressBook()
+    for name in ("Ann", "Bob", "Cid"):
+        book.add_record(contact(name))
+    save_snapshot(book, path)
+
+    mapped = MappedAddressBook(MappedSnapshot(path))
+    for name in ("Dan", "Eve", "Fay"):
+        mapped.add_record(contact(name))
+    mapped.delete("Eve")
+    mapped.delete("Bob")
+    mapped.add_record(contact("Bob"))
+    mapped.add_record(contact("Gus"))
+
+    expected = ["Ann", "Cid", "Dan", "Fay", "Bob", "Gus"]
+    assert list(mapped.data) == expected
+    assert [record.name.value for record in mapped.find_by_phone("0501234567")] == expected
+    mapped.data.snapshot.close()
+
+
+def test_columnar_rows_keep_odd_phones():
+    # номери без "+" і з нулем після "+" пакуються в odd_phones, а не як інше число
+    phones = ["+380501234567", "0671234567", "+0123", "+380671112233"]
+    book = ColumnarAddressBook()
+    book.add_rows([("Ann", phones, None, None, None), ("Bob", phones[1:3], None, None, None)])
+    assert [phone.value for phone in book.find("Ann").phones] == phones
+    assert [phone.value for phone in book.find("Bob").phones] == phones[1:3]
+
+
+def test_columnar_book_pickles_as_plain_book(workdir):
+    session(MODES["columnar"], "add Ann 0501234567", "add-birthday Ann 01.02.1990", "add Bob 0671112233")
+    with open("addressbook.pkl", "rb") as f:
+        book = pickle.load(f)
+    assert type(book) is AddressBook
+    assert list(book.data) == ["Ann", "Bob"]
+    # той самий файл відкривається і без --columnar
+    output = session(MODES["pickle"], "phone Ann", "show-birthday Ann")
+    assert "+380501234567" in output and "01.02.1990" in output
+
+
+def test_snapshot_completion_reads_only_the_prefix_range(tmp_path, monkeypatch):
+    path = str(tmp_path / "book.snap")
+    book = AddressBook()
+    for i in range(300):
+        book.add_record(Record(f"Name{i:03d}"))
+    for name in ("Ann", "Anna", "Andrew"):
+        book.add_record(Record(name))
+    save_snapshot(book, path)
+
+    mapped = MappedAddressBook(MappedSnapshot(path))
+    mapped.add_record(Record("Anatolii"))
+    mapped.add_record(Record("Bob"))
+    mapped.delete("Anna")
+    calls = []
+    name = MappedSnapshot.name
+    monkeypatch.setattr(MappedSnapshot, "name", lambda snapshot, i: calls.append(i) or name(snapshot, i))
+    assert mapped.complete_names("An") == ["Anatolii", "Andrew", "Ann"]
+    assert mapped.complete_names("An", 2) == ["Anatolii", "Andrew"]
+    assert mapped.complete_names("Name29") == [f"Name29{i}" for i in range(10)]
+    # бінарний пошук і сам діапазон, а не всі 303 імені знімка
+    assert len(calls) < 100
+    mapped.data.snapshot.close()